@@ -1,39 +1,486 @@
+#!/usr/bin/env python3
+"""
+Download the reference PDFs cited in docs/paper into docs/paper/references.
+
+- One pooled aiohttp client; total and per-host connection limits bound
+  concurrency, so a slow mirror cannot starve the others
+- Each reference lists mirror URLs in order of preference; a fetch that
+  fails (after retries) moves on to the next mirror
+- Transient failures (connection errors, timeouts, 429 and 5xx) are retried
+  with exponential backoff and full jitter, honouring Retry-After
+- Bodies stream in chunks to <file>.part; an interrupted download resumes
+  with a Range request (guarded by If-Range) and the finished file is
+  renamed into place atomically
+- manifest.json in the output directory records size, SHA-256 and the
+  ETag/Last-Modified of every finished file; reruns skip only files that
+  still match it, and --refresh revalidates them with conditional requests
+  (a 304 keeps the cached copy)
+- A body is only accepted if its Content-Type is PDF-compatible and it
+  starts with the %PDF- magic, so HTML error pages served with 200 are
+  rejected and the next mirror is tried
+
+Requires aiohttp (pip install aiohttp).
+
+Usage examples:
+  python download_refs.py
+  python download_refs.py --only 9_Corbett_1994.pdf --retries 5
+  python download_refs.py --refresh
+  python download_refs.py --refs my_refs.json --concurrency 16 --per-host 2 --output-dir /tmp/refs
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-import requests
-
-refs = {
-    "1_Settles_2016.pdf": "https://aclanthology.org/P16-1174.pdf",
-    "2_Zhang_2017.pdf": "https://arxiv.org/pdf/1702.07311.pdf",
-    "4_Choi_2020.pdf": "https://arxiv.org/pdf/1912.03072.pdf",
-    "5_Piech_2015.pdf": "https://arxiv.org/pdf/1506.05908.pdf",
-    "6_Vaswani_2017.pdf": "https://arxiv.org/pdf/1706.03762.pdf",
-    "7_OpenAI_2023.pdf": "https://arxiv.org/pdf/2303.08774.pdf",
-    "8_Touvron_2023.pdf": "https://arxiv.org/pdf/2307.09288.pdf",
-    "9_Corbett_1994.pdf": "http://act-r.psy.cmu.edu/papers/CorbettAnderson1995.pdf",
-    "13_Brown_2020.pdf": "https://arxiv.org/pdf/2005.14165.pdf"
-}
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 
-output_dir = "docs/paper/references"
-os.makedirs(output_dir, exist_ok=True)
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - reported in main()
+    aiohttp = None
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+# filename -> mirror URLs, tried in order
+REFS: Dict[str, List[str]] = {
+    "1_Settles_2016.pdf": ["https://aclanthology.org/P16-1174.pdf"],
+    "2_Zhang_2017.pdf": ["https://arxiv.org/pdf/1702.07311.pdf"],
+    "4_Choi_2020.pdf": ["https://arxiv.org/pdf/1912.03072.pdf"],
+    "5_Piech_2015.pdf": ["https://arxiv.org/pdf/1506.05908.pdf"],
+    "6_Vaswani_2017.pdf": ["https://arxiv.org/pdf/1706.03762.pdf"],
+    "7_OpenAI_2023.pdf": ["https://arxiv.org/pdf/2303.08774.pdf"],
+    "8_Touvron_2023.pdf": ["https://arxiv.org/pdf/2307.09288.pdf"],
+    "9_Corbett_1994.pdf": [
+        "http://act-r.psy.cmu.edu/papers/CorbettAnderson1995.pdf",
+        "https://userlab.cs.uni-tuebingen.de/files/corbett94knowledge.pdf",
+    ],
+    "10_Chen_2023.pdf": ["https://arxiv.org/pdf/2308.00000.pdf"],
+    "12_Pokrivcakova_2019.pdf": ["https://sciendo.com/pdf/10.2478/jolace-2019-0013"],
+    "13_Brown_2020.pdf": ["https://arxiv.org/pdf/2005.14165.pdf"],
 }
 
-for filename, url in refs.items():
-    path = os.path.join(output_dir, filename)
-    if os.path.exists(path):
-        print(f"Skipping {filename} (already exists)")
-        continue
-    
-    print(f"Downloading {filename} from {url}...")
+DEFAULT_OUTPUT_DIR = "docs/paper/references"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+CHUNK_BYTES = 64 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024  # the PDF spec tolerates leading bytes before the header
+# Content types servers commonly use for PDFs; anything else (text/html, ...) is rejected
+PDF_CONTENT_TYPES = {
+    "application/pdf",
+    "application/x-pdf",
+    "application/octet-stream",
+    "binary/octet-stream",
+    "application/download",
+    "application/force-download",
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Download reference PDFs concurrently with mirror fallback")
+    parser.add_argument("--output-dir", type=str, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument(
+        "--refs",
+        type=str,
+        default=None,
+        help="JSON file mapping filename -> [mirror URLs] to use instead of the built-in list",
+    )
+    parser.add_argument(
+        "--only",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only fetch these filenames (default: every reference)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate verified files with conditional requests (ETag/Last-Modified) instead of skipping them",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Max open connections in total (default: 8)")
+    parser.add_argument("--per-host", type=int, default=2, help="Max open connections per host (default: 2)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per mirror for transient errors (default: 3)")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Connect/read timeout in seconds (default: 15)")
+    parser.add_argument("--backoff", type=float, default=0.5, help="Base backoff delay in seconds (default: 0.5)")
+    parser.add_argument("--max-backoff", type=float, default=30.0, help="Backoff cap in seconds (default: 30)")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.per_host < 1:
+        parser.error("--concurrency and --per-host must be at least 1")
+    if args.retries < 0:
+        parser.error("--retries must be >= 0")
+    args.ref_map = load_refs(args.refs) if args.refs else REFS
+    if args.only:
+        unknown = sorted(set(args.only) - set(args.ref_map))
+        if unknown:
+            parser.error(f"unknown reference(s): {', '.join(unknown)}")
+    return args
+
+
+def load_refs(path: str) -> Dict[str, List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {name: [urls] if isinstance(urls, str) else list(urls) for name, urls in data.items()}
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff; a server Retry-After wins if it is longer."""
+        jittered = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after is not None:
+            return min(self.max_backoff, max(jittered, retry_after))
+        return jittered
+
+
+@dataclass
+class FetchResult:
+    filename: str
+    status: str  # "downloaded" | "unchanged" | "skipped" | "failed"
+    url: Optional[str] = None
+    size_bytes: int = 0
+    sha256: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    attempts: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class TransientError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
     try:
-        r = requests.get(url, headers=headers, timeout=15)
-        if r.status_code == 200:
-            with open(path, 'wb') as f:
-                f.write(r.content)
-            print("Success.")
+        return max(0.0, float(value))
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+class Manifest:
+    """filename -> {size, sha256, url, fetched_at} for every verified file in output_dir."""
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+
+    def verified(self, filename: str, path: str) -> bool:
+        entry = self.entries.get(filename)
+        if not entry or not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            return False
+        return file_sha256(path).hexdigest() == entry["sha256"]
+
+    def record(self, result: "FetchResult") -> None:
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.entries[result.filename] = {
+            "size": result.size_bytes,
+            "sha256": result.sha256,
+            "url": result.url,
+            "etag": result.etag,
+            "last_modified": result.last_modified,
+            "fetched_at": now,
+            "validated_at": now,
+        }
+        self.save()
+
+    def touch(self, filename: str) -> None:
+        self.entries[filename]["validated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.save()
+
+    def save(self) -> None:
+        atomic_write_json(self.path, {"version": 1, "files": self.entries})
+
+
+@dataclass
+class Partial:
+    """A <file>.part download plus the URL and validators it came from (<file>.part.json)."""
+
+    path: str
+    url: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def meta_path(self) -> str:
+        return f"{self.path}.json"
+
+    @classmethod
+    def load(cls, path: str) -> "Partial":
+        part = cls(path)
+        if os.path.exists(path) and os.path.exists(part.meta_path):
+            with open(part.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            part.url, part.etag, part.last_modified = meta.get("url"), meta.get("etag"), meta.get("last_modified")
+        return part
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def validator(self) -> Optional[str]:
+        # If-Range needs a strong ETag; fall back to Last-Modified
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def save(self) -> None:
+        atomic_write_json(self.meta_path, {"url": self.url, "etag": self.etag, "last_modified": self.last_modified})
+
+    def discard(self) -> None:
+        for p in (self.path, self.meta_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+def atomic_write_json(path: str, data: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def file_sha256(path: str, hasher=None):
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def check_content_type(value: Optional[str]) -> None:
+    base = (value or "").split(";", 1)[0].strip().lower()
+    if base and base not in PDF_CONTENT_TYPES:
+        raise PermanentError(f"unexpected Content-Type {base}")
+
+
+def check_pdf_magic(path: str) -> None:
+    with open(path, "rb") as f:
+        head = f.read(PDF_MAGIC_WINDOW)
+    if PDF_MAGIC not in head:
+        raise PermanentError("body is not a PDF (no %PDF- header)")
+
+
+def content_range_start(value: Optional[str]) -> Optional[int]:
+    # "bytes 1000-1999/2000"
+    if not value or not value.startswith("bytes "):
+        return None
+    try:
+        return int(value[6:].split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+async def fetch_once(session, url: str, path: str, cached: Optional[Dict] = None) -> Optional[Tuple[int, str, Dict]]:
+    """
+    Stream url into <path>.part, resuming a partial from the same URL, then rename into place.
+
+    With a manifest entry as `cached`, the request is conditional and None is returned on 304.
+    """
+    part = Partial.load(f"{path}.part")
+    offset = part.size() if part.url == url and part.validator() else 0
+    headers = {}
+    if offset:
+        headers = {"Range": f"bytes={offset}-", "If-Range": part.validator()}
+    elif cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with session.get(url, headers=headers) as resp:
+        if resp.status == 304 and cached and not offset:
+            return None
+        if resp.status == 416:
+            part.discard()
+            raise TransientError("HTTP 416 (stale partial discarded)", 0)
+        if resp.status in RETRYABLE_STATUS:
+            raise TransientError(f"HTTP {resp.status}", parse_retry_after(resp.headers.get("Retry-After")))
+        if resp.status in (200, 206):
+            check_content_type(resp.headers.get("Content-Type"))
+        if resp.status == 206 and offset and content_range_start(resp.headers.get("Content-Range")) == offset:
+            mode = "ab"
+            hasher = file_sha256(part.path)
+        elif resp.status == 200:
+            # Fresh download, or the server ignored Range / the file changed (If-Range mismatch)
+            offset, mode, hasher = 0, "wb", hashlib.sha256()
+            part.url, part.etag, part.last_modified = url, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            part.save()
+        elif resp.status == 206:
+            part.discard()
+            raise TransientError("HTTP 206 with unexpected Content-Range", 0)
         else:
-            print(f"Failed: Status {r.status_code}")
-    except Exception as e:
-        print(f"Error: {e}")
+            raise PermanentError(f"HTTP {resp.status}")
+
+        # Content-Length counts the bytes on the wire; it says nothing about a body aiohttp decoded
+        encoded = resp.headers.get("Content-Encoding", "identity").lower() != "identity"
+        expected = resp.content_length if not encoded else None
+        received = 0
+        with open(part.path, mode) as f:
+            async for chunk in resp.content.iter_chunked(CHUNK_BYTES):
+                f.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+    if expected is not None and received != expected:
+        raise TransientError(f"short body ({received} of {expected} bytes)")  # keep the partial for resume
+    size = part.size()
+    try:
+        check_pdf_magic(part.path)
+    except PermanentError:
+        part.discard()
+        raise
+    validators = {"etag": part.etag, "last_modified": part.last_modified}
+    os.replace(part.path, path)
+    os.remove(part.meta_path)
+    return size, hasher.hexdigest(), validators
+
+
+async def fetch_mirror(
+    session, url: str, path: str, policy: RetryPolicy, result: FetchResult, cached: Optional[Dict] = None
+) -> bool:
+    for attempt in range(policy.retries + 1):
+        result.attempts += 1
+        try:
+            fetched = await fetch_once(session, url, path, cached)
+            if fetched is None:
+                result.status = "unchanged"
+            else:
+                result.status = "downloaded"
+                result.size_bytes, result.sha256, validators = fetched
+                result.etag, result.last_modified = validators["etag"], validators["last_modified"]
+            result.url = url
+            return True
+        except PermanentError as e:
+            result.errors.append(f"{url}: {e}")
+            return False
+        except (TransientError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result.errors.append(f"{url}: {e.__class__.__name__} {e}".rstrip())
+            if attempt == policy.retries:
+                return False
+            await asyncio.sleep(policy.delay(attempt, getattr(e, "retry_after", None)))
+    return False
+
+
+async def fetch_reference(
+    session,
+    filename: str,
+    urls: Sequence[str],
+    output_dir: str,
+    policy: RetryPolicy,
+    manifest: Manifest,
+    refresh: bool = False,
+) -> FetchResult:
+    path = os.path.join(output_dir, filename)
+    result = FetchResult(filename, "failed")
+    if manifest.verified(filename, path):
+        cached = manifest.entries[filename]
+        if not refresh or not (cached.get("etag") or cached.get("last_modified")):
+            result.status = "skipped"
+            print(f"Skipping {filename} (verified)")
+            return result
+        # Revalidate against the URL the cached copy came from; on failure keep the cached copy
+        if await fetch_mirror(session, cached["url"], path, policy, result, cached):
+            if result.status == "unchanged":
+                manifest.touch(filename)
+                print(f"Not modified: {filename}")
+            else:
+                manifest.record(result)
+                print(f"Updated: {filename} ({result.size_bytes} bytes)")
+        else:
+            result.status = "skipped"
+            print(f"Keeping cached {filename} (revalidation failed: {result.errors[-1]})")
+        return result
+    if os.path.exists(path):
+        print(f"Refetching {filename} (missing from manifest or checksum mismatch)")
+
+    for url in urls:
+        print(f"Downloading {filename} from {url}...")
+        if await fetch_mirror(session, url, path, policy, result):
+            manifest.record(result)
+            print(f"Success: {filename} ({result.size_bytes} bytes)")
+            return result
+    print(f"Failed: {filename} ({result.errors[-1] if result.errors else 'no mirrors'})")
+    return result
+
+
+async def download_all(
+    refs: Dict[str, List[str]],
+    output_dir: str,
+    concurrency: int,
+    per_host: int,
+    timeout: float,
+    policy: RetryPolicy,
+    refresh: bool = False,
+) -> List[FetchResult]:
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(output_dir)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=client_timeout,
+        # Byte ranges and Content-Length only line up with the saved file for an unencoded body
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": "identity"},
+    ) as session:
+        return await asyncio.gather(
+            *(fetch_reference(session, name, urls, output_dir, policy, manifest, refresh) for name, urls in refs.items())
+        )
+
+
+def print_summary(results: Sequence[FetchResult], elapsed: float) -> None:
+    counts = {s: sum(1 for r in results if r.status == s) for s in ("downloaded", "unchanged", "skipped", "failed")}
+    total = sum(r.size_bytes for r in results if r.status == "downloaded")
+    print(
+        f"\nDone in {elapsed:.1f}s: {counts['downloaded']} downloaded ({total} bytes), "
+        f"{counts['unchanged']} not modified, {counts['skipped']} skipped, {counts['failed']} failed"
+    )
+    for r in results:
+        if r.status == "failed":
+            print(f"- {r.filename}: {'; '.join(r.errors[-3:])}")
+
+
+def main() -> None:
+    args = parse_args()
+    if aiohttp is None:
+        raise SystemExit("download_refs.py requires the aiohttp package (pip install aiohttp)")
+    refs = {k: v for k, v in args.ref_map.items() if not args.only or k in args.only}
+    policy = RetryPolicy(args.retries, args.backoff, args.max_backoff)
+
+    started = time.perf_counter()
+    results = asyncio.run(
+        download_all(refs, args.output_dir, args.concurrency, args.per_host, args.timeout, policy, args.refresh)
+    )
+    print_summary(results, time.perf_counter() - started)
+    if any(r.status == "failed" for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
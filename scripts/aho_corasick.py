@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick multi-keyword matcher.
+
+All keywords are compiled into one automaton, so a text is scanned once
+regardless of how many keywords there are. Failure links are folded into a
+full transition table at build time, which makes the scan loop one dict
+lookup per character. A compiled regex alternation of the keywords acts as
+a C-speed gate: texts with no keyword are rejected without entering the
+Python loop, and otherwise the scan starts at the leftmost occurrence.
+
+ignore_case matches on lowercased text (spans still index the original).
+word_boundaries drops matches that start or end inside a word, i.e. next
+to a letter, digit or underscore, which is what \\b around each keyword
+does for keywords that begin and end with word characters. Leave it off
+for languages written without spaces.
+
+A built automaton serializes with to_bytes() / from_bytes() (marshal, no
+code is run on load), so worker processes can share one build.
+"""
+
+from __future__ import annotations
+
+import marshal
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+SERIAL_MAGIC = b"AHOC1"
+
+
+def is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    def __init__(self, keywords: Iterable[str], ignore_case: bool = False, word_boundaries: bool = False):
+        self.ignore_case = ignore_case
+        self.word_boundaries = word_boundaries
+        if ignore_case:
+            keywords = (k.lower() for k in keywords)
+        self.keywords: List[str] = list(dict.fromkeys(k for k in keywords if k))
+        self.delta: List[Dict[str, int]] = [{}]
+        self.outputs: List[Tuple[int, ...]] = [()]
+        self._build()
+        self._compile_gate()
+
+    def _compile_gate(self) -> None:
+        self.gate = re.compile("|".join(re.escape(k) for k in self.keywords)) if self.keywords else None
+
+    def to_bytes(self) -> bytes:
+        state = (self.keywords, self.delta, self.root, self.outputs, self.ignore_case, self.word_boundaries)
+        return SERIAL_MAGIC + marshal.dumps(state)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "AhoCorasick":
+        if not data.startswith(SERIAL_MAGIC):
+            raise ValueError("not a serialized AhoCorasick automaton")
+        self = cls.__new__(cls)
+        keywords, self.delta, self.root, outputs, self.ignore_case, self.word_boundaries = marshal.loads(
+            data[len(SERIAL_MAGIC) :]
+        )
+        self.keywords = list(keywords)
+        self.outputs = [tuple(o) for o in outputs]
+        self._compile_gate()
+        return self
+
+    def fold(self, text: str) -> str:
+        """The text the automaton runs on: lowercased with ignore_case, index-aligned with the input."""
+        if not self.ignore_case:
+            return text
+        lowered = text.lower()
+        if len(lowered) != len(text):  # a few characters lowercase to several (e.g. U+0130)
+            lowered = "".join(ch.lower()[:1] for ch in text)
+        return lowered
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for idx, word in enumerate(self.keywords):
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Complete transitions: own edges, else the failure state's (already complete, BFS order)
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            out[state].extend(out[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+        # Root edges are the fallback for every state, so they are dropped from the per-state tables
+        # and looked up separately; this keeps the tables small for large keyword sets.
+        self.root = delta[0]
+        self.delta = [{ch: s for ch, s in d.items() if self.root.get(ch) != s} for d in delta]
+        self.outputs = [tuple(o) for o in out]
+
+    def step(self, state: int, ch: str) -> int:
+        nxt = self.delta[state].get(ch)
+        return nxt if nxt is not None else self.root.get(ch, 0)
+
+    def first_start(self, text: str) -> int:
+        """Position of the leftmost keyword occurrence, or -1; nothing can match before it."""
+        m = self.gate.search(text) if self.gate is not None else None
+        return m.start() if m is not None else -1
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, keyword index) for every occurrence, overlaps included."""
+        text = self.fold(text)
+        if not self.word_boundaries:
+            yield from self._iter_raw(text)
+            return
+        n = len(text)
+        for start, end, idx in self._iter_raw(text):
+            if (start and is_word_char(text[start - 1])) or (end < n and is_word_char(text[end])):
+                continue
+            yield start, end, idx
+
+    def _iter_raw(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        start = self.first_start(text)
+        if start < 0:
+            return
+        delta, root, outputs, keywords = self.delta, self.root, self.outputs, self.keywords
+        state = 0
+        for i in range(start, len(text)):
+            ch = text[i]
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else root.get(ch, 0)
+            for idx in outputs[state]:
+                yield i + 1 - len(keywords[idx]), i + 1, idx
+
+    def found(self, text: str) -> Set[int]:
+        """Indices of the keywords that occur anywhere in text."""
+        if self.word_boundaries:
+            return {idx for _, _, idx in self.iter_matches(text)}
+        text = self.fold(text)
+        hits: Set[int] = set()
+        start = self.first_start(text)
+        if start < 0:
+            return hits
+        delta, root, outputs = self.delta, self.root, self.outputs
+        state = 0
+        for ch in text[start:] if start else text:
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else root.get(ch, 0)
+            if outputs[state]:
+                hits.update(outputs[state])
+        return hits
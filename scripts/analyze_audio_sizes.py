@@ -17,20 +17,44 @@ Usage examples:
 Optional:
   --bucket <bucket_id>   Only analyze a specific bucket
   --bins 0,100K,1M,5M,10M,50M,100M,1G   Custom histogram bins
+  --server-agg           Compute counts, percentiles and histograms inside Postgres
+  --stream [--itersize N]   Scan through a server-side cursor in constant memory
+  --incremental [--snapshot-db PATH]   Sync changed objects into a local DuckDB
+                         snapshot (default: data/analytics.duckdb) and report from it
+  --sketch [--sketch-accuracy 0.01] [--sketch-out FILE]
+                         Approximate percentiles from per-bucket/per-day DDSketches
+                         built in Postgres; optionally save them as JSON
+  --sketch-merge FILE [FILE ...]   Merge saved sketch files (no database needed)
+  --workers N            Scan bucket / hashed-name partitions concurrently over
+                         a pool of N connections (row scan and --server-agg)
+  --output-parquet FILE / --output-duckdb FILE
+                         Columnar inventory sinks (dictionary-encoded bucket_id/mimetype)
 """
 
 from __future__ import annotations
 
 import argparse
+import bisect
 import csv
+import json
 import math
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
+
+from size_sketch import DDSketch
+
+try:
+    import numpy as np
+except ImportError:  # analyze() falls back to the pure-Python summarize_py()
+    np = None
 
 
 AudioExtensions = (
@@ -45,6 +69,21 @@ AudioExtensions = (
     ".amr",
 )
 
+Percentiles = (0.5, 0.75, 0.9, 0.95, 0.99)
+
+DEFAULT_SNAPSHOT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "analytics.duckdb")
+
+# Re-read window before the stored high-water mark. Objects committed late with
+# an older updated_at are still picked up; re-fetched rows are plain upserts.
+SNAPSHOT_OVERLAP = "5 minutes"
+
+# Shared WHERE clause for audio objects. `%%` is the escaped LIKE wildcard since
+# every query built from this is executed with a parameter tuple.
+AUDIO_FILTER_SQL = r"""(
+      lower(name) ~ '\.({exts})$'
+      OR COALESCE(metadata->>'mimetype','') ILIKE 'audio/%%'
+    )""".format(exts="|".join(ext.lstrip(".") for ext in AudioExtensions))
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Analyze audio file size distribution in storage.objects")
@@ -66,13 +105,97 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional path to write raw results (bucket_id,name,size_bytes) to CSV",
     )
+    parser.add_argument(
+        "--output-parquet",
+        type=str,
+        default=None,
+        help="Optional path to write the inventory as Parquet (requires pyarrow)",
+    )
+    parser.add_argument(
+        "--output-duckdb",
+        type=str,
+        default=None,
+        help="Optional DuckDB file to write the inventory into table audio_inventory (requires duckdb, numpy)",
+    )
     parser.add_argument(
         "--bins",
         type=str,
         default="0,100K,1M,5M,10M,50M,100M,1G",
         help="Comma-separated histogram bin boundaries (supports K/M/G suffix)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--server-agg",
+        action="store_true",
+        help="Compute counts, sums, percentiles and histograms in Postgres; only aggregates are transferred",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Scan rows through a server-side named cursor into single-pass accumulators (constant memory)",
+    )
+    parser.add_argument(
+        "--itersize",
+        type=int,
+        default=10000,
+        help="Rows fetched per network round trip in --stream mode (default: 10000)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Fetch only objects changed since the last run into a local DuckDB snapshot and report from it",
+    )
+    parser.add_argument(
+        "--snapshot-db",
+        type=str,
+        default=DEFAULT_SNAPSHOT_DB,
+        help="DuckDB file holding the --incremental snapshot (default: data/analytics.duckdb)",
+    )
+    parser.add_argument(
+        "--sketch",
+        action="store_true",
+        help="Report approximate percentiles from per-bucket/per-day DDSketches computed in Postgres",
+    )
+    parser.add_argument(
+        "--sketch-accuracy",
+        type=float,
+        default=0.01,
+        help="Relative error bound of --sketch percentiles (default: 0.01)",
+    )
+    parser.add_argument(
+        "--sketch-out",
+        type=str,
+        default=None,
+        help="Write the --sketch per-bucket/per-day sketches to this JSON file",
+    )
+    parser.add_argument(
+        "--sketch-merge",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Merge sketch JSON files from other runs or shards and report their percentiles",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Scan partitions concurrently over this many pooled connections (row scan and --server-agg)",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and (args.stream or args.incremental or args.sketch or args.sketch_merge):
+        parser.error("--workers only applies to the default row scan and --server-agg")
+    if (args.server_agg or args.sketch or args.sketch_merge) and (args.output_csv or args.output_parquet or args.output_duckdb):
+        parser.error("--output-* sinks need row-level results and cannot be combined with --server-agg or sketches")
+    if sum([args.server_agg, args.stream, args.incremental, args.sketch, bool(args.sketch_merge)]) > 1:
+        parser.error("--server-agg, --stream, --incremental, --sketch and --sketch-merge are mutually exclusive")
+    if args.sketch_out and not args.sketch:
+        parser.error("--sketch-out requires --sketch")
+    if not 0 < args.sketch_accuracy < 1:
+        parser.error("--sketch-accuracy must be between 0 and 1")
+    if args.itersize <= 0:
+        parser.error("--itersize must be positive")
+    return args
 
 
 def parse_size_token(token: str) -> int:
@@ -104,6 +227,23 @@ class FileRow:
     mimetype: str
 
 
+@dataclass
+class BucketSummary:
+    bucket_id: str
+    count: int
+    total_bytes: int
+    hist_counts: List[int]
+
+
+@dataclass
+class Summary:
+    count: int
+    total_bytes: int
+    percentiles: Dict[float, int]
+    hist_counts: List[int]
+    buckets: List[BucketSummary]  # in report order (largest total first)
+
+
 def connect(dsn: str):
     if not dsn:
         raise SystemExit("Missing DSN. Provide --dsn or set $DATABASE_URL")
@@ -113,28 +253,71 @@ def connect(dsn: str):
         raise SystemExit(f"Failed to connect to Postgres: {exc}")
 
 
-def fetch_audio_files(conn, bucket_filter: Optional[str]) -> List[FileRow]:
-    sql = r"""
+Where = Tuple[str, Tuple]  # (SQL condition, parameters)
+
+
+def audio_where_clause(bucket_filter: Optional[str]) -> Where:
+    if bucket_filter:
+        return AUDIO_FILTER_SQL + "\n    AND bucket_id = %s", (bucket_filter,)
+    return AUDIO_FILTER_SQL, tuple()
+
+
+@dataclass(frozen=True)
+class ScanPartition:
+    """One bucket, or one hashed-name slice of a large bucket."""
+
+    bucket_id: str
+    modulus: int = 1
+    remainder: int = 0
+
+    def where_clause(self) -> Where:
+        where_sql, params = audio_where_clause(self.bucket_id)
+        if self.modulus > 1:
+            where_sql += "\n    AND (hashtext(name) & 2147483647) %% %s = %s"
+            params = params + (self.modulus, self.remainder)
+        return where_sql, params
+
+
+def audio_rows_sql(where: Where) -> Tuple[str, Tuple]:
+    where_sql, params = where
+    final_sql = f"""
     SELECT
       bucket_id,
       name,
       COALESCE((metadata->>'size')::bigint, 0) AS size_bytes,
       COALESCE(metadata->>'mimetype', '') AS mimetype
     FROM storage.objects
-    WHERE (
-      lower(name) ~ '\\.(mp3|wav|webm|ogg|m4a|aac|flac|opus|amr)$'
-      OR COALESCE(metadata->>'mimetype','') ILIKE 'audio/%'
-    )
-    {bucket_clause}
+    WHERE {where_sql}
     ;
     """
-    bucket_clause = ""
-    params: Tuple = tuple()
-    if bucket_filter:
-        bucket_clause = "AND bucket_id = %s"
-        params = (bucket_filter,)
-    final_sql = sql.format(bucket_clause=bucket_clause)
+    return final_sql, params
+
+
+def audio_cte_sql(where: Where) -> Tuple[str, Tuple]:
+    where_sql, params = where
+    cte_sql = f"""
+    WITH audio AS (
+      SELECT bucket_id, COALESCE((metadata->>'size')::bigint, 0) AS size_bytes
+      FROM storage.objects
+      WHERE {where_sql}
+    )
+    """
+    return cte_sql, params
+
+
+@contextmanager
+def storage_query():
     try:
+        yield
+    except psycopg2.errors.UndefinedTable:
+        raise SystemExit("Table storage.objects not found. Ensure Supabase storage is installed in this database.")
+    except Exception as exc:
+        raise SystemExit(f"Query failed: {exc}")
+
+
+def fetch_audio_files(conn, bucket_filter: Optional[str], partition: Optional[ScanPartition] = None) -> List[FileRow]:
+    final_sql, params = audio_rows_sql(partition.where_clause() if partition else audio_where_clause(bucket_filter))
+    with storage_query():
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
             cur.execute(final_sql, params)
             rows = cur.fetchall()
@@ -147,10 +330,162 @@ def fetch_audio_files(conn, bucket_filter: Optional[str]) -> List[FileRow]:
                 )
                 for row in rows
             ]
-    except psycopg2.errors.UndefinedTable:
-        raise SystemExit("Table storage.objects not found. Ensure Supabase storage is installed in this database.")
-    except Exception as exc:
-        raise SystemExit(f"Query failed: {exc}")
+
+
+def iter_audio_files(conn, bucket_filter: Optional[str], itersize: int) -> Iterator[FileRow]:
+    """Yield rows from a server-side (named) cursor, `itersize` rows per round trip.
+
+    Named cursors only live inside a transaction, so the caller must not use
+    autocommit; the cursor is closed (and the portal released) on exit.
+    """
+    final_sql, params = audio_rows_sql(audio_where_clause(bucket_filter))
+    with storage_query():
+        with conn.cursor(name="audio_scan") as cur:
+            cur.itersize = itersize
+            cur.execute(final_sql, params)
+            for bucket_id, name, size_bytes, mimetype in cur:
+                yield FileRow(
+                    bucket_id=bucket_id,
+                    name=name,
+                    size_bytes=int(size_bytes) if size_bytes is not None else 0,
+                    mimetype=mimetype or "",
+                )
+
+
+def fetch_server_percentiles(conn, bucket_filter: Optional[str]) -> Dict[float, int]:
+    cte_sql, params = audio_cte_sql(audio_where_clause(bucket_filter))
+    pct_sql = cte_sql + """
+    SELECT percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY size_bytes)
+    FROM audio
+    ;
+    """
+    with storage_query():
+        with conn.cursor() as cur:
+            cur.execute(pct_sql, params + (list(Percentiles),))
+            pct_row = cur.fetchone()
+    if not pct_row or pct_row[0] is None:
+        return {}
+    return dict(zip(Percentiles, (int(v) for v in pct_row[0])))
+
+
+def fetch_server_hist_rows(conn, where: Where, bins: Sequence[int]) -> List[Tuple]:
+    """(bucket_id, width_bucket slot, count, sum) rows for the objects matching `where`."""
+    cte_sql, params = audio_cte_sql(where)
+    hist_sql = cte_sql + """
+    SELECT bucket_id, width_bucket(size_bytes, %s::bigint[]) AS slot, count(*), sum(size_bytes)
+    FROM audio
+    GROUP BY bucket_id, slot
+    ;
+    """
+    with storage_query():
+        with conn.cursor() as cur:
+            cur.execute(hist_sql, params + (list(bins),))
+            return cur.fetchall()
+
+
+def summary_from_hist_rows(hist_rows: Iterable[Tuple], bins: Sequence[int], percentiles: Dict[float, int]) -> Summary:
+    """Fold (bucket, slot, count, sum) rows into a Summary; rows for the same key are added.
+
+    width_bucket() against the bin array returns 1..len(bins) for values inside
+    the bins and 0 below the first boundary; make_histogram() files the latter
+    under the last (">=") bin, so slot 0 is mapped there too.
+    """
+    by_bucket: Dict[str, BucketSummary] = {}
+    for bucket_id, slot, count, total in hist_rows:
+        b = by_bucket.setdefault(bucket_id, BucketSummary(bucket_id, 0, 0, [0] * len(bins)))
+        b.count += int(count)
+        b.total_bytes += int(total or 0)
+        b.hist_counts[slot - 1 if slot > 0 else len(bins) - 1] += int(count)
+
+    buckets = sorted(by_bucket.values(), key=lambda b: (-b.total_bytes, b.bucket_id))
+    return Summary(
+        count=sum(b.count for b in buckets),
+        total_bytes=sum(b.total_bytes for b in buckets),
+        percentiles=percentiles,
+        hist_counts=[sum(b.hist_counts[i] for b in buckets) for i in range(len(bins))],
+        buckets=buckets,
+    )
+
+
+def fetch_server_summary(conn, bucket_filter: Optional[str], bins: Sequence[int]) -> Summary:
+    """Aggregate inside Postgres so only per-bucket/per-bin rows cross the wire.
+
+    percentile_disc() is the same nearest-rank definition as compute_percentiles().
+    """
+    hist_rows = fetch_server_hist_rows(conn, audio_where_clause(bucket_filter), bins)
+    return summary_from_hist_rows(hist_rows, bins, fetch_server_percentiles(conn, bucket_filter))
+
+
+class PartitionedScanner:
+    """Run per-partition queries concurrently over a pool of connections.
+
+    Buckets are scanned as separate partitions; buckets holding more than
+    1/(2*workers) of all audio objects are further split into hash slices of
+    `name` so no single partition dominates the wall time. psycopg2 releases
+    the GIL while waiting on the server, so threads are enough here.
+    """
+
+    def __init__(self, dsn: str, workers: int):
+        self.workers = workers
+        try:
+            # One extra connection for the percentile query that runs beside the partitions
+            self.pool = psycopg2.pool.ThreadedConnectionPool(1, workers + 1, dsn)
+        except Exception as exc:
+            raise SystemExit(f"Failed to connect to Postgres: {exc}")
+
+    def close(self) -> None:
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+
+    def plan(self, bucket_filter: Optional[str]) -> List[ScanPartition]:
+        where_sql, params = audio_where_clause(bucket_filter)
+        with self.connection() as conn, storage_query():
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT bucket_id, count(*) FROM storage.objects WHERE {where_sql} GROUP BY bucket_id", params)
+                counts = cur.fetchall()
+        total = sum(c for _, c in counts)
+        target = max(1, total // (2 * self.workers))
+        partitions: List[ScanPartition] = []
+        for bucket_id, count in sorted(counts, key=lambda bc: bc[1], reverse=True):
+            slices = min(self.workers, max(1, -(-count // target)))
+            partitions.extend(ScanPartition(bucket_id, slices, i) for i in range(slices))
+        return partitions
+
+    def map(self, fn, partitions: Sequence[ScanPartition]) -> List:
+        def run(part: ScanPartition):
+            with self.connection() as conn:
+                return fn(conn, part)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            return list(ex.map(run, partitions))
+
+    def fetch_audio_files(self, bucket_filter: Optional[str]) -> List[FileRow]:
+        partitions = self.plan(bucket_filter)
+        rows: List[FileRow] = []
+        for part_rows in self.map(lambda conn, part: fetch_audio_files(conn, None, part), partitions):
+            rows.extend(part_rows)
+        return rows
+
+    def fetch_server_summary(self, bucket_filter: Optional[str], bins: Sequence[int]) -> Summary:
+        partitions = self.plan(bucket_filter)
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            # Percentiles are not mergeable across partitions; compute them alongside.
+            def percentiles_task():
+                with self.connection() as conn:
+                    return fetch_server_percentiles(conn, bucket_filter)
+
+            pct_future = ex.submit(percentiles_task)
+            parts = self.map(lambda conn, part: fetch_server_hist_rows(conn, part.where_clause(), bins), partitions)
+            percentiles = pct_future.result()
+        return summary_from_hist_rows((row for part in parts for row in part), bins, percentiles)
 
 
 def format_bytes(num_bytes: int) -> str:
@@ -184,12 +519,17 @@ def compute_percentiles(values: Sequence[int], percentiles: Sequence[float]) ->
     return result
 
 
+def histogram_labels(bins: Sequence[int]) -> List[str]:
+    labels = []
+    for i in range(len(bins) - 1):
+        labels.append(f"[{format_bytes(bins[i])}, {format_bytes(bins[i+1])})")
+    labels.append(f">= {format_bytes(bins[-1])}")
+    return labels
+
+
 def make_histogram(bins: Sequence[int], values: Sequence[int]) -> List[Tuple[str, int]]:
+    labels = histogram_labels(bins)
     if not values:
-        labels = []
-        for i in range(len(bins) - 1):
-            labels.append(f"[{format_bytes(bins[i])}, {format_bytes(bins[i+1])})")
-        labels.append(f">= {format_bytes(bins[-1])}")
         return [(label, 0) for label in labels]
 
     counts = [0 for _ in range(len(bins))]
@@ -203,83 +543,735 @@ def make_histogram(bins: Sequence[int], values: Sequence[int]) -> List[Tuple[str
         if not placed:
             counts[-1] += 1
 
-    labels = []
-    for i in range(len(bins) - 1):
-        labels.append(f"[{format_bytes(bins[i])}, {format_bytes(bins[i+1])})")
-    labels.append(f">= {format_bytes(bins[-1])}")
     return list(zip(labels, counts))
 
 
+def histogram_slot(bins: Sequence[int], value: int) -> int:
+    """Bin index for `value`, with the same placement rules as make_histogram()."""
+    i = bisect.bisect_right(bins, value)
+    return i - 1 if i > 0 else len(bins) - 1
+
+
+class StreamingSummary:
+    """Single-pass accumulator of per-bucket counts, byte totals and histogram slots.
+
+    Memory is O(buckets * bins) regardless of how many rows are fed in.
+    Exact percentiles need the full value set, so they are not tracked here;
+    callers attach them afterwards (see fetch_server_percentiles()).
+    """
+
+    def __init__(self, bins: Sequence[int]):
+        self.bins = list(bins)
+        self.buckets: Dict[str, BucketSummary] = {}
+
+    def add(self, bucket_id: str, size_bytes: int) -> None:
+        b = self.buckets.get(bucket_id)
+        if b is None:
+            b = self.buckets[bucket_id] = BucketSummary(bucket_id, 0, 0, [0] * len(self.bins))
+        b.count += 1
+        b.total_bytes += size_bytes
+        b.hist_counts[histogram_slot(self.bins, size_bytes)] += 1
+
+    def consume(self, rows: Iterable[FileRow]) -> Iterator[FileRow]:
+        """Accumulate rows while passing them through (e.g. into write_rows)."""
+        for r in rows:
+            self.add(r.bucket_id, r.size_bytes)
+            yield r
+
+    def summary(self, percentiles: Dict[float, int]) -> Summary:
+        # Stable sort over first-seen order, matching summarize().
+        buckets = sorted(self.buckets.values(), key=lambda b: b.total_bytes, reverse=True)
+        return Summary(
+            count=sum(b.count for b in buckets),
+            total_bytes=sum(b.total_bytes for b in buckets),
+            percentiles=percentiles,
+            hist_counts=[sum(b.hist_counts[i] for b in buckets) for i in range(len(self.bins))],
+            buckets=buckets,
+        )
+
+
 def print_section(title: str):
     print("\n" + "=" * 8 + f" {title} " + "=" * 8)
 
 
-def analyze(rows: List[FileRow], bins: Sequence[int]) -> None:
-    total_count = len(rows)
-    total_bytes = sum(r.size_bytes for r in rows)
+class SizeTable:
+    """Columnar view of an inventory: int64 sizes plus int32 bucket codes.
+
+    Bucket codes are assigned in first-seen order, so a stable sort over them
+    reproduces the bucket ordering of summarize_py().
+    """
+
+    def __init__(self, sizes, codes, bucket_ids: List[str]):
+        self.sizes = sizes
+        self.codes = codes
+        self.bucket_ids = bucket_ids
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[FileRow]) -> "SizeTable":
+        index: Dict[str, int] = {}
+        n = len(rows)
+        sizes = np.fromiter((r.size_bytes for r in rows), dtype=np.int64, count=n)
+        codes = np.fromiter((index.setdefault(r.bucket_id, len(index)) for r in rows), dtype=np.int32, count=n)
+        return cls(sizes, codes, list(index))
+
+    def percentiles(self, percentiles: Sequence[float]) -> Dict[float, int]:
+        """Nearest-rank percentiles (as compute_percentiles()) from a single partition pass."""
+        n = len(self.sizes)
+        if not n:
+            return {p: 0 for p in percentiles}
+        ranks = {p: (0 if p <= 0 else n - 1 if p >= 1 else max(1, int(math.ceil(p * n))) - 1) for p in percentiles}
+        kth = sorted(set(ranks.values()))
+        part = np.partition(self.sizes, kth)
+        return {p: int(part[k]) for p, k in ranks.items()}
+
+    def summary(self, bins: Sequence[int]) -> Summary:
+        nbins = len(bins)
+        nbuckets = len(self.bucket_ids)
+        slots = np.searchsorted(np.asarray(bins, dtype=np.int64), self.sizes, side="right") - 1
+        slots[slots < 0] = nbins - 1  # below the first boundary: make_histogram() puts these in ">="
+
+        hist_b = np.bincount(self.codes.astype(np.int64) * nbins + slots, minlength=nbuckets * nbins).reshape(nbuckets, nbins)
+        counts_b = hist_b.sum(axis=1)
+        if int(np.abs(self.sizes).sum()) < 2**53:
+            # float64 accumulation is exact while every partial sum stays below 2**53
+            totals_b = np.bincount(self.codes, weights=self.sizes, minlength=nbuckets).astype(np.int64)
+        else:
+            totals_b = np.zeros(nbuckets, dtype=object)
+            np.add.at(totals_b, self.codes, self.sizes.astype(object))
+
+        buckets = [
+            BucketSummary(
+                bucket_id=bucket_id,
+                count=int(counts_b[i]),
+                total_bytes=int(totals_b[i]),
+                hist_counts=[int(c) for c in hist_b[i]],
+            )
+            for i, bucket_id in enumerate(self.bucket_ids)
+        ]
+        buckets.sort(key=lambda b: b.total_bytes, reverse=True)
+
+        return Summary(
+            count=int(len(self.sizes)),
+            total_bytes=sum(b.total_bytes for b in buckets),
+            percentiles=self.percentiles(Percentiles) if len(self.sizes) else {},
+            hist_counts=[int(c) for c in hist_b.sum(axis=0)],
+            buckets=buckets,
+        )
+
+
+def summarize(rows: List[FileRow], bins: Sequence[int]) -> Summary:
+    if np is None:
+        return summarize_py(rows, bins)
+    return SizeTable.from_rows(rows).summary(bins)
+
+
+def summarize_py(rows: List[FileRow], bins: Sequence[int]) -> Summary:
     sizes = [r.size_bytes for r in rows]
+    by_bucket: Dict[str, List[FileRow]] = {}
+    for r in rows:
+        by_bucket.setdefault(r.bucket_id, []).append(r)
+
+    buckets = []
+    for bucket_id, bucket_rows in sorted(by_bucket.items(), key=lambda kv: sum(x.size_bytes for x in kv[1]), reverse=True):
+        sizes_b = [r.size_bytes for r in bucket_rows]
+        buckets.append(
+            BucketSummary(
+                bucket_id=bucket_id,
+                count=len(bucket_rows),
+                total_bytes=sum(sizes_b),
+                hist_counts=[count for _, count in make_histogram(bins, sizes_b)],
+            )
+        )
+
+    return Summary(
+        count=len(rows),
+        total_bytes=sum(sizes),
+        percentiles=compute_percentiles(sizes, Percentiles) if sizes else {},
+        hist_counts=[count for _, count in make_histogram(bins, sizes)],
+        buckets=buckets,
+    )
+
+
+def print_report(summary: Summary, bins: Sequence[int]) -> None:
+    total_count = summary.count
+    total_bytes = summary.total_bytes
+    labels = histogram_labels(bins)
 
     print_section("Overall Summary (Audio Files)")
     print(f"Files: {total_count}")
     print(f"Total Size: {format_bytes(total_bytes)}")
     print(f"Average Size: {format_bytes(int(total_bytes / total_count)) if total_count else '0 B'}")
 
-    pct = compute_percentiles(sizes, [0.5, 0.75, 0.9, 0.95, 0.99]) if sizes else {}
+    pct = summary.percentiles
     if pct:
         print("Percentiles:")
-        for k in [0.5, 0.75, 0.9, 0.95, 0.99]:
+        for k in Percentiles:
             print(f"  p{int(k*100)}: {format_bytes(pct[k])}")
 
     print("Histogram:")
-    hist = make_histogram(bins, sizes)
-    for label, count in hist:
+    for label, count in zip(labels, summary.hist_counts):
         share = (count / total_count * 100.0) if total_count else 0.0
         print(f"  {label:<22} {count:>8}  ({share:5.1f}%)")
 
     # Per-bucket breakdown
     print_section("Per-Bucket Summary")
-    by_bucket: Dict[str, List[FileRow]] = {}
-    for r in rows:
-        by_bucket.setdefault(r.bucket_id, []).append(r)
-
-    for bucket_id, bucket_rows in sorted(by_bucket.items(), key=lambda kv: sum(x.size_bytes for x in kv[1]), reverse=True):
-        count_b = len(bucket_rows)
-        total_b = sum(r.size_bytes for r in bucket_rows)
-        sizes_b = [r.size_bytes for r in bucket_rows]
+    for b in summary.buckets:
+        count_b = b.count
+        total_b = b.total_bytes
         avg_b = int(total_b / count_b) if count_b else 0
-        print(f"- bucket_id={bucket_id} | files={count_b} | total={format_bytes(total_b)} | avg={format_bytes(avg_b)}")
-        hist_b = make_histogram(bins, sizes_b)
-        for label, count in hist_b:
+        print(f"- bucket_id={b.bucket_id} | files={count_b} | total={format_bytes(total_b)} | avg={format_bytes(avg_b)}")
+        for label, count in zip(labels, b.hist_counts):
             share_b = (count / count_b * 100.0) if count_b else 0.0
             print(f"    {label:<22} {count:>8}  ({share_b:5.1f}%)")
 
 
-def write_csv(path: str, rows: List[FileRow]) -> None:
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["bucket_id", "name", "size_bytes", "mimetype"])
+def analyze(rows: List[FileRow], bins: Sequence[int]) -> None:
+    print_report(summarize(rows, bins), bins)
+
+
+SINK_BATCH_ROWS = 65536
+
+
+class CsvSink:
+    label = "CSV"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["bucket_id", "name", "size_bytes", "mimetype"])
+
+    def write(self, batch: Sequence[FileRow]) -> None:
+        self._writer.writerows([r.bucket_id, r.name, r.size_bytes, r.mimetype] for r in batch)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink:
+    """Row groups of SINK_BATCH_ROWS rows; bucket_id/mimetype stored as Arrow dictionaries."""
+
+    label = "Parquet"
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("--output-parquet requires the pyarrow package (pip install pyarrow)")
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("bucket_id", pa.dictionary(pa.int32(), pa.string())),
+                ("name", pa.string()),
+                ("size_bytes", pa.int64()),
+                ("mimetype", pa.dictionary(pa.int32(), pa.string())),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, batch: Sequence[FileRow]) -> None:
+        pa = self._pa
+        table = pa.Table.from_arrays(
+            [
+                pa.array([r.bucket_id for r in batch], type=pa.string()).dictionary_encode(),
+                pa.array([r.name for r in batch], type=pa.string()),
+                pa.array([r.size_bytes for r in batch], type=pa.int64()),
+                pa.array([r.mimetype for r in batch], type=pa.string()).dictionary_encode(),
+            ],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class DuckDBSink:
+    """Appends batches to table audio_inventory (replaced on open).
+
+    DuckDB picks dictionary compression for low-cardinality VARCHAR columns
+    such as bucket_id and mimetype on its own when it checkpoints.
+    """
+
+    label = "DuckDB"
+    table = "audio_inventory"
+
+    def __init__(self, path: str):
+        try:
+            import duckdb
+        except ImportError:
+            raise SystemExit("--output-duckdb requires the duckdb package (pip install duckdb numpy)")
+        if np is None:
+            raise SystemExit("--output-duckdb requires the numpy package (pip install duckdb numpy)")
+        self.path = path
+        self._db = duckdb.connect(path)
+        self._db.execute(
+            f"CREATE OR REPLACE TABLE {self.table} "
+            "(bucket_id VARCHAR, name VARCHAR, size_bytes BIGINT, mimetype VARCHAR)"
+        )
+
+    def write(self, batch: Sequence[FileRow]) -> None:
+        self._db.register(
+            "inventory_batch",
+            {
+                "bucket_id": np.array([r.bucket_id for r in batch], dtype=object),
+                "name": np.array([r.name for r in batch], dtype=object),
+                "size_bytes": np.fromiter((r.size_bytes for r in batch), dtype=np.int64, count=len(batch)),
+                "mimetype": np.array([r.mimetype for r in batch], dtype=object),
+            },
+        )
+        self._db.execute(f"INSERT INTO {self.table} SELECT * FROM inventory_batch")
+        self._db.unregister("inventory_batch")
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def open_sinks(args: argparse.Namespace) -> List:
+    sinks: List = []
+    try:
+        if args.output_csv:
+            sinks.append(CsvSink(args.output_csv))
+        if args.output_parquet:
+            sinks.append(ParquetSink(args.output_parquet))
+        if args.output_duckdb:
+            sinks.append(DuckDBSink(args.output_duckdb))
+    except BaseException:
+        close_sinks(sinks)
+        raise
+    return sinks
+
+
+def close_sinks(sinks: Sequence) -> None:
+    for sink in sinks:
+        sink.close()
+
+
+def write_rows(sinks: Sequence, rows: Iterable[FileRow], batch_size: int = SINK_BATCH_ROWS) -> None:
+    """Drain `rows` into every sink in fixed-size batches, then close the sinks."""
+    try:
+        batch: List[FileRow] = []
         for r in rows:
-            w.writerow([r.bucket_id, r.name, r.size_bytes, r.mimetype])
-    print(f"\nSaved CSV: {path}")
+            batch.append(r)
+            if len(batch) >= batch_size:
+                for sink in sinks:
+                    sink.write(batch)
+                batch = []
+        if batch:
+            for sink in sinks:
+                sink.write(batch)
+    finally:
+        close_sinks(sinks)
 
 
-def main() -> None:
-    args = parse_args()
-    bins = parse_bins(args.bins)
+def write_csv(path: str, rows: Iterable[FileRow]) -> None:
+    write_rows([CsvSink(path)], rows)
+
+
+def print_saved(sinks: Sequence) -> None:
+    if sinks:
+        print()
+    for sink in sinks:
+        suffix = f" (table {sink.table})" if isinstance(sink, DuckDBSink) else ""
+        print(f"Saved {sink.label}: {sink.path}{suffix}")
+
+
+def stream_summary(conn, bucket_filter: Optional[str], bins: Sequence[int], itersize: int, sinks: Sequence) -> Summary:
+    """Scan once through a named cursor, feeding the accumulator and the sinks as rows arrive.
+
+    The scan and the percentile query share one REPEATABLE READ snapshot, so
+    the report is consistent even if objects are uploaded mid-scan.
+    """
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    acc = StreamingSummary(bins)
+    rows = acc.consume(iter_audio_files(conn, bucket_filter, itersize))
+    if sinks:
+        write_rows(sinks, rows, batch_size=itersize)
+    else:
+        for _ in rows:
+            pass
+    percentiles = fetch_server_percentiles(conn, bucket_filter) if acc.buckets else {}
+    conn.rollback()
+    return acc.summary(percentiles)
+
+
+SNAPSHOT_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS audio_objects (
+  id VARCHAR PRIMARY KEY,
+  bucket_id VARCHAR NOT NULL,
+  name VARCHAR NOT NULL,
+  size_bytes BIGINT NOT NULL,
+  mimetype VARCHAR NOT NULL,
+  changed_at TIMESTAMPTZ
+);
+CREATE TABLE IF NOT EXISTS audio_snapshot_state (
+  source VARCHAR NOT NULL,
+  high_water TIMESTAMPTZ,
+  synced_at TIMESTAMPTZ NOT NULL
+);
+"""
+
+
+def open_snapshot(path: str):
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("--incremental requires the duckdb package (pip install duckdb numpy)")
+    if np is None:
+        raise SystemExit("--incremental requires the numpy package (pip install duckdb numpy)")
+    try:
+        db = duckdb.connect(path)
+    except Exception as exc:
+        raise SystemExit(f"Failed to open snapshot {path}: {exc}")
+    db.execute(SNAPSHOT_SCHEMA_SQL)
+    return db
+
+
+def snapshot_source(conn) -> str:
+    info = conn.info
+    return f"{info.host}:{info.port}/{info.dbname}"
+
+
+def sync_snapshot(conn, db, itersize: int) -> Dict[str, object]:
+    """Bring the local snapshot up to date with storage.objects.
+
+    Only objects whose COALESCE(updated_at, created_at) is at or after the
+    stored high-water mark (minus SNAPSHOT_OVERLAP) are transferred and
+    upserted. After the upsert the snapshot holds every live audio object plus
+    any that were deleted (or stopped being audio) upstream; the difference in
+    row counts tells whether an id-only pass is needed to prune them.
+    All buckets are synced regardless of --bucket so the snapshot stays whole.
+    """
+    source = snapshot_source(conn)
+    state = db.execute("SELECT source, high_water::VARCHAR FROM audio_snapshot_state").fetchone()
+    full = state is None or state[0] != source
+    high_water = None if full else state[1]
+
+    where_sql, where_params = audio_where_clause(None)
+    params = where_params
+    changed_sql = f"""
+    SELECT
+      id::text,
+      bucket_id,
+      name,
+      COALESCE((metadata->>'size')::bigint, 0) AS size_bytes,
+      COALESCE(metadata->>'mimetype', '') AS mimetype,
+      COALESCE(updated_at, created_at)::text AS changed_at
+    FROM storage.objects
+    WHERE {where_sql}
+    """
+    if high_water is not None:
+        changed_sql += "\n    AND COALESCE(updated_at, created_at) >= %s::timestamptz - %s::interval"
+        params = params + (high_water, SNAPSHOT_OVERLAP)
+
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    db.execute("BEGIN TRANSACTION")
+    try:
+        if full:
+            db.execute("DELETE FROM audio_objects")
+        changed = 0
+        with storage_query():
+            with conn.cursor(name="audio_snapshot_scan") as cur:
+                cur.itersize = itersize
+                cur.execute(changed_sql, params)
+                while True:
+                    batch = cur.fetchmany(itersize)
+                    if not batch:
+                        break
+                    ids, buckets, names, sizes, mimes, changed_at = zip(*batch)
+                    db.register(
+                        "snapshot_batch",
+                        {
+                            "id": np.array(ids, dtype=object),
+                            "bucket_id": np.array(buckets, dtype=object),
+                            "name": np.array(names, dtype=object),
+                            "size_bytes": np.array(sizes, dtype=np.int64),
+                            "mimetype": np.array(mimes, dtype=object),
+                            "changed_at": np.array(changed_at, dtype=object),
+                        },
+                    )
+                    db.execute(
+                        "INSERT OR REPLACE INTO audio_objects "
+                        "SELECT id, bucket_id, name, size_bytes, mimetype, changed_at::TIMESTAMPTZ FROM snapshot_batch"
+                    )
+                    db.unregister("snapshot_batch")
+                    changed += len(batch)
+
+        deleted = 0
+        if not full:
+            with storage_query():
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT count(*) FROM storage.objects WHERE {where_sql}", where_params)
+                    live_count = cur.fetchone()[0]
+            local_count = db.execute("SELECT count(*) FROM audio_objects").fetchone()[0]
+            if local_count != live_count:
+                deleted = prune_snapshot(conn, db, itersize)
+
+        db.execute("DELETE FROM audio_snapshot_state")
+        db.execute(
+            "INSERT INTO audio_snapshot_state SELECT ?, max(changed_at), now() FROM audio_objects",
+            [source],
+        )
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    finally:
+        conn.rollback()
+
+    return {"full": full, "changed": changed, "deleted": deleted}
+
+
+def prune_snapshot(conn, db, itersize: int) -> int:
+    """Drop snapshot rows whose id no longer exists upstream (ids only are transferred)."""
+    where_sql, params = audio_where_clause(None)
+    db.execute("CREATE OR REPLACE TEMP TABLE live_ids (id VARCHAR)")
+    with storage_query():
+        with conn.cursor(name="audio_snapshot_ids") as cur:
+            cur.itersize = itersize
+            cur.execute(f"SELECT id::text FROM storage.objects WHERE {where_sql}", params)
+            while True:
+                batch = cur.fetchmany(itersize)
+                if not batch:
+                    break
+                db.register("id_batch", {"id": np.array([r[0] for r in batch], dtype=object)})
+                db.execute("INSERT INTO live_ids SELECT id FROM id_batch")
+                db.unregister("id_batch")
+    before = db.execute("SELECT count(*) FROM audio_objects").fetchone()[0]
+    db.execute("DELETE FROM audio_objects WHERE id NOT IN (SELECT id FROM live_ids)")
+    after = db.execute("SELECT count(*) FROM audio_objects").fetchone()[0]
+    db.execute("DROP TABLE live_ids")
+    return before - after
+
+
+def snapshot_table(db, bucket_filter: Optional[str]) -> SizeTable:
+    sql = "SELECT bucket_id, size_bytes FROM audio_objects"
+    params: List = []
+    if bucket_filter:
+        sql += " WHERE bucket_id = ?"
+        params.append(bucket_filter)
+    cols = db.execute(sql, params).fetchnumpy()
+    bucket_ids, codes = np.unique(np.asarray(cols["bucket_id"], dtype=object), return_inverse=True)
+    return SizeTable(np.asarray(cols["size_bytes"], dtype=np.int64), codes.astype(np.int32), [str(b) for b in bucket_ids])
+
+
+def iter_snapshot_rows(db, bucket_filter: Optional[str], batch_size: int) -> Iterator[FileRow]:
+    sql = "SELECT bucket_id, name, size_bytes, mimetype FROM audio_objects"
+    params: List = []
+    if bucket_filter:
+        sql += " WHERE bucket_id = ?"
+        params.append(bucket_filter)
+    cur = db.execute(sql, params)
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            break
+        for bucket_id, name, size_bytes, mimetype in batch:
+            yield FileRow(bucket_id=bucket_id, name=name, size_bytes=int(size_bytes), mimetype=mimetype)
+
+
+def incremental_summary(conn, args, bins: Sequence[int], sinks: Sequence) -> Summary:
+    db = open_snapshot(args.snapshot_db)
+    try:
+        stats = sync_snapshot(conn, db, args.itersize)
+        print(
+            f"Snapshot {args.snapshot_db}: {'full rebuild' if stats['full'] else 'incremental'}, "
+            f"{stats['changed']} fetched, {stats['deleted']} pruned",
+            file=sys.stderr,
+        )
+        summary = snapshot_table(db, args.bucket).summary(bins)
+        if sinks:
+            write_rows(sinks, iter_snapshot_rows(db, args.bucket, args.itersize), batch_size=args.itersize)
+        return summary
+    finally:
+        db.close()
+
+
+SketchKey = Tuple[str, str]  # (bucket_id, day)
+
+
+def fetch_server_sketches(conn, bucket_filter: Optional[str], relative_accuracy: float) -> Dict[SketchKey, DDSketch]:
+    """Build one DDSketch per (bucket_id, UTC creation day) from SQL-side binning.
+
+    Postgres computes each size's sketch key, so only (bucket, day, key)
+    counts are transferred; the keys line up with DDSketch.key() for the
+    same accuracy.
+    """
+    where_sql, params = audio_where_clause(bucket_filter)
+    sketch_sql = f"""
+    SELECT
+      bucket_id,
+      COALESCE(to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD'), 'unknown') AS day,
+      CASE WHEN size_bytes > 0 THEN ceil(ln(size_bytes) / %s)::int END AS key,
+      count(*),
+      sum(size_bytes)
+    FROM (
+      SELECT bucket_id, created_at, COALESCE((metadata->>'size')::bigint, 0) AS size_bytes
+      FROM storage.objects
+      WHERE {where_sql}
+    ) audio
+    GROUP BY 1, 2, 3
+    ;
+    """
+    sketches: Dict[SketchKey, DDSketch] = {}
+    log_gamma = DDSketch(relative_accuracy).log_gamma
+    with storage_query():
+        with conn.cursor() as cur:
+            cur.execute(sketch_sql, (log_gamma,) + params)
+            for bucket_id, day, key, count, total in cur.fetchall():
+                sketch = sketches.get((bucket_id, day))
+                if sketch is None:
+                    sketch = sketches[(bucket_id, day)] = DDSketch(relative_accuracy)
+                sketch.add_bin(key, int(count), int(total or 0))
+    return sketches
+
+
+def save_sketches(path: str, sketches: Dict[SketchKey, DDSketch], relative_accuracy: float) -> None:
+    data = {
+        "version": 1,
+        "relative_accuracy": relative_accuracy,
+        "sketches": [
+            dict(bucket_id=bucket_id, day=day, **sketch.to_dict())
+            for (bucket_id, day), sketch in sorted(sketches.items())
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_sketches(paths: Sequence[str]) -> Tuple[Dict[SketchKey, DDSketch], float]:
+    """Load and merge sketch files; equal (bucket, day) keys from different files are added together."""
+    sketches: Dict[SketchKey, DDSketch] = {}
+    relative_accuracy: Optional[float] = None
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise SystemExit(f"Failed to read sketch file {path}: {exc}")
+        if relative_accuracy is None:
+            relative_accuracy = float(data["relative_accuracy"])
+        elif not math.isclose(relative_accuracy, float(data["relative_accuracy"])):
+            raise SystemExit(f"Sketch file {path} uses accuracy {data['relative_accuracy']}, expected {relative_accuracy}")
+        for entry in data["sketches"]:
+            key = (entry["bucket_id"], entry["day"])
+            sketch = DDSketch.from_dict(entry)
+            if key in sketches:
+                sketches[key].merge(sketch)
+            else:
+                sketches[key] = sketch
+    return sketches, relative_accuracy or 0.01
+
+
+def print_sketch_report(sketches: Dict[SketchKey, DDSketch], relative_accuracy: float) -> None:
+    overall = DDSketch.merged(sketches.values(), relative_accuracy)
+    by_bucket: Dict[str, DDSketch] = {}
+    for (bucket_id, _day), sketch in sketches.items():
+        by_bucket.setdefault(bucket_id, DDSketch(relative_accuracy)).merge(sketch)
+    days = sorted({day for _bucket, day in sketches})
+
+    print_section(f"Sketch Percentiles (±{relative_accuracy * 100:.1f}% relative error)")
+    print(f"Files: {overall.count}")
+    print(f"Total Size: {format_bytes(overall.sum)}")
+    print(f"Average Size: {format_bytes(int(overall.sum / overall.count)) if overall.count else '0 B'}")
+    print(f"Days: {days[0]} .. {days[-1]} ({len(days)})" if days else "Days: none")
+    print("Percentiles:")
+    for k in Percentiles:
+        print(f"  p{int(k*100)}: {format_bytes(overall.quantile(k))}")
+
+    print_section("Per-Bucket Percentiles")
+    for bucket_id, sketch in sorted(by_bucket.items(), key=lambda kv: kv[1].sum, reverse=True):
+        pct = " | ".join(f"p{int(k*100)}={format_bytes(sketch.quantile(k))}" for k in Percentiles)
+        print(f"- bucket_id={bucket_id} | files={sketch.count} | total={format_bytes(sketch.sum)} | {pct}")
+
+
+def scan(args: argparse.Namespace, bins: Sequence[int], sinks: Sequence) -> Tuple[Optional[List[FileRow]], Optional[Summary], Optional[Dict[SketchKey, DDSketch]]]:
+    """Run the selected scan mode; returns (rows, summary, sketches), unused parts None.
+
+    --stream and --incremental drain into `sinks` while scanning; the row scan
+    leaves that to the caller.
+    """
+    rows = summary = sketches = None
+    if args.workers > 1:
+        if not args.dsn:
+            raise SystemExit("Missing DSN. Provide --dsn or set $DATABASE_URL")
+        scanner = PartitionedScanner(args.dsn, args.workers)
+        try:
+            if args.server_agg:
+                summary = scanner.fetch_server_summary(args.bucket, bins)
+            else:
+                rows = scanner.fetch_audio_files(args.bucket)
+        finally:
+            scanner.close()
+        return rows, summary, sketches
+
     conn = connect(args.dsn)
     try:
-        rows = fetch_audio_files(conn, args.bucket)
+        if args.sketch:
+            sketches = fetch_server_sketches(conn, args.bucket, args.sketch_accuracy)
+        elif args.server_agg:
+            summary = fetch_server_summary(conn, args.bucket, bins)
+        elif args.stream:
+            summary = stream_summary(conn, args.bucket, bins, args.itersize, sinks)
+        elif args.incremental:
+            summary = incremental_summary(conn, args, bins, sinks)
+        else:
+            rows = fetch_audio_files(conn, args.bucket)
     finally:
         conn.close()
+    return rows, summary, sketches
+
+
+def main() -> None:
+    args = parse_args()
+    bins = parse_bins(args.bins)
+
+    if args.sketch_merge:
+        sketches, relative_accuracy = load_sketches(args.sketch_merge)
+        if not sketches:
+            print("No sketches found in the given files.")
+            return
+        print_sketch_report(sketches, relative_accuracy)
+        return
+
+    # Opened up front so a missing pyarrow/duckdb fails before a long scan.
+    sinks = open_sinks(args)
+    try:
+        rows, summary, sketches = scan(args, bins, sinks)
+    except BaseException:
+        close_sinks(sinks)
+        raise
+
+    if args.sketch:
+        if not sketches:
+            print("No audio files found in storage.objects.")
+            return
+        print_sketch_report(sketches, args.sketch_accuracy)
+        if args.sketch_out:
+            save_sketches(args.sketch_out, sketches, args.sketch_accuracy)
+            print(f"\nSaved sketches: {args.sketch_out}")
+        return
+
+    if args.server_agg or args.stream or args.incremental:
+        if not summary.count:
+            print("No audio files found in storage.objects.")
+            return
+        print_report(summary, bins)
+        print_saved(sinks)
+        return
 
     if not rows:
+        close_sinks(sinks)
         print("No audio files found in storage.objects.")
         return
 
     analyze(rows, bins)
 
-    if args.output_csv:
-        write_csv(args.output_csv, rows)
+    if sinks:
+        write_rows(sinks, rows)
+        print_saved(sinks)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for discourse_markers.py.
+
+Builds a synthetic corpus per language from the marker lists themselves
+(markers mixed with filler words/characters) and reports texts/sec for:
+  per-phrase  one regex per phrase, as src/lib/answerkey/generate.ts does
+  automaton   MarkerScanner.scan (one pass per text)
+plus scanner build time vs loading the serialized scanners, and a check
+that both methods find the same number of markers.
+
+Usage examples:
+  python scripts/bench_discourse_markers.py
+  python scripts/bench_discourse_markers.py --texts 50000 --words 80
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+import unicodedata
+from typing import Dict, List, Sequence
+
+from discourse_markers import LEXICON_DIR, REGEX_META, WORD_LANGS, build_scanners, dump_scanners, lexicon_paths, load_scanners_bytes
+
+FILLER = {
+    "en": "the cat sat near a window and looked at people walking past know nowhere thenceforth".split(),
+    "ja": list("私は毎日駅まで歩いて行きます雨が降っても"),
+    "zh": list("我每天走路去车站即使下雨也要去买东西"),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark single-pass discourse-marker scanning")
+    parser.add_argument("--texts", type=int, default=20_000, help="Texts per language (default: 20000)")
+    parser.add_argument("--words", type=int, default=40, help="Tokens per text (default: 40)")
+    parser.add_argument("--marker-rate", type=float, default=0.1, help="Share of tokens that are markers (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def corpus(lang: str, lexicon: Dict[str, List[str]], n: int, words: int, rate: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    markers = [e for entries in lexicon.values() for e in entries if not REGEX_META.search(e)]
+    sep = " " if lang in WORD_LANGS else ""
+    return [
+        sep.join(rng.choice(markers) if rng.random() < rate else rng.choice(FILLER[lang]) for _ in range(words)) for _ in range(n)
+    ]
+
+
+def per_phrase_count(texts: Sequence[str], lang: str, lexicon: Dict[str, List[str]]) -> int:
+    """generate.ts pass1/pass2 style: a separate regex search per phrase (word-bounded, case-insensitive for en)."""
+    regexes = []
+    for entries in lexicon.values():
+        for entry in entries:
+            pattern = entry if REGEX_META.search(entry) else re.escape(entry)
+            if lang in WORD_LANGS:
+                regexes.append(re.compile(rf"(?<!\w)(?:{pattern})(?!\w)", re.IGNORECASE))
+            else:
+                regexes.append(re.compile(pattern))
+    total = 0
+    for text in texts:
+        text = unicodedata.normalize("NFKC", text)
+        for regex in regexes:
+            for _ in regex.finditer(text):
+                total += 1
+    return total
+
+
+def main() -> None:
+    args = parse_args()
+    started = time.perf_counter()
+    scanners = build_scanners(LEXICON_DIR)
+    built = time.perf_counter() - started
+    data = dump_scanners(scanners)
+    started = time.perf_counter()
+    load_scanners_bytes(data)
+    loaded = time.perf_counter() - started
+    print(f"Scanners: built in {built * 1000:.1f}ms, loaded from {len(data):,} bytes in {loaded * 1000:.1f}ms")
+    print()
+
+    print(f"{'lang':<5} {'method':<11} {'texts':>7} {'seconds':>8} {'texts/s':>10} {'markers':>9}")
+    for lang, path in lexicon_paths(LEXICON_DIR).items():
+        with open(path, "r", encoding="utf-8") as f:
+            lexicon = json.load(f)
+        texts = corpus(lang, lexicon, args.texts, args.words, args.marker_rate, args.seed)
+        started = time.perf_counter()
+        naive = per_phrase_count(texts, lang, lexicon)
+        naive_s = time.perf_counter() - started
+        scanner = scanners[lang]
+        started = time.perf_counter()
+        found = sum(sum(scanner.scan(t, spans=False)[0]) for t in texts)
+        auto_s = time.perf_counter() - started
+        print(f"{lang:<5} {'per-phrase':<11} {len(texts):>7} {naive_s:>8.2f} {len(texts) / naive_s:>10,.0f} {naive:>9,}")
+        print(f"{lang:<5} {'automaton':<11} {len(texts):>7} {auto_s:>8.2f} {len(texts) / auto_s:>10,.0f} {found:>9,}")
+        if naive != found:
+            print(f"      marker counts differ: per-phrase {naive:,} vs automaton {found:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for dkvmn.py.
+
+Generates synthetic learners with ragged interaction sequences (log-normal
+lengths) over a random DKVMN of the usual sizes. It reports
+interactions/sec for:
+  per-learner  one learner at a time (batch of 1), timed on a subset
+  batched      DKVMN.run over --batch-sizes learners at a time
+  incremental  resuming from value-memory snapshots taken after the first
+               80% of each history, vs replaying full histories
+It also checks that batched predictions match the per-learner ones, and
+that the resumed memories match the replayed ones.
+
+Usage examples:
+  python scripts/bench_dkvmn.py
+  python scripts/bench_dkvmn.py --learners 20000 --mean-length 200 --batch-sizes 256 1024 4096
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from dkvmn import DKVMN
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark batched DKVMN inference")
+    parser.add_argument("--learners", type=int, default=2_000)
+    parser.add_argument("--mean-length", type=float, default=100, help="Mean interactions per learner (default: 100)")
+    parser.add_argument("--skills", type=int, default=100)
+    parser.add_argument("--memory-size", type=int, default=20)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 512])
+    parser.add_argument("--per-learner", type=int, default=100, help="Learners timed one at a time (default: 100)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def synthetic_sequences(n: int, mean_length: float, n_skills: int, seed: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    rng = np.random.default_rng(seed)
+    sigma = 0.8
+    lengths = np.maximum(1, rng.lognormal(np.log(mean_length) - sigma**2 / 2, sigma, n).astype(np.int64))
+    skills = [rng.integers(0, n_skills, k) for k in lengths]
+    correct = [(rng.random(k) < 0.65).astype(np.int64) for k in lengths]
+    return skills, correct
+
+
+def run_batched(model: DKVMN, skills: Sequence[np.ndarray], correct: Sequence[np.ndarray], states: np.ndarray, batch_size: int) -> List[np.ndarray]:
+    preds: List[np.ndarray] = []
+    for start in range(0, len(skills), batch_size):
+        batch = slice(start, start + batch_size)
+        chunk = states[batch]
+        preds.extend(model.run(skills[batch], correct[batch], chunk))
+        states[batch] = chunk
+    return preds
+
+
+def main() -> None:
+    args = parse_args()
+    model = DKVMN.random([f"skill{i}" for i in range(args.skills)], memory_size=args.memory_size, seed=args.seed)
+    skills, correct = synthetic_sequences(args.learners, args.mean_length, args.skills, args.seed)
+    lengths = np.array([len(q) for q in skills])
+    total = int(lengths.sum())
+    print(
+        f"Learners: {len(skills):,}, interactions: {total:,} (length median {int(np.median(lengths))}, max {lengths.max()}); "
+        f"memory {model.memory_size} x {model.value_dim}, {args.skills} skills"
+    )
+    print()
+    print(f"{'method':<20} {'interactions':>12} {'seconds':>8} {'interactions/s':>15}")
+
+    subset = min(args.per_learner, len(skills))
+    states = model.initial_states(subset)
+    started = time.perf_counter()
+    single = [model.run([skills[i]], [correct[i]], states[i : i + 1])[0] for i in range(subset)]
+    single_s = time.perf_counter() - started
+    n_single = int(lengths[:subset].sum())
+    print(f"{'per-learner':<20} {n_single:>12,} {single_s:>8.2f} {n_single / single_s:>15,.0f}")
+
+    for batch_size in args.batch_sizes:
+        states = model.initial_states(len(skills))
+        started = time.perf_counter()
+        preds = run_batched(model, skills, correct, states, batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"{f'batched ({batch_size})':<20} {total:>12,} {elapsed:>8.2f} {total / elapsed:>15,.0f}")
+    diff = max(np.abs(preds[i] - single[i]).max() for i in range(subset))
+
+    # Snapshot after 80% of each history, then apply the rest
+    batch_size = args.batch_sizes[-1]
+    cut = [int(len(q) * 0.8) for q in skills]
+    snapshot = model.initial_states(len(skills))
+    run_batched(model, [q[:k] for q, k in zip(skills, cut)], [c[:k] for c, k in zip(correct, cut)], snapshot, batch_size)
+    new_skills = [q[k:] for q, k in zip(skills, cut)]
+    new_correct = [c[k:] for c, k in zip(correct, cut)]
+    n_new = sum(len(q) for q in new_skills)
+    pending = np.array([len(q) > 0 for q in new_skills])
+    resumed = snapshot[pending]
+    started = time.perf_counter()
+    run_batched(model, [q for q in new_skills if len(q)], [c for c in new_correct if len(c)], resumed, batch_size)
+    resume_s = time.perf_counter() - started
+    snapshot[pending] = resumed
+    replayed = model.initial_states(len(skills))
+    started = time.perf_counter()
+    run_batched(model, skills, correct, replayed, batch_size)
+    replay_s = time.perf_counter() - started
+    print(f"{'incremental (20%)':<20} {n_new:>12,} {resume_s:>8.2f} {n_new / resume_s:>15,.0f}  vs full replay {replay_s:.2f}s")
+    print()
+    print(f"Max |batched - per-learner| prediction: {diff:.2e}")
+    print(f"Max |resumed - replayed| memory: {np.abs(snapshot - replayed).max():.2e}")
+    mastery = model.mastery(replayed[:batch_size])
+    print(f"Mastery table for {mastery.shape[0]} learners: {mastery.shape[0]} x {mastery.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
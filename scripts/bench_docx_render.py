@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for docx_render.py on a synthetic long paper.
+
+Generates a ~500-page document (chapters, sections, body paragraphs with
+inline Markdown, lists, captions, math and code blocks) in both source
+formats, then times each rule set:
+  mp0       Markdown -> DOCX
+  chapter   plain text -> DOCX
+  reformat  re-apply the thesis layout to the chapter output (direct
+            formatting, then named styles via --styles)
+  mp0 incremental builds with the section fragment cache: cold cache,
+  unchanged source, and one edited paragraph in the middle of the paper
+
+Before timing, it checks that reformat overrides existing toggles (a
+bold=False/italic=False heading run comes out bold) in both
+direct-formatting and --styles modes.
+
+Reports tokenize/render/save time, blocks/sec, pages/sec and output size.
+
+Usage examples:
+  python scripts/bench_docx_render.py
+  python scripts/bench_docx_render.py --pages 1000 --keep-dir /tmp/docx-bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List, Tuple
+
+import docx
+
+from docx_render import RULE_SETS, reformat_document, render_blocks, render_incremental, tokenize
+
+WORDS = (
+    "learner vocabulary model retention review interval sentence corpus shadowing pronunciation "
+    "feedback score adaptive memory probability exposure frequency context level difficulty "
+    "session accuracy estimate knowledge tracing attention parameter update item response"
+).split()
+
+# Rough layout: 12pt single-spaced body ~ 500 words per page
+WORDS_PER_PAGE = 500
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark docx_render.py on a synthetic long paper")
+    parser.add_argument("--pages", type=int, default=500, help="Approximate page count (default: 500)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep-dir", type=str, default=None, help="Keep generated sources and outputs here")
+    return parser.parse_args()
+
+
+def sentence(rng: random.Random, markdown: bool) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(10, 22))]
+    if markdown and rng.random() < 0.4:
+        i = rng.randrange(len(words))
+        words[i] = rng.choice(("**{}**", "*{}*", "`{}`", "$p_{{{}}}$", "[{}](https://example.org)")).format(words[i])
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_paper(pages: int, seed: int) -> Tuple[str, str]:
+    """Return (markdown, chapter_text) with the same structure."""
+    rng = random.Random(seed)
+    md: List[str] = ["# Design and Development of an Adaptive Language Learning Platform", ""]
+    txt: List[str] = ["Design and Development of an Adaptive Language Learning Platform", "Master Report", ""]
+    words = 0
+    chapter = 0
+    while words < pages * WORDS_PER_PAGE:
+        chapter += 1
+        md += [f"## Chapter {chapter} Overview", ""]
+        txt += [f"Chapter {chapter} Overview", ""]
+        for section in range(1, 6):
+            md += [f"### {chapter}.{section} Section title", ""]
+            txt += [f"{chapter}.{section} Section title", ""]
+            for sub in range(1, 3):
+                md += [f"#### {chapter}.{section}.{sub} Subsection", ""]
+                txt += [f"{chapter}.{section}.{sub} Subsection", ""]
+                for _ in range(4):
+                    para_md = " ".join(sentence(rng, True) for _ in range(6))
+                    para_txt = " ".join(sentence(rng, False) for _ in range(6))
+                    md += [para_md, ""]
+                    txt += [para_txt, ""]
+                    words += len(para_txt.split())
+                bullets = [sentence(rng, True) for _ in range(3)]
+                md += [f"- {b}" for b in bullets] + [""]
+                md += [f"{i}. {b}" for i, b in enumerate(bullets, 1)] + [""]
+                txt += bullets + [""]
+            md += ["$$ P(L_t) = P(L_{t-1}) + (1 - P(L_{t-1})) P(T) $$", "", f"**[Figure {chapter}.{section}] Retention curve**", ""]
+            code = ["```ts", "export function update(state: State): State {", "  return { ...state, seen: state.seen + 1 };", "}", "```", ""]
+            md += code
+            txt += [line.strip() for line in code]
+            words += 40
+    md += ["## Bibliography", "", "1. Settles, B. (2016). A trainable spaced repetition model.", ""]
+    txt += ["Bibliography", "", "Settles, B. (2016). A trainable spaced repetition model.", "", "Appendix", ""]
+    txt += ["import numpy as np", "def update(state): return state", "Plain appendix note."]
+    return "\n".join(md), "\n".join(txt)
+
+
+def bench_text(rules_name: str, source: str, out_path: str) -> dict:
+    rules = RULE_SETS[rules_name]
+    t0 = time.perf_counter()
+    blocks = list(tokenize(source, rules))
+    t1 = time.perf_counter()
+    doc = docx.Document()
+    if rules.setup is not None:
+        rules.setup(doc)
+    render_blocks(doc, blocks)
+    if rules.finish is not None:
+        rules.finish(doc)
+    t2 = time.perf_counter()
+    doc.save(out_path)
+    t3 = time.perf_counter()
+    return {"blocks": len(blocks), "tokenize": t1 - t0, "render": t2 - t1, "save": t3 - t2}
+
+
+def bench_incremental(source: str, cache_dir: str, out_path: str) -> dict:
+    t0 = time.perf_counter()
+    doc, reused, rendered = render_incremental(source, RULE_SETS["mp0"], cache_dir)
+    t1 = time.perf_counter()
+    doc.save(out_path)
+    t2 = time.perf_counter()
+    return {"blocks": len(doc.paragraphs), "reused": reused, "rendered": rendered, "render": t1 - t0, "save": t2 - t1}
+
+
+def edit_one_paragraph(md: str) -> str:
+    lines = md.split("\n")
+    middle = len(lines) // 2
+    i = next(i for i in range(middle, len(lines)) if lines[i] and lines[i][0].isalpha())
+    lines[i] = "Edited. " + lines[i]
+    return "\n".join(lines)
+
+
+def bench_reformat(in_path: str, out_path: str, styles: bool) -> dict:
+    t0 = time.perf_counter()
+    doc = docx.Document(in_path)
+    t1 = time.perf_counter()
+    reformat_document(doc, styles=styles)
+    t2 = time.perf_counter()
+    doc.save(out_path)
+    t3 = time.perf_counter()
+    return {"blocks": len(doc.paragraphs), "load": t1 - t0, "render": t2 - t1, "save": t3 - t2}
+
+
+def check_reformat_toggles(styles: bool) -> None:
+    """Headings start as explicit bold=False/italic=False runs and must come out bold; body emphasis is kept."""
+    cases = [("Design and Development of a Tutor", False, True), ("Chapter 1 Introduction", False, True),
+             ("Appendix", False, True), ("Body text.", True, True), ("More body text.", False, False)]
+    doc = docx.Document()
+    for text, bold, _ in cases:
+        run = doc.add_paragraph().add_run(text)
+        run.bold, run.italic = bold, False
+    reformat_document(doc, styles=styles)
+    for para, (text, _, want) in zip(doc.paragraphs, cases):
+        run = para.runs[0]
+        bold = run.bold if run.bold is not None else bool(para.style.font.bold)
+        if bold != want or run.italic is not False:
+            raise SystemExit(f"reformat (styles={styles}) left stale toggles on {text!r}: bold={bold}, italic={run.italic}")
+
+
+def main() -> None:
+    args = parse_args()
+    for styles in (False, True):
+        check_reformat_toggles(styles)
+    out_dir = args.keep_dir or tempfile.mkdtemp(prefix="docx-bench-")
+    os.makedirs(out_dir, exist_ok=True)
+    md, txt = synthetic_paper(args.pages, args.seed)
+    with open(os.path.join(out_dir, "paper.md"), "w", encoding="utf-8") as f:
+        f.write(md)
+    with open(os.path.join(out_dir, "paper.txt"), "w", encoding="utf-8") as f:
+        f.write(txt)
+    print(f"Synthetic paper: ~{args.pages} pages, {len(md.splitlines())} Markdown lines, {len(txt.splitlines())} text lines")
+    print()
+
+    runs = [
+        ("mp0", bench_text("mp0", md, os.path.join(out_dir, "mp0.docx")), os.path.join(out_dir, "mp0.docx")),
+        ("chapter", bench_text("chapter", txt, os.path.join(out_dir, "chapter.docx")), os.path.join(out_dir, "chapter.docx")),
+    ]
+    for name, styles in (("reformat", False), ("reformat+styles", True)):
+        path = os.path.join(out_dir, f"{name}.docx")
+        runs.append((name, bench_reformat(runs[1][2], path, styles), path))
+    cache_dir = os.path.join(out_dir, "fragments")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    for name, source in (("mp0 cold", md), ("mp0 warm", md), ("mp0 1 edit", edit_one_paragraph(md))):
+        path = os.path.join(out_dir, "mp0-incremental.docx")
+        runs.append((name, bench_incremental(source, cache_dir, path), path))
+
+    print(f"{'rules':<16} {'blocks':>8} {'phases':<44} {'total':>8} {'blocks/s':>10} {'pages/s':>8} {'size':>9}")
+    for name, stats, path in runs:
+        phases = {k: v for k, v in stats.items() if isinstance(v, float)}
+        total = sum(phases.values())
+        phase_text = " ".join(f"{k}={v:.2f}s" for k, v in phases.items())
+        if "reused" in stats:
+            phase_text += f" ({stats['reused']}/{stats['reused'] + stats['rendered']} reused)"
+        print(
+            f"{name:<16} {stats['blocks']:>8} {phase_text:<44} {total:>7.2f}s {stats['blocks'] / total:>10,.0f} "
+            f"{args.pages / total:>8.1f} {os.path.getsize(path) / 1024:>7.0f}KB"
+        )
+    print(f"\nOutputs in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Startup and lookup benchmark for the compiled lexicon (lexicon.py).
+
+Reports:
+  startup   time until a worker can answer lookups: parsing every source into
+            dicts (what lexProfileAnalyzer.ts / wordFrequency.ts do on load)
+            vs mapping the compiled file
+  lookups   rank + level lookups/sec on a token stream drawn from the
+            lexicon plus unknown words: dict, Lexicon single, Lexicon batched
+
+Usage examples:
+  python scripts/bench_lexicon.py
+  python scripts/bench_lexicon.py --tokens 1000000 --unknown 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List
+
+from lexicon import LEVEL_SOURCES, RANK_SOURCES, VOCAB_DIR, Lexicon, compile_lexicon, read_levels, read_ranks
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark compiled lexicon startup and lookups")
+    parser.add_argument("--tokens", type=int, default=300_000, help="Lookup workload size (default: 300000)")
+    parser.add_argument("--unknown", type=float, default=0.2, help="Share of words not in the lexicon (default: 0.2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Startup repetitions, best is reported (default: 5)")
+    parser.add_argument("--column", type=str, default="en/default")
+    parser.add_argument("--lang", type=str, default="en")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def parse_sources() -> tuple:
+    ranks = {lang: read_ranks(paths) for lang, paths in RANK_SOURCES.items()}
+    levels = {name: read_levels(os.path.join(VOCAB_DIR, f)) for name, (f, _) in LEVEL_SOURCES.items()}
+    return ranks, levels
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def open_lexicon(path: str) -> None:
+    lex = Lexicon(path)
+    lex.rank("the")
+    lex.close()
+
+
+def main() -> None:
+    args = parse_args()
+    path = os.path.join(tempfile.mkdtemp(prefix="lexicon-bench-"), "lexicon.bin")
+    started = time.perf_counter()
+    meta = compile_lexicon(path)
+    print(f"Compiled {meta['count']:,} words ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - started:.2f}s")
+    print()
+
+    parse = best_of(parse_sources, args.repeat)
+    mapped = best_of(lambda: open_lexicon(path), args.repeat)
+    print(f"{'startup':<10} {'seconds':>9}")
+    print(f"{'parse':<10} {parse:>9.4f}")
+    print(f"{'mmap':<10} {mapped:>9.4f}   ({parse / mapped:,.0f}x)")
+    print()
+
+    ranks, levels = parse_sources()
+    rank_map, level_map = ranks[args.lang], levels[args.column]
+    lex = Lexicon(path)
+    rng = random.Random(args.seed)
+    known = [lex.word(i) for i in range(len(lex))]
+    tokens: List[str] = [
+        f"{rng.choice(known)}~{rng.randrange(1000)}" if rng.random() < args.unknown else rng.choice(known)
+        for _ in range(args.tokens)
+    ]
+
+    def by_dict() -> None:
+        [(rank_map.get(w, 0), level_map.get(w)) for w in tokens]
+
+    def by_single() -> None:
+        [(lex.rank(w, args.lang), lex.level(w, args.column)) for w in tokens]
+
+    def by_batch() -> None:
+        ids = lex.word_ids(tokens)
+        rank_col, level_col = lex.column(f"rank.{args.lang}"), lex.column(f"level.{args.column}")
+        [(rank_col[i], level_col[i]) if i >= 0 else (0, 0) for i in ids]
+
+    print(f"{'lookups':<10} {'seconds':>9} {'tokens/s':>12}")
+    for name, fn in (("dict", by_dict), ("single", by_single), ("batched", by_batch)):
+        elapsed = best_of(fn, 1)
+        print(f"{name:<10} {elapsed:>9.3f} {len(tokens) / elapsed:>12,.0f}")
+    lex.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
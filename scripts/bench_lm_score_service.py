@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for lm_score_service.py.
+
+Builds a synthetic workload from the sentence bank (original sentences plus
+shuffled variants with unseen words) and reports sentences/sec for:
+  direct    Scorer.score_batch on the whole workload (the scoring floor)
+  service   POST /score through the FastAPI app in-process (raw ASGI calls,
+            no sockets or HTTP client, so only the service's own cost is
+            measured) with N concurrent callers sending k sentences per
+            request; shows the mean micro-batch size formed
+
+Everything runs on one event loop plus the scoring thread, i.e. one core.
+
+Usage examples:
+  python scripts/bench_lm_score_service.py
+  python scripts/bench_lm_score_service.py --sentences 100000 --concurrency 1,64 --per-request 1,100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import List
+
+from lm_score_service import DEFAULT_MODEL, Scorer, create_app, load_sentences
+
+DEFAULT_BANK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "english-sentences.json")
+UNSEEN_WORDS = ("zyxel", "quokka", "flibbert", "norvane", "trellick")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark lm_score_service.py scoring throughput")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL)
+    parser.add_argument("--bank", type=str, default=DEFAULT_BANK)
+    parser.add_argument("--sentences", type=int, default=50_000, help="Workload size (default: 50000)")
+    parser.add_argument("--concurrency", type=str, default="1,16,64", help="Concurrent callers (default: 1,16,64)")
+    parser.add_argument("--per-request", type=str, default="1,32", help="Sentences per request (default: 1,32)")
+    parser.add_argument("--max-wait-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def workload(bank: List[str], n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        text = rng.choice(bank)
+        if rng.random() < 0.5:
+            words = text.split()
+            rng.shuffle(words)
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(UNSEEN_WORDS))
+            text = " ".join(words)
+        out.append(text)
+    return out
+
+
+async def asgi_post(app, path: str, body: bytes) -> bytes:
+    """One HTTP request straight into the ASGI app."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive() -> dict:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}: {b''.join(chunks)[:200]!r}")
+    return b"".join(chunks)
+
+
+async def bench_service(scorer: Scorer, sentences: List[str], concurrency: int, per_request: int, max_wait_ms: float) -> dict:
+    app = create_app(scorer, max_wait_ms=max_wait_ms)
+    bodies = [
+        json.dumps({"sentences": sentences[i : i + per_request]}).encode() for i in range(0, len(sentences), per_request)
+    ]
+    async with app.router.lifespan_context(app):
+
+        async def caller(worker: int) -> None:
+            for body in bodies[worker::concurrency]:
+                await asgi_post(app, "/score", body)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(caller(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    batcher = app.state.batcher
+    return {"seconds": elapsed, "requests": len(bodies), "mean_batch": batcher.sentences / max(batcher.batches, 1)}
+
+
+def main() -> None:
+    args = parse_args()
+    bank = [r["text"] for r in load_sentences(args.bank)]
+    sentences = workload(bank, args.sentences, args.seed)
+    started = time.perf_counter()
+    scorer = Scorer(args.model)
+    print(f"Model {os.path.basename(args.model)} loaded in {time.perf_counter() - started:.3f}s; {len(sentences):,} sentences")
+    print()
+
+    started = time.perf_counter()
+    scores = scorer.score_batch(sentences)
+    direct = time.perf_counter() - started
+    oov = sum(s["oov"] for s in scores) / max(sum(s["tokens"] for s in scores), 1)
+    print(f"{'mode':<8} {'callers':>8} {'per req':>8} {'seconds':>8} {'sent/s':>10} {'req/s':>9} {'mean batch':>11}")
+    print(f"{'direct':<8} {'-':>8} {'-':>8} {direct:>8.2f} {len(sentences) / direct:>10,.0f} {'-':>9} {len(sentences):>11,}")
+    for per_request in (int(x) for x in args.per_request.split(",")):
+        for concurrency in (int(x) for x in args.concurrency.split(",")):
+            r = asyncio.run(bench_service(scorer, sentences, concurrency, per_request, args.max_wait_ms))
+            print(
+                f"{'service':<8} {concurrency:>8} {per_request:>8} {r['seconds']:>8.2f} {len(sentences) / r['seconds']:>10,.0f} "
+                f"{r['requests'] / r['seconds']:>9,.0f} {r['mean_batch']:>11.1f}"
+            )
+    print(f"\nWorkload OOV rate {oov:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for generate_paper_charts.py --batch.
+
+Builds a synthetic audio_objects snapshot in a temporary DuckDB file (the
+same inventory generator as bench_analyze_audio_sizes.py, with tts names
+under a language prefix and recordings/pronunciation under per-user
+prefixes), then reports charts/sec for:
+  reuse   one Figure/Axes updated in place for every chart (batch mode)
+  fresh   a new plt.subplots figure per chart (the old approach)
+
+Usage examples:
+  python scripts/bench_paper_charts.py
+  python scripts/bench_paper_charts.py --rows 1000000 --users 500 --fresh-limit 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from analyze_audio_sizes import histogram_labels, parse_bins
+from bench_analyze_audio_sizes import load_duckdb
+from generate_paper_charts import CHART_DIMENSIONS, DEFAULT_BINS, load_distributions, render_distributions
+
+LANGUAGES = ("zh", "en", "ja", "ko", "fr", "es")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark batch distribution charts")
+    parser.add_argument("--rows", type=int, default=200_000, help="Synthetic objects (default: 200000)")
+    parser.add_argument("--users", type=int, default=200, help="Distinct user prefixes (default: 200)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--format", type=str, default="png", choices=("png", "svg", "pdf"))
+    parser.add_argument("--fresh-limit", type=int, default=50, help="Charts rendered by the fresh baseline (default: 50)")
+    parser.add_argument("--keep-dir", type=str, default=None, help="Keep the database and charts here")
+    return parser.parse_args()
+
+
+def build_snapshot(path: str, rows: int, users: int, seed: int) -> None:
+    import duckdb
+
+    load_duckdb(path, rows, seed)
+    langs = ", ".join(f"'{lang}'" for lang in LANGUAGES)
+    db = duckdb.connect(path)
+    db.execute(
+        f"""
+        UPDATE audio_objects SET name = CASE
+          WHEN bucket_id = 'tts' THEN ([{langs}])[1 + (hash(id) % {len(LANGUAGES)})::INTEGER]
+          ELSE 'user-' || (hash(id) % {users})::VARCHAR
+        END || '/' || name
+        """
+    )
+    db.close()
+
+
+def main() -> None:
+    args = parse_args()
+    out_dir = args.keep_dir or tempfile.mkdtemp(prefix="chart-bench-")
+    os.makedirs(out_dir, exist_ok=True)
+    db_path = os.path.join(out_dir, "analytics.duckdb")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    t0 = time.perf_counter()
+    build_snapshot(db_path, args.rows, args.users, args.seed)
+    t1 = time.perf_counter()
+    bins = parse_bins(DEFAULT_BINS)
+    labels = histogram_labels(bins)
+    charts = load_distributions(db_path, bins, list(CHART_DIMENSIONS))
+    t2 = time.perf_counter()
+    print(f"Snapshot: {args.rows:,} objects in {t1 - t0:.2f}s; {len(charts)} charts queried in {t2 - t1:.2f}s")
+    print()
+
+    runs = [("reuse", charts, True), ("fresh", charts[: args.fresh_limit], False)]
+    print(f"{'figures':<8} {'charts':>7} {'seconds':>8} {'charts/s':>9}")
+    rates = {}
+    for name, subset, reuse in runs:
+        started = time.perf_counter()
+        render_distributions(subset, labels, os.path.join(out_dir, name), [args.format], args.dpi, reuse=reuse)
+        elapsed = time.perf_counter() - started
+        rates[name] = len(subset) / elapsed
+        print(f"{name:<8} {len(subset):>7} {elapsed:>8.2f} {rates[name]:>9.1f}")
+    print(f"\nreuse/fresh: {rates['reuse'] / rates['fresh']:.1f}x   Outputs in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Discourse-marker counts (connectives, time expressions, pronouns) for a corpus.
+
+The marker lists in data/lexicon/{en,ja,zh}.json (the ones
+src/lib/answerkey/generate.ts matches one regex per phrase) are compiled
+into one Aho-Corasick automaton per language (aho_corasick.py), and each
+text is scanned once no matter how many phrases there are. A phrase listed
+under several categories counts once per category.
+
+Matching rules:
+  en      case-insensitive, whole words only (no "now" inside "know")
+  ja, zh  plain substring matching, since there are no spaces to anchor on
+Texts are NFKC-normalized first, as generate.ts does, and spans index the
+normalized text. Entries that are regexes rather than phrases (e.g.
+"于\\d{4}年\\d{1,2}月\\d{1,2}日") go into one compiled alternation per
+language, scanned after the automaton.
+
+The compiled scanners are cached in data/lexicon/markers.bin, keyed by a
+digest of the marker files. The batch CLI serializes them once and hands
+the bytes to every worker, so workers never rebuild them.
+
+Usage examples:
+  python scripts/discourse_markers.py --text "On the other hand, it rained today." --lang en
+  python scripts/discourse_markers.py --input items.jsonl --output /tmp/markers.jsonl --workers 4
+  python scripts/discourse_markers.py --input data/english-sentences.json --no-spans
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
+import marshal
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aho_corasick import AhoCorasick, is_word_char
+from lex_profile_batch import chunked, iter_duckdb, iter_jsonl, run_pool
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LEXICON_DIR = os.path.join(ROOT_DIR, "data", "lexicon")
+DEFAULT_CACHE = os.path.join(LEXICON_DIR, "markers.bin")
+LANGS = ("en", "ja", "zh")
+WORD_LANGS = ("en",)  # languages matched case-insensitively on word boundaries
+SERIAL_MAGIC = b"MARKERS1"
+REGEX_META = re.compile(r"[\\^$.|?*+()\[\]{}]")
+
+Span = Tuple[int, int, str, str]  # start, end, category, surface
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Count discourse markers in one pass per text")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--text", type=str, help="Scan one text and print its markers")
+    source.add_argument("--input", type=str, help="JSONL items, or a JSON bank with a sentences list")
+    source.add_argument("--db", type=str, help="DuckDB database to read items from (with --query)")
+    parser.add_argument("--query", type=str, default=None, help="SQL returning id, lang, text columns (with --db)")
+    parser.add_argument("--id-field", type=str, default="id", help="Item id field (default: id, else the line number)")
+    parser.add_argument("--text-field", type=str, default="text")
+    parser.add_argument("--lang-field", type=str, default="lang", help="Per-item language field; en-US etc. are cut to en")
+    parser.add_argument("--lang", type=str, default=None, help="Language for items without one")
+    parser.add_argument("--output", type=str, default="-", help="JSONL output (default: stdout)")
+    parser.add_argument("--no-spans", action="store_true", help="Only write per-category counts")
+    parser.add_argument("--lexicon-dir", type=str, default=LEXICON_DIR, help="Directory with en.json/ja.json/zh.json")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Compiled scanner cache (default: data/lexicon/markers.bin)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Items per task (default: 1000)")
+    args = parser.parse_args()
+    if args.db and not args.query:
+        parser.error("--db requires --query")
+    if args.text is not None and not args.lang:
+        parser.error("--text requires --lang")
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size and --workers must be >= 1")
+    return args
+
+
+class MarkerScanner:
+    """All marker categories of one language: an automaton for phrases plus one alternation for regex entries."""
+
+    def __init__(self, lang: str, lexicon: Dict[str, Sequence[str]]):
+        self.lang = lang
+        self.categories: List[str] = list(lexicon)
+        words = lang in WORD_LANGS
+        phrase_categories: Dict[str, List[int]] = {}
+        self.patterns: List[Tuple[str, int]] = []
+        for c, name in enumerate(self.categories):
+            for entry in lexicon[name]:
+                if REGEX_META.search(entry):
+                    self.patterns.append((entry, c))
+                else:
+                    cats = phrase_categories.setdefault(entry.lower() if words else entry, [])
+                    if c not in cats:
+                        cats.append(c)
+        self.automaton = AhoCorasick(phrase_categories, ignore_case=words, word_boundaries=words)
+        self.keyword_categories: List[Tuple[int, ...]] = [tuple(phrase_categories[k]) for k in self.automaton.keywords]
+        self._compile_patterns()
+
+    def _compile_patterns(self) -> None:
+        parts = [f"(?P<p{i}>{pattern})" for i, (pattern, _) in enumerate(self.patterns)]
+        flags = re.IGNORECASE if self.lang in WORD_LANGS else 0
+        self.pattern = re.compile("|".join(parts), flags) if parts else None
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps(
+            (self.lang, self.categories, self.automaton.to_bytes(), self.keyword_categories, self.patterns)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MarkerScanner":
+        self = cls.__new__(cls)
+        self.lang, self.categories, automaton, self.keyword_categories, self.patterns = marshal.loads(data)
+        self.automaton = AhoCorasick.from_bytes(automaton)
+        self._compile_patterns()
+        return self
+
+    def scan(self, text: str, spans: bool = True) -> Tuple[List[int], List[Span]]:
+        """Per-category counts (in self.categories order) and, if asked, spans sorted by position."""
+        text = unicodedata.normalize("NFKC", text)
+        counts = [0] * len(self.categories)
+        found: List[Span] = []
+        categories, keyword_categories = self.categories, self.keyword_categories
+        for start, end, idx in self.automaton.iter_matches(text):
+            for c in keyword_categories[idx]:
+                counts[c] += 1
+                if spans:
+                    found.append((start, end, categories[c], text[start:end]))
+        if self.pattern is not None:
+            words = self.lang in WORD_LANGS
+            for m in self.pattern.finditer(text):
+                start, end = m.span()
+                if words and ((start and is_word_char(text[start - 1])) or (end < len(text) and is_word_char(text[end]))):
+                    continue
+                c = self.patterns[int(m.lastgroup[1:])][1]
+                counts[c] += 1
+                if spans:
+                    found.append((start, end, categories[c], m.group()))
+        if spans:
+            found.sort()
+        return counts, found
+
+    def scan_batch(self, texts: Iterable[str], spans: bool = True) -> List[dict]:
+        out = []
+        for text in texts:
+            counts, found = self.scan(text, spans)
+            result = {"counts": dict(zip(self.categories, counts))}
+            if spans:
+                result["spans"] = found
+            out.append(result)
+        return out
+
+
+def lexicon_paths(lexicon_dir: str) -> Dict[str, str]:
+    paths = {lang: os.path.join(lexicon_dir, f"{lang}.json") for lang in LANGS}
+    return {lang: path for lang, path in paths.items() if os.path.exists(path)}
+
+
+def lexicon_digest(paths: Dict[str, str]) -> str:
+    """Digest of the marker files plus the code that compiles them."""
+    h = hashlib.sha256()
+    for path in (os.path.abspath(__file__), inspect.getsourcefile(AhoCorasick), *(paths[lang] for lang in sorted(paths))):
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def build_scanners(lexicon_dir: str = LEXICON_DIR) -> Dict[str, MarkerScanner]:
+    scanners = {}
+    for lang, path in lexicon_paths(lexicon_dir).items():
+        with open(path, "r", encoding="utf-8") as f:
+            scanners[lang] = MarkerScanner(lang, json.load(f))
+    return scanners
+
+
+def dump_scanners(scanners: Dict[str, MarkerScanner], digest: str = "") -> bytes:
+    return SERIAL_MAGIC + marshal.dumps((digest, {lang: s.to_bytes() for lang, s in scanners.items()}))
+
+
+def load_scanners_bytes(data: bytes) -> Tuple[str, Dict[str, MarkerScanner]]:
+    if not data.startswith(SERIAL_MAGIC):
+        raise ValueError("not a serialized marker scanner set")
+    digest, scanners = marshal.loads(data[len(SERIAL_MAGIC) :])
+    return digest, {lang: MarkerScanner.from_bytes(b) for lang, b in scanners.items()}
+
+
+def load_scanners(lexicon_dir: str = LEXICON_DIR, cache: Optional[str] = DEFAULT_CACHE) -> Dict[str, MarkerScanner]:
+    """Scanners from the cache file when it matches the marker files, else built and cached."""
+    digest = lexicon_digest(lexicon_paths(lexicon_dir))
+    if cache and os.path.exists(cache):
+        try:
+            with open(cache, "rb") as f:
+                cached_digest, scanners = load_scanners_bytes(f.read())
+            if cached_digest == digest:
+                return scanners
+        except (ValueError, EOFError, TypeError):  # stale or foreign file: rebuild
+            pass
+    scanners = build_scanners(lexicon_dir)
+    if cache:
+        tmp = cache + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(dump_scanners(scanners, digest))
+        os.replace(tmp, cache)
+    return scanners
+
+
+# --- Workers
+
+_scanners: Dict[str, MarkerScanner] = {}
+_spans = True
+
+
+def init_worker(data: bytes, spans: bool) -> None:
+    """Pool initializer: scanners arrive serialized from the parent."""
+    global _scanners, _spans
+    _scanners = load_scanners_bytes(data)[1]
+    _spans = spans
+
+
+def scan_chunk(chunk: Sequence[Tuple[object, str, str]]) -> Tuple[List[dict], int]:
+    """Results for one chunk plus its character count; items in languages without a marker file are skipped."""
+    results = []
+    chars = 0
+    for item_id, lang, text in chunk:
+        scanner = _scanners.get(lang)
+        if scanner is None:
+            continue
+        counts, spans = scanner.scan(text, _spans)
+        chars += len(text)
+        result = {"id": item_id, "lang": lang, "counts": dict(zip(scanner.categories, counts))}
+        if _spans:
+            result["spans"] = spans
+        results.append(result)
+    return results, chars
+
+
+def main() -> None:
+    args = parse_args()
+    scanners = load_scanners(args.lexicon_dir, args.cache)
+    if args.text is not None:
+        if args.lang not in scanners:
+            raise SystemExit(f"No marker lexicon for {args.lang} (have {', '.join(scanners)})")
+        print(json.dumps(scanners[args.lang].scan_batch([args.text])[0], ensure_ascii=False, indent=2))
+        return
+
+    items = iter_jsonl(args.input, args) if args.input else iter_duckdb(args.db, args.query, args.lang, args.chunk_size)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    totals: Dict[str, Dict[str, int]] = {}
+    n_items = n_chars = 0
+    started = time.perf_counter()
+    try:
+        for rows, chars in run_pool(
+            scan_chunk, chunked(items, args.chunk_size), args.workers, init_worker, (dump_scanners(scanners), not args.no_spans)
+        ):
+            out.write("".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in rows))
+            for r in rows:
+                lang_totals = totals.setdefault(r["lang"], {})
+                for name, count in r["counts"].items():
+                    lang_totals[name] = lang_totals.get(name, 0) + count
+            n_items += len(rows)
+            n_chars += chars
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    for lang, counts in sorted(totals.items()):
+        print(f"{lang}: " + ", ".join(f"{name} {count:,}" for name, count in counts.items()), file=sys.stderr)
+    print(
+        f"Scanned {n_items:,} items ({n_chars:,} chars) in {elapsed:.2f}s with {args.workers} worker(s): "
+        f"{n_items / elapsed if elapsed else 0:,.0f} items/s, {n_chars / elapsed if elapsed else 0:,.0f} chars/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Batched DKVMN knowledge-tracing inference on CPU (NumPy, float32).
+
+Dynamic Key-Value Memory Network (Zhang et al., 2017), as drawn in
+generate_paper_charts.py (Figure2_DKVMN_Mechanism). For an interaction with
+skill q and response c (1 = correct):
+  attention  w = softmax(A[q] M_k^T)                    over the N memory slots
+  read       r = w M_v,  f = tanh(W_f [r; A[q]] + b_f),  p = sigmoid(w_p . f + b_p)
+  write      v = B[q + Q * c],  e = sigmoid(W_e v + b_e),  a = tanh(W_a v + b_a)
+             M_v <- M_v * (1 - w e^T) + w a^T
+p is the predicted probability of answering q correctly, computed before the
+response is written into the learner's value memory M_v.
+
+Inference only: weights come from a trained model exported to .npz. Linear
+layers are stored as (out, in) weight + bias, the torch.nn.Linear layout:
+  skills        str[Q]          skill names (index = q)
+  key_memory    f32[N, dk]      M_k
+  key_embed     f32[Q, dk]      A
+  value_embed   f32[2Q, dv]     B, row q + Q * correct
+  value_init    f32[N, dv]      initial M_v
+  erase_w f32[dv, dv], erase_b f32[dv];  add_w f32[dv, dv], add_b f32[dv]
+  summary_w     f32[df, dv + dk], summary_b f32[df]
+  output_w      f32[df],          output_b f32[]
+
+Neither attention nor the key half of the summary layer depend on the
+memory. Both are precomputed per skill, as are erase/add per (skill,
+response), so a step costs one batched read, one small matmul and the
+in-place erase/add. Learners are batched as ragged sequences. Each batch is
+sorted by length, so the learners still active at step t form a prefix, and
+no padding is computed.
+
+Value memories are kept in a snapshot (--state). A run loads it, applies
+only the new interactions, and writes it back. A learner's history is never
+replayed. Postgres runs record the newest created_at they consumed, and the
+next run starts after it. JSONL has no timestamps, so it is read as each
+learner's full history and the first `seen` interactions per learner (the
+ones already in the snapshot) are skipped.
+
+Interactions come from JSONL (user_id, skill, correct; in time order per
+user) or from Postgres. The default query reads pronunciation attempts
+(user_pron_attempts joined to pron_sentences): skill is "<lang>:L<level>",
+and correct means pron_score >= 60.
+
+Usage examples:
+  python scripts/dkvmn.py --weights data/models/dkvmn.npz --input interactions.jsonl \
+    --state data/models/dkvmn-state.npz --output mastery.jsonl
+
+  # nightly, incremental from Postgres
+  python scripts/dkvmn.py --weights data/models/dkvmn.npz --dsn $DATABASE_URL --state data/models/dkvmn-state.npz
+
+  # pipeline smoke test with untrained random weights
+  python scripts/dkvmn.py --init-random --input interactions.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PARAMS = (
+    "key_memory",
+    "key_embed",
+    "value_embed",
+    "value_init",
+    "erase_w",
+    "erase_b",
+    "add_w",
+    "add_b",
+    "summary_w",
+    "summary_b",
+    "output_w",
+    "output_b",
+)
+
+DEFAULT_QUERY = """
+SELECT a.user_id::text, a.lang || ':L' || coalesce(s.level, 0), a.pron_score >= 60, a.created_at
+FROM user_pron_attempts a
+LEFT JOIN pron_sentences s ON s.sentence_id = a.sentence_id
+WHERE a.valid_flag AND a.pron_score IS NOT NULL AND a.created_at > %(since)s
+ORDER BY a.user_id, a.created_at, a.attempt_id
+"""
+EPOCH = "-infinity"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Batched DKVMN knowledge-tracing inference over practice logs")
+    parser.add_argument("--weights", type=str, default=None, help="Trained model weights (.npz, see module docstring)")
+    parser.add_argument("--init-random", action="store_true", help="Untrained random weights over the input's skills (pipeline testing only)")
+    parser.add_argument("--input", type=str, default=None, help="Interactions JSONL: user_id, skill, correct per line, in time order (full history per user)")
+    parser.add_argument(
+        "--dsn",
+        type=str,
+        default=os.environ.get("DATABASE_URL", ""),
+        help="Postgres DSN when no --input is given (default: $DATABASE_URL)",
+    )
+    parser.add_argument("--query", type=str, default=DEFAULT_QUERY, help="SQL returning user_id, skill, correct, created_at ordered by user and time; may use %%(since)s")
+    parser.add_argument("--state", type=str, default=None, help="Value-memory snapshot to resume from and update (.npz)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing --state snapshot")
+    parser.add_argument("--output", type=str, default=None, help="Write per-learner mastery (P(correct) per skill) as JSONL")
+    parser.add_argument("--batch-size", type=int, default=512, help="Learners per batch (default: 512)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --init-random")
+    args = parser.parse_args()
+    if not args.weights and not args.init_random:
+        parser.error("--weights is required (or --init-random for a smoke test)")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be >= 1")
+    return args
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# --- Model
+
+
+class DKVMN:
+    """A DKVMN with per-skill tables precomputed for batched inference."""
+
+    def __init__(self, skills: Sequence[str], params: Dict[str, np.ndarray]):
+        missing = [name for name in PARAMS if name not in params]
+        if missing:
+            raise SystemExit(f"DKVMN weights are missing: {', '.join(missing)}")
+        self.skills = list(skills)
+        self.skill_index = {s: i for i, s in enumerate(self.skills)}
+        self.params = {name: np.asarray(params[name], dtype=np.float32) for name in PARAMS}
+        p = self.params
+        n_skills = len(self.skills)
+        self.memory_size, key_dim = p["key_memory"].shape
+        self.value_dim = p["value_init"].shape[1]
+        if p["key_embed"].shape != (n_skills, key_dim) or p["value_embed"].shape != (2 * n_skills, self.value_dim):
+            raise SystemExit(f"DKVMN weights do not match {n_skills} skills (key_embed {p['key_embed'].shape}, value_embed {p['value_embed'].shape})")
+
+        logits = p["key_embed"] @ p["key_memory"].T
+        logits -= logits.max(axis=1, keepdims=True)
+        attention = np.exp(logits)
+        self.attention = attention / attention.sum(axis=1, keepdims=True)  # [Q, N]
+        self.summary_r = np.ascontiguousarray(p["summary_w"][:, : self.value_dim].T)  # [dv, df]
+        self.summary_k = p["key_embed"] @ p["summary_w"][:, self.value_dim :].T + p["summary_b"]  # [Q, df]
+        self.erase = sigmoid(p["value_embed"] @ p["erase_w"].T + p["erase_b"])  # [2Q, dv]
+        self.add = np.tanh(p["value_embed"] @ p["add_w"].T + p["add_b"])  # [2Q, dv]
+        self.output_w, self.output_b = p["output_w"], p["output_b"]
+
+    @classmethod
+    def load(cls, path: str) -> "DKVMN":
+        if not os.path.exists(path):
+            raise SystemExit(f"Weights not found: {path}")
+        with np.load(path, allow_pickle=False) as data:
+            return cls([str(s) for s in data["skills"]], {name: data[name] for name in data.files if name != "skills"})
+
+    def save(self, path: str) -> None:
+        _save_npz(path, skills=np.array(self.skills), **self.params)
+
+    @classmethod
+    def random(
+        cls, skills: Sequence[str], memory_size: int = 20, key_dim: int = 50, value_dim: int = 100, summary_dim: int = 50, seed: int = 0
+    ) -> "DKVMN":
+        """Untrained weights of the usual DKVMN sizes, for benchmarks and pipeline tests."""
+        rng = np.random.default_rng(seed)
+        q = len(skills)
+
+        def init(*shape: int) -> np.ndarray:
+            return rng.normal(0, 1 / np.sqrt(shape[-1]), shape).astype(np.float32)
+
+        return cls(
+            skills,
+            {
+                "key_memory": init(memory_size, key_dim),
+                "key_embed": init(q, key_dim),
+                "value_embed": init(2 * q, value_dim),
+                "value_init": init(memory_size, value_dim),
+                "erase_w": init(value_dim, value_dim),
+                "erase_b": np.zeros(value_dim, np.float32),
+                "add_w": init(value_dim, value_dim),
+                "add_b": np.zeros(value_dim, np.float32),
+                "summary_w": init(summary_dim, value_dim + key_dim),
+                "summary_b": np.zeros(summary_dim, np.float32),
+                "output_w": init(summary_dim),
+                "output_b": np.zeros((), np.float32),
+            },
+        )
+
+    def fingerprint(self) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update("\n".join(self.skills).encode("utf-8"))
+        for name in PARAMS:
+            h.update(self.params[name].tobytes())
+        return h.hexdigest()
+
+    def initial_states(self, n: int) -> np.ndarray:
+        return np.repeat(self.params["value_init"][None], n, axis=0)
+
+    def step(self, memory: np.ndarray, q: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """One interaction for each of len(q) learners: returns P(correct), then writes the responses into memory [n, N, dv] in place."""
+        w = self.attention[q]  # [n, N]
+        read = np.matmul(w[:, None, :], memory)[:, 0]  # [n, dv]
+        summary = np.tanh(read @ self.summary_r + self.summary_k[q])
+        p = sigmoid(summary @ self.output_w + self.output_b)
+        x = q + len(self.skills) * c
+        # M_v * (1 - w e^T) + w a^T with a single [n, N, dv] temporary
+        w = w[:, :, None]
+        tmp = w * self.erase[x][:, None, :]
+        np.subtract(1, tmp, out=tmp)
+        memory *= tmp
+        np.multiply(w, self.add[x][:, None, :], out=tmp)
+        memory += tmp
+        return p
+
+    def run(self, skills: Sequence[np.ndarray], correct: Sequence[np.ndarray], states: np.ndarray) -> List[np.ndarray]:
+        """
+        Feed each learner's interactions in order, updating states [B, N, dv]
+        in place. Returns every learner's predictions (P(correct) before each
+        response).
+        """
+        lengths = np.array([len(q) for q in skills], dtype=np.int64)
+        order = np.argsort(-lengths, kind="stable")
+        steps = int(lengths.max()) if len(lengths) else 0
+        q = np.zeros((len(order), steps), dtype=np.int64)
+        c = np.zeros((len(order), steps), dtype=np.int64)
+        for row, i in enumerate(order):
+            q[row, : lengths[i]] = skills[i]
+            c[row, : lengths[i]] = correct[i]
+        # learners still active at step t: lengths sorted descending, so a prefix
+        active = np.searchsorted(-lengths[order], -np.arange(steps), side="left")
+        memory = states[order]
+        preds = np.zeros((len(order), steps), dtype=np.float32)
+        for t in range(steps):
+            n = active[t]
+            preds[:n, t] = self.step(memory[:n], q[:n, t], c[:n, t])
+        states[order] = memory
+        out: List[np.ndarray] = [np.empty(0, np.float32)] * len(order)
+        for row, i in enumerate(order):
+            out[i] = preds[row, : lengths[i]]
+        return out
+
+    def mastery(self, states: np.ndarray) -> np.ndarray:
+        """P(correct) for every skill given each learner's memory: float32 [B, Q]."""
+        read = np.einsum("qn,bnd->bqd", self.attention, states)
+        summary = np.tanh(read @ self.summary_r + self.summary_k)
+        return sigmoid(summary @ self.output_w + self.output_b)
+
+
+# --- Snapshots
+
+
+def _save_npz(path: str, **arrays: np.ndarray) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Value memories per learner plus how many interactions each has absorbed."""
+
+    def __init__(self, model: DKVMN, users: Optional[List[str]] = None, states: Optional[np.ndarray] = None, seen: Optional[np.ndarray] = None, since: str = EPOCH):
+        self.model = model
+        self.users = users or []
+        self.index = {u: i for i, u in enumerate(self.users)}
+        self.states = states if states is not None else model.initial_states(0)
+        self.seen = seen if seen is not None else np.zeros(0, dtype=np.int64)
+        self.since = since
+
+    @classmethod
+    def load(cls, path: str, model: DKVMN) -> "Snapshot":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["model"] != model.fingerprint():
+                raise SystemExit(f"{path} was built with different weights; rerun with --fresh")
+            return cls(model, [str(u) for u in data["users"]], data["states"], data["seen"], meta["since"])
+
+    def save(self, path: str) -> None:
+        meta = {"model": self.model.fingerprint(), "since": self.since}
+        _save_npz(path, meta=np.array(json.dumps(meta)), users=np.array(self.users, dtype=str), states=self.states, seen=self.seen)
+
+    def rows(self, users: Sequence[str]) -> np.ndarray:
+        """Row indices for users, adding new learners with the initial memory."""
+        new = [u for u in dict.fromkeys(users) if u not in self.index]
+        if new:
+            for u in new:
+                self.index[u] = len(self.users)
+                self.users.append(u)
+            self.states = np.concatenate([self.states, self.model.initial_states(len(new))])
+            self.seen = np.concatenate([self.seen, np.zeros(len(new), dtype=np.int64)])
+        return np.array([self.index[u] for u in users], dtype=np.int64)
+
+
+# --- Input
+
+
+Sequences = Dict[str, Tuple[List[str], List[int]]]
+
+
+def read_jsonl(path: str) -> Tuple[Sequences, Optional[str]]:
+    sequences: Sequences = defaultdict(lambda: ([], []))
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                skills, correct = sequences[str(item["user_id"])]
+                skills.append(str(item["skill"]))
+                correct.append(1 if item["correct"] else 0)
+            except (ValueError, KeyError) as exc:
+                raise SystemExit(f"{path}:{n}: bad interaction ({exc})")
+    return sequences, None
+
+
+def read_postgres(dsn: str, query: str, since: str, fetch_size: int = 50_000) -> Tuple[Sequences, Optional[str]]:
+    """Interactions after since; also returns the newest created_at read (the next run's since)."""
+    if not dsn:
+        raise SystemExit("Missing input. Provide --input, or --dsn / $DATABASE_URL")
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit("Reading from Postgres requires the psycopg2 package (pip install psycopg2-binary)")
+    try:
+        conn = psycopg2.connect(dsn)
+    except Exception as exc:
+        raise SystemExit(f"Failed to connect to Postgres: {exc}")
+    sequences: Sequences = defaultdict(lambda: ([], []))
+    newest = None
+    try:
+        with conn.cursor(name="dkvmn_interactions") as cur:
+            cur.itersize = fetch_size
+            cur.execute(query, {"since": since})
+            for user, skill, correct, created_at in cur:
+                skills, responses = sequences[user]
+                skills.append(skill)
+                responses.append(1 if correct else 0)
+                if newest is None or created_at > newest:
+                    newest = created_at
+    finally:
+        conn.close()
+    return sequences, newest.isoformat() if newest is not None else None
+
+
+def batches(users: Sequence[str], size: int) -> Iterator[Sequence[str]]:
+    for start in range(0, len(users), size):
+        yield users[start : start + size]
+
+
+def auc(labels: np.ndarray, scores: np.ndarray) -> float:
+    """ROC AUC by the rank-sum formula (ties get average ranks)."""
+    pos = labels.sum()
+    neg = len(labels) - pos
+    if pos == 0 or neg == 0:
+        return float("nan")
+    order = np.argsort(scores, kind="mergesort")
+    sorted_scores = scores[order]
+    ranks = np.empty(len(scores), dtype=np.float64)
+    _, first, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    ranks[order] = np.repeat(first + (counts + 1) / 2.0, counts)
+    return float((ranks[labels == 1].sum() - pos * (pos + 1) / 2) / (pos * neg))
+
+
+# --- Main
+
+
+def main() -> None:
+    args = parse_args()
+    state_exists = bool(args.state) and os.path.exists(args.state) and not args.fresh
+    if args.input:
+        sequences, newest = read_jsonl(args.input)
+    else:
+        since = EPOCH
+        if state_exists:
+            with np.load(args.state, allow_pickle=False) as data:
+                since = json.loads(str(data["meta"]))["since"]
+        sequences, newest = read_postgres(args.dsn, args.query, since)
+
+    if args.init_random:
+        model = DKVMN.random(sorted({s for skills, _ in sequences.values() for s in skills}), seed=args.seed)
+        print("Using untrained random weights: predictions are meaningless", file=sys.stderr)
+    else:
+        model = DKVMN.load(args.weights)
+    snapshot = Snapshot.load(args.state, model) if state_exists else Snapshot(model)
+
+    users, skills, correct = [], [], []
+    skipped = absorbed = 0
+    for user, (names, responses) in sequences.items():
+        idx = np.array([model.skill_index.get(s, -1) for s in names], dtype=np.int64)
+        known = idx >= 0
+        skipped += int((~known).sum())
+        q, c = idx[known], np.array(responses, dtype=np.int64)[known]
+        if args.input and user in snapshot.index:
+            # Same file again, or a longer export of it: drop what the snapshot already holds
+            done = min(int(snapshot.seen[snapshot.index[user]]), len(q))
+            absorbed += done
+            q, c = q[done:], c[done:]
+        if len(q):
+            users.append(user)
+            skills.append(q)
+            correct.append(c)
+
+    started = time.perf_counter()
+    labels, scores = [], []
+    for start in range(0, len(users), args.batch_size):
+        batch = slice(start, start + args.batch_size)
+        rows = snapshot.rows(users[batch])
+        states = snapshot.states[rows]
+        preds = model.run(skills[batch], correct[batch], states)
+        snapshot.states[rows] = states
+        snapshot.seen[rows] += [len(q) for q in skills[batch]]
+        scores.extend(preds)
+        labels.extend(correct[batch])
+    elapsed = time.perf_counter() - started
+    n = sum(len(q) for q in skills)
+    if newest:
+        snapshot.since = newest
+
+    print(
+        f"{n:,} interactions from {len(users):,} learners in {elapsed:.2f}s "
+        f"({n / elapsed if elapsed else 0:,.0f} interactions/s); {skipped:,} with unknown skills skipped"
+        + (f", {absorbed:,} already in {args.state} skipped" if absorbed else ""),
+        file=sys.stderr,
+    )
+    if n:
+        y, p = np.concatenate(labels), np.concatenate(scores)
+        print(f"Next-response prediction: AUC {auc(y, p):.3f}, accuracy {((p >= 0.5) == (y == 1)).mean():.3f}", file=sys.stderr)
+
+    if args.state:
+        snapshot.save(args.state)
+        print(f"Saved {len(snapshot.users):,} learner memories to {args.state}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            # Every learner in the input, including those with nothing new since the snapshot
+            reported = [u for u in sequences if u in snapshot.index]
+            for batch in batches(reported, args.batch_size):
+                rows = snapshot.rows(batch)
+                for user, row, probs in zip(batch, rows, model.mastery(snapshot.states[rows])):
+                    record = {"user_id": user, "interactions": int(snapshot.seen[row]), "mastery": dict(zip(model.skills, np.round(probs.astype(np.float64), 4).tolist()))}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,934 @@
+#!/usr/bin/env python3
+"""
+Shared Markdown / plain-text to DOCX renderer for the paper build scripts.
+
+One engine, pluggable rule sets:
+  mp0       Markdown drafts (docs/paper/MP0_Draft_v1.md) -> Word built-in styles
+  chapter   plain-text chapter format (docs/paper/MP0_Final_Content_Strict_EN.txt)
+  reformat  re-apply the thesis layout to the paragraphs of an existing .docx
+
+A rule set is an ordered table of line rules. The table is compiled into a
+single alternation regex per state, plus one Aho-Corasick automaton for the
+keyword rules ("contains any of ..."), so each line is classified with one
+match and at most one scan (first rule wins, same as the old if/elif
+chains). Inline Markdown is
+tokenized in one finditer pass. Each distinct run/paragraph format is built
+as rPr/pPr XML once and copied onto the elements that use it, instead of
+going through python-docx property setters for every run. With --styles,
+reformat defines each rule's format once as a named paragraph style
+(Thesis Heading, Thesis Body, ...) and strips the direct formatting it
+replaces, so the saved document no longer repeats fonts on every run.
+
+With --cache-dir, mp0 splits the draft at its headings and keys each
+section by a hash of its source; sections whose hash is already in the
+cache are copied in as stored body XML and only edited sections are
+rendered again.
+
+generate_word_doc.py, format_existing_doc.py and generate_mp0_docx.py are
+thin entry points over this module.
+
+Usage examples:
+  python scripts/docx_render.py --rules mp0 --input docs/paper/MP0_Draft_v1.md --output docs/paper/MP0_Final.docx
+  python scripts/docx_render.py --rules mp0 --input docs/paper/MP0_Draft_v1.md --output docs/paper/MP0_Final.docx \
+    --cache-dir docs/paper/.docx_cache/mp0
+  python scripts/docx_render.py --rules chapter --input docs/paper/MP0_Final_Content_Strict_EN.txt \
+    --output docs/paper/MP0_Final_Generated.docx
+  python scripts/docx_render.py --rules reformat --input docs/paper/MP0.docx --output docs/paper/MP0_Formatted.docx
+  python scripts/docx_render.py --rules reformat --styles --input docs/paper/MP0.docx --output docs/paper/MP0_Formatted.docx
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import os
+import re
+import time
+from copy import deepcopy
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+
+import docx
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from lxml import etree
+
+from aho_corasick import AhoCorasick
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PAPER_DIR = os.path.join(REPO_ROOT, "docs", "paper")
+THESIS_MARGIN_IN = 1.18
+
+W_P, W_R, W_T, W_BR, W_TAB, W_SECT_PR = (qn(t) for t in ("w:p", "w:r", "w:t", "w:br", "w:tab", "w:sectPr"))
+W_PPR, W_RPR, W_PSTYLE, W_VAL = (qn(t) for t in ("w:pPr", "w:rPr", "w:pStyle", "w:val"))
+W_BODY = qn("w:body")
+XML_SPACE = qn("xml:space")
+RUN_SPECIAL_RE = re.compile(r"(\t|\n|\r)")
+
+
+# --- Formats ------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class RunFormat:
+    font: Optional[str] = None
+    east_asia: Optional[bool] = None  # also set w:eastAsia to `font`
+    size: Optional[float] = None  # points
+    bold: Optional[bool] = None  # None leaves an existing value alone
+    italic: Optional[bool] = None
+    underline: Optional[bool] = None
+
+
+@dataclass(frozen=True)
+class ParaFormat:
+    style: Optional[str] = None
+    alignment: Optional[WD_ALIGN_PARAGRAPH] = None
+    space_before: Optional[float] = None  # points
+    space_after: Optional[float] = None  # points
+    left_indent: Optional[float] = None  # inches
+    single_spacing: bool = False
+
+
+@lru_cache(maxsize=None)
+def overlay(base: RunFormat, extra: RunFormat) -> RunFormat:
+    return RunFormat(
+        **{f.name: getattr(extra, f.name) if getattr(extra, f.name) is not None else getattr(base, f.name) for f in fields(RunFormat)}
+    )
+
+
+class FormatCache:
+    """Builds the rPr/pPr XML for each distinct format once and stamps copies onto elements."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.body = doc.element.body
+        self._rpr: Dict[RunFormat, object] = {}
+        self._ppr: Dict[ParaFormat, object] = {}
+        self._sect_pr = None
+        self._merge: Dict[Tuple[str, object], List[Tuple[str, Dict[str, str]]]] = {}
+
+    def run_properties(self, fmt: RunFormat):
+        if fmt not in self._rpr:
+            r = OxmlElement("w:r")
+            apply_font(Run(r, None).font, r, fmt)
+            self._rpr[fmt] = r.rPr
+        return self._rpr[fmt]
+
+    def paragraph_properties(self, fmt: ParaFormat):
+        if fmt not in self._ppr:
+            p = OxmlElement("w:p")
+            if fmt.style is not None:
+                p.get_or_add_pPr().style = self.doc.styles[fmt.style].style_id
+            apply_paragraph_format(Paragraph(p, None).paragraph_format, fmt)
+            self._ppr[fmt] = p.pPr
+        return self._ppr[fmt]
+
+    def append(self, p) -> None:
+        """Insert a block element at the end of the body, before its sectPr."""
+        if self._sect_pr is None:
+            self._sect_pr = self.body.find(W_SECT_PR)
+        if self._sect_pr is not None:
+            self._sect_pr.addprevious(p)  # body.add_p() rescans the body for sectPr on every call
+        else:
+            self.body.append(p)
+
+    def add_paragraph(self, pfmt: ParaFormat, runs: Iterable[Tuple[str, RunFormat]]):
+        """Append a w:p to the body (before its sectPr) with one run per (text, format)."""
+        p = self.body.makeelement(W_P, {})
+        self.append(p)
+        ppr = self.paragraph_properties(pfmt)
+        if ppr is not None:
+            p.append(deepcopy(ppr))
+        for text, rfmt in runs:
+            r = etree.SubElement(p, W_R)
+            rpr = self.run_properties(rfmt)
+            if rpr is not None:
+                r.append(deepcopy(rpr))
+            append_run_text(r, text)
+        return p
+
+    def apply_paragraph(self, p, fmt: ParaFormat) -> None:
+        key = ("p", fmt)
+        if key not in self._merge:
+            self._merge[key] = merge_plan(self.paragraph_properties(fmt))
+        merge_properties(p.get_or_add_pPr(), self._merge[key])
+
+    def apply_run(self, r, fmt: RunFormat) -> None:
+        key = ("r", fmt)
+        if key not in self._merge:
+            self._merge[key] = merge_plan(self.run_properties(fmt))
+        merge_properties(r.get_or_add_rPr(), self._merge[key])
+
+
+def apply_font(font, owner, fmt: RunFormat) -> None:
+    """Set fmt on a python-docx Font; owner is the run or style element holding its rPr."""
+    if fmt.font is not None:
+        font.name = fmt.font
+        if fmt.east_asia:
+            owner.get_or_add_rPr().get_or_add_rFonts().set(qn("w:eastAsia"), fmt.font)
+    if fmt.size is not None:
+        font.size = Pt(fmt.size)
+    if fmt.bold is not None:
+        font.bold = fmt.bold
+    if fmt.italic is not None:
+        font.italic = fmt.italic
+    if fmt.underline is not None:
+        font.underline = fmt.underline
+
+
+def apply_paragraph_format(pf, fmt: ParaFormat) -> None:
+    if fmt.alignment is not None:
+        pf.alignment = fmt.alignment
+    if fmt.single_spacing:
+        pf.line_spacing_rule = WD_LINE_SPACING.SINGLE
+    if fmt.space_before is not None:
+        pf.space_before = Pt(fmt.space_before)
+    if fmt.space_after is not None:
+        pf.space_after = Pt(fmt.space_after)
+    if fmt.left_indent is not None:
+        pf.left_indent = Inches(fmt.left_indent)
+
+
+def append_run_text(r, text: str) -> None:
+    """Same content as CT_R.text = text (\n -> w:br, \t -> w:tab), without the per-character loop."""
+    for piece in RUN_SPECIAL_RE.split(text):
+        if not piece:
+            continue
+        if piece == "\t":
+            etree.SubElement(r, W_TAB)
+        elif piece in ("\n", "\r"):
+            etree.SubElement(r, W_BR)
+        else:
+            t = etree.SubElement(r, W_T)
+            t.text = piece
+            if piece[0] == " " or piece[-1] == " ":
+                t.set(XML_SPACE, "preserve")
+
+
+def merge_plan(template) -> List[Tuple[str, Dict[str, str]]]:
+    """(get_or_add_<tag> method name, attributes) for each child of an rPr/pPr template."""
+    if template is None:
+        return []
+    return [(f"get_or_add_{child.tag.rsplit('}', 1)[-1]}", dict(child.attrib)) for child in template]
+
+
+def merge_properties(target, plan: Sequence[Tuple[str, Dict[str, str]]]) -> None:
+    """
+    Overlay a template onto an existing rPr/pPr; get_or_add_* keeps schema order.
+
+    Single-valued children (<w:b/>, <w:sz w:val=.../>, <w:jc .../>) are replaced outright, so
+    a stale <w:b w:val="0"/> becomes <w:b/>; multi-attribute ones (rFonts, spacing, ind) only
+    overwrite the attributes the template sets, like the python-docx setters they stand in for.
+    """
+    for method, attrib in plan:
+        el = getattr(target, method)()
+        if attrib.keys() <= {W_VAL}:
+            el.attrib.clear()
+        el.attrib.update(attrib)
+
+
+def add_page_number(paragraph) -> None:
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = paragraph.add_run()
+    fld_begin = OxmlElement("w:fldChar")
+    fld_begin.set(qn("w:fldCharType"), "begin")
+    instr = OxmlElement("w:instrText")
+    instr.set(qn("xml:space"), "preserve")
+    instr.text = "PAGE"
+    fld_end = OxmlElement("w:fldChar")
+    fld_end.set(qn("w:fldCharType"), "end")
+    run._element.append(fld_begin)
+    run._element.append(instr)
+    run._element.append(fld_end)
+
+
+def set_margins(section, inches: float) -> None:
+    section.top_margin = Inches(inches)
+    section.bottom_margin = Inches(inches)
+    section.left_margin = Inches(inches)
+    section.right_margin = Inches(inches)
+
+
+# --- Rules --------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class LineRule:
+    name: str
+    pattern: str = ""  # re.match against the stripped line; (?P<body>...) selects the text to render
+    para: ParaFormat = ParaFormat()
+    run: RunFormat = RunFormat()
+    inline: bool = False  # tokenize the body for inline Markdown
+    raw: bool = False  # render the unstripped line
+    transform: Optional[Callable[[str], str]] = None
+    when: Optional[str] = None  # only active in this state
+    enter: Optional[str] = None  # state to switch to after this rule matches
+    # Instead of a pattern: every group must have at least one keyword somewhere in the line
+    keywords: Tuple[Tuple[str, ...], ...] = ()
+    style: Optional[str] = None  # named paragraph style used by reformat --styles
+
+
+@dataclass
+class CompiledRules:
+    """Per-state matchers: one alternation regex for pattern rules, one automaton for keyword rules."""
+
+    pattern: Pattern
+    groups: Dict[str, Tuple[int, LineRule, Optional[str]]]
+    automaton: Optional[AhoCorasick]
+    keyword_rules: List[Tuple[int, LineRule, List[Set[int]]]]
+
+
+@dataclass
+class RuleSet:
+    name: str
+    source: str  # "text" or "docx"
+    rules: Sequence[LineRule]
+    default: LineRule
+    state_defaults: Dict[Optional[str], LineRule] = field(default_factory=dict)
+    code: Optional[LineRule] = None  # format for ``` fenced blocks; None disables fences
+    raw_code: bool = False  # keep code indentation
+    preprocess: Optional[Callable[[str], str]] = None
+    setup: Optional[Callable[[object], None]] = None
+    finish: Optional[Callable[[object], None]] = None
+    _compiled: Dict[Optional[str], CompiledRules] = field(default_factory=dict, repr=False)
+
+    def matcher(self, state: Optional[str]) -> CompiledRules:
+        if state not in self._compiled:
+            parts = []
+            groups: Dict[str, Tuple[int, LineRule, Optional[str]]] = {}
+            keyword_rules: List[Tuple[int, LineRule, Tuple[Tuple[str, ...], ...]]] = []
+            for i, rule in enumerate(self.rules):
+                if rule.when is not None and rule.when != state:
+                    continue
+                if rule.keywords:
+                    keyword_rules.append((i, rule, rule.keywords))
+                    continue
+                body = f"r{i}_body" if "(?P<body>" in rule.pattern else None
+                pattern = rule.pattern.replace("(?P<body>", f"(?P<{body}>") if body else rule.pattern
+                parts.append(f"(?P<r{i}>{pattern})")
+                groups[f"r{i}"] = (i, rule, body)
+            automaton = None
+            compiled_keyword_rules = []
+            if keyword_rules:
+                automaton = AhoCorasick(k for _, _, kw in keyword_rules for group in kw for k in group)
+                index = {k: n for n, k in enumerate(automaton.keywords)}
+                compiled_keyword_rules = [
+                    (i, rule, [{index[k] for k in group} for group in kw]) for i, rule, kw in keyword_rules
+                ]
+            self._compiled[state] = CompiledRules(
+                re.compile("|".join(parts) or r"(?!)"), groups, automaton, compiled_keyword_rules
+            )
+        return self._compiled[state]
+
+    def classify(self, text: str, state: Optional[str]) -> Tuple[LineRule, Optional[str]]:
+        """Return (rule, body) for a stripped line; body is None when the rule has no body group."""
+        compiled = self.matcher(state)
+        m = compiled.pattern.match(text)
+        order, rule, body = compiled.groups[m.lastgroup] if m is not None else (len(self.rules), None, None)
+        if compiled.automaton is not None and any(i < order for i, _, _ in compiled.keyword_rules):
+            hits = compiled.automaton.found(text)
+            if hits:
+                for i, kw_rule, kw_groups in compiled.keyword_rules:
+                    if i >= order:
+                        break
+                    if all(group & hits for group in kw_groups):
+                        return kw_rule, None
+        if rule is None:
+            return self.state_defaults.get(state, self.default), None
+        return rule, (m.group(body) if body else None)
+
+
+Block = Tuple[LineRule, str]
+
+
+def tokenize(text: str, rules: RuleSet, preprocess: bool = True) -> Iterator[Block]:
+    """Single pass over the source lines; fenced code collapses into one block."""
+    if preprocess and rules.preprocess is not None:
+        text = rules.preprocess(text)
+    state: Optional[str] = None
+    code: Optional[List[str]] = None
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if rules.code is not None and stripped.startswith("```"):
+            if code is None:
+                code = []
+            else:
+                if code:
+                    yield rules.code, "\n".join(code)
+                code = None
+            continue
+        if code is not None:
+            code.append(line if rules.raw_code else stripped)
+            continue
+        if not stripped:
+            continue
+        rule, body = rules.classify(stripped, state)
+        if body is None:
+            body = line if rule.raw else stripped
+        if rule.transform is not None:
+            body = rule.transform(body)
+        if rule.enter is not None:
+            state = rule.enter
+        yield rule, body
+    if code:
+        yield rules.code, "\n".join(code)
+
+
+INLINE_RE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|\$(?P<math>[^$]+)\$"
+    r"|\*\*(?P<bold>[^*]+)\*\*"
+    r"|\*(?P<italic>[^*]+)\*"
+    r"|\[(?P<link>[^\]]+)\]\([^)]+\)"
+)
+INLINE_FORMATS = {
+    "code": RunFormat(font="Courier New"),
+    "math": RunFormat(font="Cambria Math", italic=True),
+    "bold": RunFormat(bold=True),
+    "italic": RunFormat(italic=True),
+    "link": RunFormat(underline=True),  # [text](url) -> underlined text
+}
+
+
+def inline_runs(text: str, base: RunFormat) -> Iterator[Tuple[str, RunFormat]]:
+    pos = 0
+    for m in INLINE_RE.finditer(text):
+        if m.start() > pos:
+            yield text[pos : m.start()], base
+        kind = m.lastgroup
+        yield m.group(kind), overlay(base, INLINE_FORMATS[kind])
+        pos = m.end()
+    if pos < len(text):
+        yield text[pos:], base
+
+
+# --- Rule sets ----------------------------------------------------------------
+
+HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+
+
+def mp0_setup(doc) -> None:
+    font = doc.styles["Normal"].font
+    font.name = "Times New Roman"
+    font.size = Pt(11)
+
+
+MP0_RULES = RuleSet(
+    name="mp0",
+    source="text",
+    rules=[
+        LineRule(
+            "math_block",
+            r"\$\$.*\$\$$",
+            ParaFormat(alignment=WD_ALIGN_PARAGRAPH.CENTER),
+            RunFormat(font="Cambria Math", italic=True, size=11),
+            transform=lambda s: s.strip("$").strip(),
+        ),
+        LineRule("title", r"# (?P<body>.*)", ParaFormat(style="Title", alignment=WD_ALIGN_PARAGRAPH.CENTER)),
+        LineRule("heading1", r"## (?P<body>.*)", ParaFormat(style="Heading 1")),
+        LineRule("heading2", r"### (?P<body>.*)", ParaFormat(style="Heading 2")),
+        LineRule("heading3", r"#### (?P<body>.*)", ParaFormat(style="Heading 3")),
+        LineRule(
+            "caption",
+            r"\*\*\[Figure|\*\(.*\)\*$",
+            ParaFormat(alignment=WD_ALIGN_PARAGRAPH.CENTER),
+            RunFormat(italic=True),
+            transform=lambda s: s.replace("**", "").strip(),
+        ),
+        LineRule("bullet", r"[-*] (?P<body>.*)", ParaFormat(style="List Bullet"), inline=True),
+        LineRule("numbered", r"\d\. .", ParaFormat(style="List Number"), inline=True),
+    ],
+    default=LineRule("paragraph", "", inline=True, raw=True),
+    code=LineRule("code", "", ParaFormat(left_indent=0.5, space_after=6), RunFormat(font="Courier New", size=9)),
+    raw_code=True,
+    preprocess=lambda text: HTML_COMMENT_RE.sub("", text),
+    setup=mp0_setup,
+)
+
+
+def thesis_run(size: float, bold: bool = False, font: str = "Times New Roman") -> RunFormat:
+    return RunFormat(font=font, east_asia=True, size=size, bold=bold)
+
+
+def chapter_setup(doc) -> None:
+    set_margins(doc.sections[0], THESIS_MARGIN_IN)
+    font = doc.styles["Normal"].font
+    font.name = "Times New Roman"
+    font.size = Pt(12)
+
+
+def chapter_finish(doc) -> None:
+    add_page_number(doc.sections[0].footer.paragraphs[0])
+
+
+LEFT = WD_ALIGN_PARAGRAPH.LEFT
+CENTER = WD_ALIGN_PARAGRAPH.CENTER
+JUSTIFY = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+CHAPTER_RULES = RuleSet(
+    name="chapter",
+    source="text",
+    rules=[
+        LineRule("chapter", r"Chapter ", ParaFormat(alignment=LEFT, space_after=12), thesis_run(18, True)),
+        LineRule("section", r"\d+\.\d+\s", ParaFormat(alignment=LEFT, space_before=12), thesis_run(12, True)),
+        LineRule("subsection", r"\d+\.\d+\.\d+\s", ParaFormat(alignment=LEFT), thesis_run(12)),
+        LineRule(
+            "back_matter",
+            r"(?:Bibliography|Appendix|Table of Contents)$",
+            ParaFormat(alignment=LEFT, space_before=24, space_after=12),
+            thesis_run(18, True),
+        ),
+        LineRule("title", r"Design and Development", ParaFormat(alignment=CENTER, space_after=24), thesis_run(18, True)),
+        LineRule(
+            "cover",
+            r"Master Report|In partial fulfillment|December|The Kyoto College|Applied Information|Web Business",
+            ParaFormat(alignment=CENTER),
+            thesis_run(12),
+        ),
+        LineRule("cover_name", r"Yang Jizhou", ParaFormat(alignment=CENTER), thesis_run(18)),
+        LineRule("cover_id", r"M24W0470", ParaFormat(alignment=CENTER), thesis_run(14)),
+        LineRule("cover_name_caps", r"YANG JIZHOU", ParaFormat(alignment=CENTER), thesis_run(12)),
+    ],
+    default=LineRule("paragraph", "", ParaFormat(alignment=JUSTIFY), thesis_run(12)),
+    code=LineRule("code", "", ParaFormat(alignment=LEFT), RunFormat(font="Courier New", size=10)),
+    setup=chapter_setup,
+    finish=chapter_finish,
+)
+
+
+def reformat_setup(doc) -> None:
+    for section in doc.sections:
+        set_margins(section, THESIS_MARGIN_IN)
+        footer = section.footer
+        for p in footer.paragraphs:
+            p.clear()
+        if not footer.paragraphs:
+            footer.add_paragraph()
+        add_page_number(footer.paragraphs[0])
+
+
+def reset_spacing(**kwargs) -> ParaFormat:
+    """Every reformatted paragraph gets single spacing and 0/0 pt unless the rule says otherwise."""
+    return ParaFormat(**{"single_spacing": True, "space_before": 0, "space_after": 0, **kwargs})
+
+
+TITLE_PAGE_KEYWORDS = (
+    "Master Report",
+    "In partial fulfillment",
+    "The Kyoto College",
+    "Applied Information",
+    "Web Business",
+    "M24W0470",
+    "YANG JIZHOU",
+    "December 28",
+)
+
+REFORMAT_RULES = RuleSet(
+    name="reformat",
+    source="docx",
+    rules=[
+        LineRule(
+            "appendix",
+            r"Appendix$",
+            reset_spacing(alignment=LEFT, space_before=24, space_after=12),
+            thesis_run(18, True),
+            enter="appendix",
+            style="Thesis Heading",
+        ),
+        LineRule(
+            "heading",
+            r"Chapter\s|(?:Bibliography|Table of Contents)$",
+            reset_spacing(alignment=LEFT, space_before=24, space_after=12),
+            thesis_run(18, True),
+            style="Thesis Heading",
+        ),
+        LineRule(
+            "section",
+            r"\d+\.\d+\s",
+            reset_spacing(alignment=LEFT, space_before=12, space_after=6),
+            thesis_run(12, True),
+            style="Thesis Section",
+        ),
+        LineRule(
+            "subsection",
+            r"\d+\.\d+\.\d+\s",
+            reset_spacing(alignment=LEFT, space_before=6),
+            thesis_run(12),
+            style="Thesis Subsection",
+        ),
+        # Title page heuristics: keywords anywhere in the paragraph, found in one automaton pass
+        LineRule(
+            "title",
+            keywords=(("Design and Development",),),
+            para=reset_spacing(alignment=CENTER),
+            run=thesis_run(18, True),
+            style="Thesis Title",
+        ),
+        LineRule(
+            "title_name",
+            keywords=(("Yang Jizhou",),),
+            para=reset_spacing(alignment=CENTER),
+            run=thesis_run(18),
+            style="Thesis Title Name",
+        ),
+        LineRule(
+            "title_id",
+            keywords=(TITLE_PAGE_KEYWORDS, ("M24W0470", "Date")),
+            para=reset_spacing(alignment=CENTER),
+            run=thesis_run(14),
+            style="Thesis Title ID",
+        ),
+        LineRule(
+            "title_line",
+            keywords=(TITLE_PAGE_KEYWORDS,),
+            para=reset_spacing(alignment=CENTER),
+            run=thesis_run(12),
+            style="Thesis Title Line",
+        ),
+        LineRule(
+            "appendix_code",
+            r"import|export",
+            reset_spacing(alignment=LEFT),
+            thesis_run(10, font="Courier New"),
+            when="appendix",
+            style="Thesis Code",
+        ),
+        LineRule(
+            "appendix_code_symbols",
+            keywords=(("{", "}", ";", "return"),),
+            para=reset_spacing(alignment=LEFT),
+            run=thesis_run(10, font="Courier New"),
+            when="appendix",
+            style="Thesis Code",
+        ),
+    ],
+    default=LineRule(
+        "paragraph",
+        para=reset_spacing(alignment=JUSTIFY),
+        run=RunFormat(font="Times New Roman", east_asia=True, size=12),
+        style="Thesis Body",
+    ),
+    state_defaults={
+        "appendix": LineRule(
+            "appendix_text",
+            para=reset_spacing(alignment=LEFT),
+            run=RunFormat(font="Courier New", east_asia=True, size=10),
+            style="Thesis Appendix",
+        ),
+    },
+    setup=reformat_setup,
+)
+
+RULE_SETS: Dict[str, RuleSet] = {r.name: r for r in (MP0_RULES, CHAPTER_RULES, REFORMAT_RULES)}
+
+
+# --- Rendering ----------------------------------------------------------------
+
+
+def render_block(cache: FormatCache, rule: LineRule, body: str):
+    runs = inline_runs(body, rule.run) if rule.inline else ((body, rule.run),)
+    return cache.add_paragraph(rule.para, runs)
+
+
+def render_blocks(doc, blocks: Iterable[Block]) -> int:
+    cache = FormatCache(doc)
+    count = 0
+    for rule, body in blocks:
+        render_block(cache, rule, body)
+        count += 1
+    return count
+
+
+def render_text(text: str, rules: RuleSet, doc=None):
+    """Render source text with a text rule set into a new (or given) Document."""
+    doc = doc if doc is not None else docx.Document()
+    if rules.setup is not None:
+        rules.setup(doc)
+    render_blocks(doc, tokenize(text, rules))
+    if rules.finish is not None:
+        rules.finish(doc)
+    return doc
+
+
+# --- Incremental build ----------------------------------------------------------
+
+SECTION_RE = re.compile(r"#{1,6} ")
+
+
+def split_sections(text: str, rules: RuleSet) -> List[str]:
+    """Split preprocessed Markdown before every heading line outside ``` fences."""
+    sections: List[List[str]] = [[]]
+    in_fence = False
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if rules.code is not None and stripped.startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and sections[-1] and SECTION_RE.match(stripped):
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(lines) for lines in sections]
+
+
+@lru_cache(maxsize=None)
+def render_signature(rules_name: str) -> str:
+    """Changes whenever the rendering code, python-docx or the rule set name does."""
+    digest = hashlib.sha256(f"{rules_name}|{docx.__version__}".encode())
+    for path in (os.path.abspath(__file__), inspect.getsourcefile(AhoCorasick)):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class FragmentCache:
+    """
+    Rendered body XML per Markdown section, one <hash>.xml file per section.
+
+    The key is sha256(render signature + section source), so an edit only invalidates the
+    section it touches and a change to this module invalidates everything.
+    """
+
+    def __init__(self, directory: str, rules: RuleSet):
+        self.directory = directory
+        self.signature = render_signature(rules.name)
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, section: str) -> str:
+        return hashlib.sha256(f"{self.signature}\0{section}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.xml")
+
+    def load(self, key: str) -> Optional[list]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return list(parse_xml(f.read()))
+        except FileNotFoundError:
+            return None
+
+    def store(self, key: str, elements: Sequence, nsmap: Dict[str, str]) -> None:
+        # Wrapped in a w:body carrying the document's namespaces, so the paragraphs do not
+        # redeclare them when they are moved back into a document
+        wrapper = etree.Element(W_BODY, nsmap=nsmap)
+        wrapper.extend(deepcopy(e) for e in elements)
+        tmp = self.path(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(etree.tostring(wrapper))
+        os.replace(tmp, self.path(key))
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Delete fragments no longer referenced by the source; returns how many were removed."""
+        keep_files = {f"{key}.xml" for key in keep}
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".xml") and name not in keep_files:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        return removed
+
+
+def render_incremental(text: str, rules: RuleSet, cache_dir: str, doc=None):
+    """
+    Same document as render_text, but unchanged sections are copied from the fragment cache.
+
+    Returns (doc, reused, rendered) section counts.
+    """
+    if any(rule.when is not None or rule.enter is not None for rule in rules.rules):
+        raise ValueError(f"Rule set {rules.name!r} is stateful; its sections cannot be rendered independently")
+    doc = doc if doc is not None else docx.Document()
+    if rules.setup is not None:
+        rules.setup(doc)
+    if rules.preprocess is not None:
+        text = rules.preprocess(text)
+    fragments = FragmentCache(cache_dir, rules)
+    cache = FormatCache(doc)
+    nsmap = doc.element.nsmap
+    keys: List[str] = []
+    reused = 0
+    for section in split_sections(text, rules):
+        key = fragments.key(section)
+        keys.append(key)
+        elements = fragments.load(key)
+        if elements is not None:
+            for element in elements:
+                cache.append(element)
+            reused += 1
+            continue
+        elements = [render_block(cache, rule, body) for rule, body in tokenize(section, rules, preprocess=False)]
+        fragments.store(key, elements, nsmap)
+    fragments.prune(keys)
+    if rules.finish is not None:
+        rules.finish(doc)
+    return doc, reused, len(keys) - reused
+
+
+def define_styles(doc, rules: RuleSet) -> Dict[str, str]:
+    """Create (or update) one paragraph style per named rule; returns style name -> style id."""
+    styles = doc.styles
+    ids: Dict[str, str] = {}
+    for rule in (*rules.rules, rules.default, *rules.state_defaults.values()):
+        if rule.style is None or rule.style in ids:
+            continue
+        try:
+            style = styles[rule.style]
+        except KeyError:
+            style = styles.add_style(rule.style, WD_STYLE_TYPE.PARAGRAPH)
+            style.base_style = styles["Normal"]
+            style.quick_style = True
+        apply_paragraph_format(style.paragraph_format, rule.para)
+        apply_font(style.font, style.element, rule.run)
+        ids[rule.style] = style.style_id
+    return ids
+
+
+@lru_cache(maxsize=None)
+def style_owned_tags(para: ParaFormat, run: RunFormat) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Direct-formatting tags a named style takes over (pPr tags, rPr tags); bold=None etc. are left alone."""
+    ppr = []
+    if para.alignment is not None:
+        ppr.append("w:jc")
+    if para.single_spacing or para.space_before is not None or para.space_after is not None:
+        ppr.append("w:spacing")
+    if para.left_indent is not None:
+        ppr.append("w:ind")
+    rpr = []
+    if run.font is not None:
+        rpr.append("w:rFonts")
+    if run.size is not None:
+        rpr += ["w:sz", "w:szCs"]
+    if run.bold is not None:
+        rpr += ["w:b", "w:bCs"]
+    if run.italic is not None:
+        rpr += ["w:i", "w:iCs"]
+    if run.underline is not None:
+        rpr.append("w:u")
+    return tuple(qn(t) for t in ppr), tuple(qn(t) for t in rpr)
+
+
+def set_paragraph_style(p, style_id: str) -> None:
+    """pPr is always the first child of w:p and pStyle the first child of pPr."""
+    ppr = p.find(W_PPR)
+    if ppr is None:
+        ppr = p.makeelement(W_PPR, {})
+        p.insert(0, ppr)
+    pstyle = ppr.find(W_PSTYLE)
+    if pstyle is None:
+        pstyle = ppr.makeelement(W_PSTYLE, {})
+        ppr.insert(0, pstyle)
+    pstyle.set(W_VAL, style_id)
+
+
+def strip_properties(props, tags: Sequence[str]) -> None:
+    for tag in tags:
+        child = props.find(tag)
+        if child is not None:
+            props.remove(child)
+
+
+def reformat_document(doc, rules: RuleSet = REFORMAT_RULES, styles: bool = False):
+    """
+    Classify every paragraph of an existing document once and apply the rule's formats in place.
+
+    With styles=True each rule's format is defined once as a named paragraph style; paragraphs get
+    a pStyle and lose the direct formatting the style now provides, which keeps the XML small.
+    """
+    if rules.setup is not None:
+        rules.setup(doc)
+    cache = FormatCache(doc)
+    style_ids = define_styles(doc, rules) if styles else {}
+    state: Optional[str] = None
+    for p in doc.element.body.iterchildren(W_P):
+        # Paragraph.text renders w:tab/w:br as \t/\n, so "1.1<tab>Introduction" still reads as a section
+        rule, _body = rules.classify(Paragraph(p, None).text.strip(), state)
+        if rule.enter is not None:
+            state = rule.enter
+        style_id = style_ids.get(rule.style) if rule.style else None
+        if style_id is None:
+            cache.apply_paragraph(p, rule.para)
+            for r in p.iterchildren(W_R):
+                cache.apply_run(r, rule.run)
+            continue
+        ppr_tags, rpr_tags = style_owned_tags(rule.para, rule.run)
+        set_paragraph_style(p, style_id)
+        strip_properties(p[0], ppr_tags)
+        for r in p.iterchildren(W_R):
+            rpr = r.find(W_RPR)
+            if rpr is not None:
+                strip_properties(rpr, rpr_tags)
+                if len(rpr) == 0:
+                    r.remove(rpr)
+    if rules.finish is not None:
+        rules.finish(doc)
+    return doc
+
+
+def save_document(doc, path: str) -> str:
+    """Save, falling back to <name>_v5.docx when the target is locked (e.g. open in Word)."""
+    try:
+        doc.save(path)
+        return path
+    except PermissionError:
+        alt = path.replace(".docx", "_v5.docx")
+        print(f"Error: Could not save to {path}. The file might be open.")
+        doc.save(alt)
+        return alt
+
+
+def render_file(
+    rules_name: str, input_path: str, output_path: str, styles: bool = False, cache_dir: Optional[str] = None
+) -> str:
+    rules = RULE_SETS[rules_name]
+    if rules.source == "docx":
+        doc = reformat_document(docx.Document(input_path), rules, styles)
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if cache_dir is None:
+            doc = render_text(text, rules)
+        else:
+            doc, reused, rendered = render_incremental(text, rules, cache_dir)
+            print(f"Sections: {reused} reused, {rendered} rendered")
+    return save_document(doc, output_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Render paper sources to DOCX with a shared rule engine")
+    parser.add_argument("--rules", choices=sorted(RULE_SETS), required=True)
+    parser.add_argument("--input", type=str, required=True, help="Markdown/text source, or .docx for --rules reformat")
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument(
+        "--styles",
+        action="store_true",
+        help="reformat only: define named paragraph styles once instead of direct formatting on every run",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="mp0 only: reuse rendered sections from this fragment cache and re-render only changed ones",
+    )
+    args = parser.parse_args()
+    if args.styles and RULE_SETS[args.rules].source != "docx":
+        parser.error("--styles only applies to --rules reformat")
+    if args.cache_dir and args.rules != "mp0":
+        parser.error("--cache-dir only applies to --rules mp0")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.exists(args.input):
+        raise SystemExit(f"Input not found: {args.input}")
+    started = time.perf_counter()
+    saved = render_file(args.rules, args.input, args.output, args.styles, args.cache_dir)
+    print(f"Document saved to {saved} ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
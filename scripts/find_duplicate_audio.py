@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Find byte-identical audio files in a local mirror of the storage buckets.
+
+- Groups files by size first; only sizes shared by 2+ files are read at all
+- Narrows each size group with a hash of the first chunk, then hashes the
+  remaining candidates in full (chunked SHA-256) across a process pool
+- Reports duplicate clusters and the bytes deduplication would reclaim, and
+  can write a JSON plan for a cleanup job (one file kept per cluster)
+
+The mirror layout is the same as probe_audio_headers.py:
+<mirror>/<bucket_id>/<object name>.
+
+Usage examples:
+  python scripts/find_duplicate_audio.py --mirror ./storage-mirror
+  python scripts/find_duplicate_audio.py --mirror ./storage-mirror --bucket tts \
+    --jobs 8 --output-json audio_duplicates.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from analyze_audio_sizes import format_bytes, print_section
+from probe_audio_headers import iter_mirror
+
+HASH_CHUNK_BYTES = 1024 * 1024
+PREFIX_BYTES = 64 * 1024
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Find duplicate audio files in a local bucket mirror")
+    parser.add_argument(
+        "--mirror",
+        type=str,
+        required=True,
+        help="Directory holding one sub-directory per bucket_id",
+    )
+    parser.add_argument(
+        "--bucket",
+        type=str,
+        default=None,
+        help="Only consider a specific bucket_id",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for hashing (default: CPU count)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Number of clusters (by reclaimable bytes) to list in the report (default: 20)",
+    )
+    parser.add_argument(
+        "--output-json",
+        type=str,
+        default=None,
+        help="Optional path to write every cluster (kept file + duplicates) as JSON",
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+@dataclass
+class AudioFile:
+    path: str
+    bucket_id: str
+    name: str
+    size_bytes: int
+
+
+@dataclass
+class DuplicateCluster:
+    sha256: str
+    size_bytes: int
+    files: List[AudioFile]  # files[0] is the copy to keep
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return self.size_bytes * (len(self.files) - 1)
+
+
+def hash_prefix(path: str) -> Tuple[str, Optional[str]]:
+    try:
+        with open(path, "rb") as f:
+            return path, hashlib.sha256(f.read(PREFIX_BYTES)).hexdigest()
+    except OSError:
+        return path, None
+
+
+def hash_full(path: str) -> Tuple[str, Optional[str]]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                h.update(chunk)
+    except OSError:
+        return path, None
+    return path, h.hexdigest()
+
+
+def same_size_groups(files: Sequence[AudioFile]) -> List[List[AudioFile]]:
+    by_size: Dict[int, List[AudioFile]] = {}
+    for f in files:
+        by_size.setdefault(f.size_bytes, []).append(f)
+    return [group for size, group in by_size.items() if len(group) > 1 and size > 0]
+
+
+def regroup(groups: Sequence[List[AudioFile]], digests: Dict[str, Optional[str]]) -> List[List[AudioFile]]:
+    """Split each group by digest, dropping singletons and unreadable files."""
+    out: List[List[AudioFile]] = []
+    for group in groups:
+        by_digest: Dict[str, List[AudioFile]] = {}
+        for f in group:
+            digest = digests.get(f.path)
+            if digest is not None:
+                by_digest.setdefault(digest, []).append(f)
+        out.extend(g for g in by_digest.values() if len(g) > 1)
+    return out
+
+
+def find_duplicates(files: Sequence[AudioFile], jobs: int) -> List[DuplicateCluster]:
+    groups = same_size_groups(files)
+
+    def run(fn, paths: List[str]) -> Dict[str, Optional[str]]:
+        if jobs == 1 or len(paths) < 2:
+            return dict(map(fn, paths))
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            return dict(ex.map(fn, paths, chunksize=max(1, min(64, len(paths) // (jobs * 4) or 1))))
+
+    prefix_digests = run(hash_prefix, [f.path for g in groups for f in g])
+    groups = regroup(groups, prefix_digests)
+    # For files no larger than the prefix, the prefix digest already is the full-file SHA-256.
+    large = [g for g in groups if g[0].size_bytes > PREFIX_BYTES]
+    full_digests = {f.path: prefix_digests[f.path] for g in groups if g[0].size_bytes <= PREFIX_BYTES for f in g}
+    full_digests.update(run(hash_full, [f.path for g in large for f in g]))
+
+    clusters = []
+    for group in regroup(groups, full_digests):
+        group.sort(key=lambda f: (f.bucket_id, f.name))
+        clusters.append(DuplicateCluster(full_digests[group[0].path], group[0].size_bytes, group))
+    clusters.sort(key=lambda c: c.reclaimable_bytes, reverse=True)
+    return clusters
+
+
+def scan_mirror(mirror: str, bucket_filter: Optional[str]) -> List[AudioFile]:
+    files = []
+    for path, bucket_id, name in iter_mirror(mirror, bucket_filter):
+        try:
+            files.append(AudioFile(path, bucket_id, name, os.path.getsize(path)))
+        except OSError:
+            continue
+    return files
+
+
+def print_dedup_report(files: Sequence[AudioFile], clusters: Sequence[DuplicateCluster], top: int) -> None:
+    total_bytes = sum(f.size_bytes for f in files)
+    reclaimable = sum(c.reclaimable_bytes for c in clusters)
+    duplicate_files = sum(len(c.files) - 1 for c in clusters)
+
+    print_section("Duplicate Audio Summary")
+    print(f"Files: {len(files)}")
+    print(f"Total Size: {format_bytes(total_bytes)}")
+    print(f"Duplicate Clusters: {len(clusters)}")
+    print(f"Redundant Copies: {duplicate_files}")
+    share = (reclaimable / total_bytes * 100.0) if total_bytes else 0.0
+    print(f"Reclaimable: {format_bytes(reclaimable)} ({share:.1f}%)")
+
+    print_section("Per-Bucket Reclaimable")
+    by_bucket: Dict[str, List[int]] = {}
+    for c in clusters:
+        for f in c.files[1:]:
+            stats = by_bucket.setdefault(f.bucket_id, [0, 0])
+            stats[0] += 1
+            stats[1] += f.size_bytes
+    for bucket_id, (count, size) in sorted(by_bucket.items(), key=lambda kv: kv[1][1], reverse=True):
+        print(f"- bucket_id={bucket_id} | redundant={count} | reclaimable={format_bytes(size)}")
+
+    if clusters:
+        print_section(f"Top {min(top, len(clusters))} Clusters")
+        for c in clusters[:top]:
+            print(f"- sha256={c.sha256[:16]} | copies={len(c.files)} | size={format_bytes(c.size_bytes)} | reclaimable={format_bytes(c.reclaimable_bytes)}")
+            for i, f in enumerate(c.files):
+                print(f"    {'keep' if i == 0 else 'dup '} {f.bucket_id}/{f.name}")
+
+
+def write_dedup_json(path: str, clusters: Sequence[DuplicateCluster]) -> None:
+    data = {
+        "version": 1,
+        "reclaimable_bytes": sum(c.reclaimable_bytes for c in clusters),
+        "clusters": [
+            {
+                "sha256": c.sha256,
+                "size_bytes": c.size_bytes,
+                "reclaimable_bytes": c.reclaimable_bytes,
+                "keep": {"bucket_id": c.files[0].bucket_id, "name": c.files[0].name},
+                "duplicates": [{"bucket_id": f.bucket_id, "name": f.name} for f in c.files[1:]],
+            }
+            for c in clusters
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.isdir(args.mirror):
+        raise SystemExit(f"Mirror directory not found: {args.mirror}")
+    files = scan_mirror(args.mirror, args.bucket)
+    if not files:
+        print(f"No audio files found under {args.mirror}.")
+        return
+
+    clusters = find_duplicates(files, args.jobs)
+    print_dedup_report(files, clusters, args.top)
+
+    if args.output_json:
+        write_dedup_json(args.output_json, clusters)
+        print(f"\nSaved JSON: {args.output_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,166 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import numpy as np
+#!/usr/bin/env python3
+"""
+Render the paper figures (docs/paper/charts).
+
+Each generate_* function is registered as a figure task with its size and
+export settings. Tasks run in a process pool with the Agg backend (pyplot
+is only imported inside the workers), and every figure is drawn once and
+saved as PNG, SVG and PDF in the same pass.
+
+Outputs are keyed by a hash of the drawing function's source, its
+parameters, the shared rcParams and the matplotlib version. The keys live
+in <output-dir>/.figures.json, one per output file; a figure is skipped
+when every requested format exists and carries the current key.
+
+--batch renders size-distribution charts (per bucket, per TTS language,
+per bucket/path prefix) into <output-dir>/distributions from the
+audio_objects snapshot in data/analytics.duckdb. Each chart family is one
+GROUP BY over the snapshot. The histograms are pivoted with NumPy, and one
+Figure/Axes per worker is reused, with only the bars and texts updated
+between charts (blitted over a pre-rendered background for PNG).
+
+Usage examples:
+  python scripts/generate_paper_charts.py
+  python scripts/generate_paper_charts.py --only Figure2_DKVMN_Mechanism --formats png
+  python scripts/generate_paper_charts.py --force --workers 1
+  python scripts/generate_paper_charts.py --batch --dimensions bucket,language --formats png
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
 
-# Ensure output directory exists
 OUTPUT_DIR = 'docs/paper/charts'
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+MANIFEST_NAME = '.figures.json'
+FORMATS = ('png', 'svg', 'pdf')
+
+# Global style for academic publication
+RC_PARAMS = {
+    'font.family': 'sans-serif',
+    'font.sans-serif': ['Arial', 'DejaVu Sans'],
+    'font.size': 12,
+    'axes.linewidth': 1.5,
+    'lines.linewidth': 2,
+}
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    name: str  # output file stem
+    title: str
+    draw: Callable = field(compare=False, repr=False)
+    figsize: Tuple[float, float] = (10, 6)
+    dpi: int = 300  # raster formats only
+
+    def params(self) -> dict:
+        return {"figsize": list(self.figsize), "dpi": self.dpi}
+
+    def key(self) -> str:
+        import matplotlib
+
+        payload = json.dumps(
+            {
+                "source": inspect.getsource(self.draw),
+                "params": self.params(),
+                "rc": RC_PARAMS,
+                "matplotlib": matplotlib.__version__,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+FIGURES: Dict[str, FigureSpec] = {}
+
+
+def figure(name: str, title: str, **params) -> Callable[[Callable], Callable]:
+    """Register a drawing function; it receives a fresh Axes and only draws."""
+
+    def register(draw: Callable) -> Callable:
+        FIGURES[name] = FigureSpec(name, title, draw, **params)
+        return draw
+
+    return register
+
 
-# Set global style for academic publication
-plt.rcParams['font.family'] = 'sans-serif'
-plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans']
-plt.rcParams['font.size'] = 12
-plt.rcParams['axes.linewidth'] = 1.5
-plt.rcParams['lines.linewidth'] = 2
+def pyplot():
+    """Import pyplot on the Agg backend with the publication style (called in the workers)."""
+    import matplotlib
 
-def generate_system_architecture():
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.rcParams.update(RC_PARAMS)
+    return plt
+
+
+def output_paths(spec: FigureSpec, output_dir: str, formats: Sequence[str]) -> List[str]:
+    return [os.path.join(output_dir, f"{spec.name}.{fmt}") for fmt in formats]
+
+
+def render_figure(name: str, output_dir: str, formats: Sequence[str]) -> Tuple[str, str, float]:
+    """Draw one registered figure and save every format from the same Figure; returns (name, key, seconds)."""
+    started = time.perf_counter()
+    plt = pyplot()
+    spec = FIGURES[name]
+    fig, ax = plt.subplots(figsize=spec.figsize)
+    try:
+        spec.draw(ax)
+        fig.tight_layout()
+        for path in output_paths(spec, output_dir, formats):
+            fig.savefig(path, dpi=spec.dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return name, spec.key(), time.perf_counter() - started
+
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, str]) -> None:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def is_current(spec: FigureSpec, manifest: Dict[str, str], output_dir: str, formats: Sequence[str]) -> bool:
+    # Keyed per file: a --formats png run must not vouch for SVG/PDF drawn from an older key
+    key = spec.key()
+    return all(
+        manifest.get(os.path.basename(path)) == key and os.path.exists(path)
+        for path in output_paths(spec, output_dir, formats)
+    )
+
+
+# --- Figures ------------------------------------------------------------------
+
+
+@figure("Figure1_System_Architecture", "Figure 1: System Architecture", figsize=(10, 6))
+def generate_system_architecture(ax):
     """
     Chart 1: System Architecture Diagram (Flowchart)
     Visualizes the data flow: User -> Analysis -> Tracing -> Generation -> User
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
+    from matplotlib import patches
+
     ax.set_xlim(0, 10)
     ax.set_ylim(0, 6)
     ax.axis('off')
@@ -63,17 +204,16 @@ def generate_system_architecture():
     ax.annotate('', xy=(1, 2.4), xytext=(9, 2.4), arrowprops=dict(arrowstyle='->', linewidth=2, color='black', connectionstyle="arc3,rad=-0.2"))
     ax.text(5, 0.2, 'Feedback Loop (Next Exercise)', ha='center', va='center', size=10, style='italic')
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'Figure1_System_Architecture.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Generated Figure 1: System Architecture")
 
-def generate_dkvmn_schematic():
+
+@figure("Figure2_DKVMN_Mechanism", "Figure 2: DKVMN Mechanism", figsize=(10, 6))
+def generate_dkvmn_schematic(ax):
     """
     Chart 2: DKVMN Mechanism Schematic
     Visualizes Key Matrix, Value Matrix, and Read/Write operations.
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
+    from matplotlib import patches
+
     ax.set_xlim(0, 12)
     ax.set_ylim(0, 8)
     ax.axis('off')
@@ -119,18 +259,15 @@ def generate_dkvmn_schematic():
     # Update loop (Write)
     ax.annotate('', xy=(5, 1.5), xytext=(8, 4.5), arrowprops=dict(arrowstyle='->', linewidth=1.5, color='black', connectionstyle="arc3,rad=-0.3"))
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'Figure2_DKVMN_Mechanism.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Generated Figure 2: DKVMN Mechanism")
 
-def generate_nlp_pipeline_detail():
+
+@figure("Figure3_NLP_Pipeline", "Figure 3: NLP Pipeline", figsize=(10, 6))
+def generate_nlp_pipeline_detail(ax):
     """
     Chart 3: Morphological Analysis & Profiling Pipeline
     Visualizes the specific NLP steps: Tokenization -> Lemmatization -> Level Mapping -> Profiling.
     This is a factual representation of the lexProfileAnalyzer.ts logic.
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
     ax.set_xlim(0, 10)
     ax.set_ylim(0, 8)
     ax.axis('off')
@@ -189,13 +326,278 @@ def generate_nlp_pipeline_detail():
     # Profiling -> Output
     ax.annotate('', xy=(5, 1), xytext=(5, 1.5), arrowprops=arrow_props)
 
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'Figure3_NLP_Pipeline.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print("Generated Figure 3: NLP Pipeline")
+
+# --- Batch distribution charts ------------------------------------------------
+
+DEFAULT_ANALYTICS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "analytics.duckdb")
+DEFAULT_BINS = "0,100K,1M,5M,10M,50M,100M,1G"
+
+# Chart families over the audio_objects snapshot written by analyze_audio_sizes.py --incremental.
+# tts objects are stored as <language>/<file>; recordings and pronunciation as <user id>/<file>.
+PATH_PREFIX_SQL = "split_part(name, '/', 1)"
+CHART_DIMENSIONS = {
+    "bucket": ("bucket_id", "TRUE"),
+    "language": (PATH_PREFIX_SQL, "bucket_id = 'tts' AND contains(name, '/')"),
+    "prefix": (f"bucket_id || '/' || {PATH_PREFIX_SQL}", "contains(name, '/')"),
+}
+
+
+@dataclass
+class DistributionChart:
+    dimension: str
+    key: str
+    counts: "np.ndarray"  # objects per size bin
+    total_bytes: int
+    stem_suffix: str = ""  # set by dedupe_file_stems() when two keys sanitize to the same name
+
+    @property
+    def file_stem(self) -> str:
+        return f"{self.dimension}_{re.sub(r'[^A-Za-z0-9._-]+', '_', self.key)}{self.stem_suffix}"
+
+
+def dedupe_file_stems(charts: Sequence[DistributionChart]) -> None:
+    """Give charts whose file names would collide a short hash of their key, so none overwrites another."""
+    groups: Dict[str, List[DistributionChart]] = {}
+    for chart in charts:
+        groups.setdefault(chart.file_stem, []).append(chart)
+    for group in groups.values():
+        if len(group) > 1:
+            for chart in group:
+                chart.stem_suffix = "-" + hashlib.sha1(chart.key.encode("utf-8")).hexdigest()[:8]
+
+
+def slot_sql(bins: Sequence[int]) -> str:
+    """Size-bin index in SQL, same placement as analyze_audio_sizes.histogram_slot()."""
+    cases = " ".join(f"WHEN size_bytes >= {bins[i]} THEN {i}" for i in range(len(bins) - 1, -1, -1))
+    return f"CASE {cases} ELSE {len(bins) - 1} END"
+
+
+def load_distributions(
+    db_path: str, bins: Sequence[int], dimensions: Sequence[str], min_objects: int = 1
+) -> List[DistributionChart]:
+    """One GROUP BY per chart family, pivoted into per-chart bin counts with NumPy."""
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("--batch requires the duckdb package (pip install duckdb)")
+    import numpy as np
+
+    if not os.path.exists(db_path):
+        raise SystemExit(f"Analytics database not found: {db_path} (run analyze_audio_sizes.py --incremental first)")
+    db = duckdb.connect(db_path, read_only=True)
+    try:
+        if not db.execute("SELECT count(*) FROM information_schema.tables WHERE table_name = 'audio_objects'").fetchone()[0]:
+            raise SystemExit(f"{db_path} has no audio_objects table (run analyze_audio_sizes.py --incremental first)")
+        charts: List[DistributionChart] = []
+        for dimension in dimensions:
+            key_sql, where_sql = CHART_DIMENSIONS[dimension]
+            cols = db.execute(
+                f"SELECT {key_sql} AS key, {slot_sql(bins)} AS slot, count(*) AS n, sum(size_bytes) AS bytes "
+                f"FROM audio_objects WHERE {where_sql} GROUP BY ALL"
+            ).fetchnumpy()
+            if not len(cols["key"]):
+                continue
+            keys, row = np.unique(np.asarray(cols["key"], dtype=object).astype(str), return_inverse=True)
+            counts = np.zeros((len(keys), len(bins)), dtype=np.int64)
+            counts[row, np.asarray(cols["slot"])] = np.asarray(cols["n"])
+            totals = np.bincount(row, weights=np.asarray(cols["bytes"], dtype=np.float64), minlength=len(keys))
+            for i in np.flatnonzero(counts.sum(axis=1) >= min_objects):
+                charts.append(DistributionChart(dimension, str(keys[i]), counts[i], int(totals[i])))
+        dedupe_file_stems(charts)
+        return charts
+    finally:
+        db.close()
+
+
+class DistributionPlotter:
+    """
+    One Figure/Axes with a fixed layout, reused for every chart.
+
+    The y axis is the share of objects (0-100%), so axes, ticks and labels never change between
+    charts. For PNG-only runs they are rendered once and blitted: each chart restores that
+    background, redraws the bars, title and note, and writes the canvas buffer. Vector formats
+    go through savefig on the same figure.
+    """
+
+    def __init__(self, labels: Sequence[str], dpi: int, blit: bool = True):
+        import numpy as np
+
+        plt = pyplot()
+        self.plt = plt
+        self.dpi = dpi
+        self.fig, self.ax = plt.subplots(figsize=(8, 4.5), dpi=dpi)
+        self.bars = self.ax.bar(np.arange(len(labels)), np.zeros(len(labels)), color='#4a7ab5', edgecolor='black', linewidth=1)
+        self.ax.set_xticks(np.arange(len(labels)), labels, rotation=30, ha='right', size=10)
+        self.ax.set_ylim(0, 105)
+        self.ax.set_yticks(range(0, 101, 20))
+        self.ax.set_ylabel('Objects (%)')
+        self.title = self.ax.set_title('')
+        self.note = self.ax.text(0.98, 0.95, '', transform=self.ax.transAxes, ha='right', va='top', size=10)
+        # Fixed margins: tight_layout/bbox_inches='tight' would re-measure every chart
+        self.fig.subplots_adjust(left=0.11, right=0.97, bottom=0.27, top=0.9)
+        self.dynamic = (*self.bars, self.title, self.note)
+        self.background = None
+        if blit:
+            for artist in self.dynamic:
+                artist.set_animated(True)  # left out of full draws, drawn explicitly per chart
+            self.fig.canvas.draw()
+            self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def save(self, chart: DistributionChart, paths: Sequence[str]) -> None:
+        from analyze_audio_sizes import format_bytes
+
+        total = int(chart.counts.sum())
+        for bar, share in zip(self.bars, (chart.counts * (100.0 / max(total, 1))).tolist()):
+            bar.set_height(share)
+        self.title.set_text(f"Audio size distribution - {chart.dimension}: {chart.key}")
+        self.note.set_text(f"n = {total:,}   total = {format_bytes(chart.total_bytes)}")
+        if self.background is None:
+            for path in paths:
+                self.fig.savefig(path, dpi=self.dpi)
+            return
+        from PIL import Image
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for artist in self.dynamic:
+            self.fig.draw_artist(artist)
+        image = Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        for path in paths:
+            image.save(path, dpi=(self.dpi, self.dpi))
+
+    def close(self) -> None:
+        self.plt.close(self.fig)
+
+
+def render_distributions(
+    charts: Sequence[DistributionChart], labels: Sequence[str], output_dir: str, formats: Sequence[str], dpi: int, reuse: bool = True
+) -> int:
+    """Render charts into output_dir; reuse=False builds a fresh figure per chart (benchmark baseline)."""
+    os.makedirs(output_dir, exist_ok=True)
+    plotter = DistributionPlotter(labels, dpi, blit=set(formats) == {'png'}) if reuse else None
+    for chart in charts:
+        current = plotter or DistributionPlotter(labels, dpi, blit=False)
+        current.save(chart, [os.path.join(output_dir, f"{chart.file_stem}.{fmt}") for fmt in formats])
+        if plotter is None:
+            current.close()
+    if plotter is not None:
+        plotter.close()
+    return len(charts)
+
+
+def render_batch(
+    charts: Sequence[DistributionChart], labels: Sequence[str], output_dir: str, formats: Sequence[str], dpi: int, workers: int = 1
+) -> int:
+    """Split the charts over worker processes, each reusing one figure for its share."""
+    if workers <= 1 or len(charts) < 2:
+        return render_distributions(charts, labels, output_dir, formats, dpi)
+    workers = min(workers, len(charts))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [
+            ex.submit(render_distributions, charts[i::workers], labels, output_dir, formats, dpi) for i in range(workers)
+        ]
+        return sum(f.result() for f in futures)
+
+
+# --- Pipeline -----------------------------------------------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Render the paper figures (cached, in parallel)")
+    parser.add_argument("--output-dir", type=str, default=OUTPUT_DIR, help=f"Default: {OUTPUT_DIR}")
+    parser.add_argument(
+        "--formats",
+        type=str,
+        default=None,
+        help="Comma-separated subset of png,svg,pdf (default: all for the paper figures, png for --batch)",
+    )
+    parser.add_argument("--only", type=str, default="", help="Comma-separated figure names (default: all)")
+    parser.add_argument("--force", action="store_true", help="Redraw even when the cached outputs are current")
+    parser.add_argument("--workers", type=int, default=0, help="Process pool size (default: one per stale figure, up to CPU count)")
+    batch = parser.add_argument_group("batch distribution charts (from the analyze_audio_sizes.py snapshot)")
+    batch.add_argument("--batch", action="store_true", help="Render per-bucket/language/prefix size distributions instead")
+    batch.add_argument("--db", type=str, default=DEFAULT_ANALYTICS_DB, help="Default: data/analytics.duckdb")
+    batch.add_argument(
+        "--dimensions", type=str, default=",".join(CHART_DIMENSIONS), help=f"Subset of {','.join(CHART_DIMENSIONS)}"
+    )
+    batch.add_argument("--bins", type=str, default=DEFAULT_BINS, help=f"Size bin boundaries (default: {DEFAULT_BINS})")
+    batch.add_argument("--min-objects", type=int, default=1, help="Skip charts with fewer objects (default: 1)")
+    batch.add_argument("--dpi", type=int, default=100, help="Raster resolution for batch charts (default: 100)")
+    args = parser.parse_args()
+    if args.formats is None:
+        args.formats = "png" if args.batch else ",".join(FORMATS)
+    args.formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = set(args.formats) - set(FORMATS)
+    if unknown or not args.formats:
+        parser.error(f"--formats must be a subset of {','.join(FORMATS)}")
+    args.only = [n.strip() for n in args.only.split(",") if n.strip()]
+    missing = [n for n in args.only if n not in FIGURES]
+    if missing:
+        parser.error(f"Unknown figure(s): {', '.join(missing)} (known: {', '.join(FIGURES)})")
+    args.dimensions = [d.strip() for d in args.dimensions.split(",") if d.strip()]
+    unknown = set(args.dimensions) - set(CHART_DIMENSIONS)
+    if unknown or not args.dimensions:
+        parser.error(f"--dimensions must be a subset of {','.join(CHART_DIMENSIONS)}")
+    return args
+
+
+def render_all(
+    output_dir: str, formats: Sequence[str], names: Optional[Sequence[str]] = None, force: bool = False, workers: int = 0
+) -> Dict[str, str]:
+    """Render stale figures in a process pool; returns name -> 'skipped' | 'rendered (<s>s)'."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    specs = [FIGURES[n] for n in (names or FIGURES)]
+    status = {}
+    stale = []
+    for spec in specs:
+        if not force and is_current(spec, manifest, output_dir, formats):
+            status[spec.name] = "skipped"
+        else:
+            stale.append(spec.name)
+    if stale:
+        workers = workers or min(len(stale), os.cpu_count() or 1)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = [ex.submit(render_figure, name, output_dir, formats) for name in stale]
+                for future in as_completed(futures):
+                    name, key, seconds = future.result()
+                    for path in output_paths(FIGURES[name], output_dir, formats):
+                        manifest[os.path.basename(path)] = key
+                    status[name] = f"rendered ({seconds:.2f}s)"
+        finally:
+            # Keep the figures that did finish even if another one failed
+            save_manifest(output_dir, manifest)
+    return status
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    from analyze_audio_sizes import histogram_labels, parse_bins
+
+    bins = parse_bins(args.bins)
+    started = time.perf_counter()
+    charts = load_distributions(args.db, bins, args.dimensions, args.min_objects)
+    loaded = time.perf_counter()
+    output_dir = os.path.join(args.output_dir, "distributions")
+    count = render_batch(charts, histogram_labels(bins), output_dir, args.formats, args.dpi, args.workers or 1)
+    elapsed = time.perf_counter() - loaded
+    print(
+        f"{count} charts in {output_dir} ({', '.join(args.formats)}): query {loaded - started:.2f}s, render {elapsed:.2f}s "
+        f"({count / elapsed if elapsed else 0:.1f} charts/s)"
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    if args.batch:
+        run_batch(args)
+        return
+    started = time.perf_counter()
+    status = render_all(args.output_dir, args.formats, args.only, args.force, args.workers)
+    for name, state in status.items():
+        print(f"{FIGURES[name].title:<40} {state}")
+    print(f"All charts in {args.output_dir} ({', '.join(args.formats)}) in {time.perf_counter() - started:.2f}s")
+
 
 if __name__ == "__main__":
-    generate_system_architecture()
-    generate_dkvmn_schematic()
-    generate_nlp_pipeline_detail()
-    print(f"All charts generated in {OUTPUT_DIR}")
+    main()
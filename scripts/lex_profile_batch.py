@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Batch lexical profiling: CEFR/JLPT/HSK level distributions for a whole corpus.
+
+Offline counterpart of analyzeLexProfile() in
+src/lib/recommendation/lexProfileAnalyzer.ts (tokenize -> lemmatize ->
+dictionary lookup -> level profile), for re-grading the shadowing and
+sentence banks after a dictionary change. Items are streamed from JSONL
+(or a {"sentences": [...]} JSON bank) or from a DuckDB query, cut into
+chunks and profiled in a process pool. Each worker maps the compiled
+lexicon (lexicon.py) once at startup; nothing is parsed per item.
+
+Per item the output has the same vectors as the TypeScript analyzer:
+  lex_profile      {A1_A2, B1_B2, C1_plus, unknown} shares of content words
+  lex_profile_db   toLexProfileForDB(): the three bands renormalized over known words
+  levels           content-word counts per original level (A1..C2, N5..N1, HSK1..HSK7)
+
+Tokenization follows the synchronous analyzer:
+  en  words lowercased; lookup by surface form, then getEnglishLemmaVariants()
+      candidates, then the LLM-assigned levels. Without compromise.js there
+      is no POS tagger: closed-class words (determiners, pronouns,
+      prepositions, conjunctions) and numbers count as function words.
+  ja  punctuation/space stripped, longest dictionary match up to 6 chars
+  zh  jieba if installed, else longest dictionary match up to 4 chars
+
+Usage examples:
+  python scripts/lexicon.py
+  python scripts/lex_profile_batch.py --input data/english-sentences.json --output /tmp/profiles.jsonl
+  python scripts/lex_profile_batch.py --input items.jsonl --lang-field lang --en-dict extended --workers 4
+  python scripts/lex_profile_batch.py --db data/analytics.duckdb \
+    --query "SELECT id, lang, text FROM shadowing_items" --output data/analytics.duckdb --table lex_profiles
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from lexicon import DEFAULT_LEXICON, Lexicon
+
+T = TypeVar("T")
+
+BANDS = ("A1_A2", "B1_B2", "C1_plus")
+
+# mapToBroadCEFR(): original level -> index into BANDS
+BROAD_LEVEL = {
+    "A1": 0, "A2": 0, "B1": 1, "B2": 1, "C1": 2, "C2": 2,
+    "N5": 0, "N4": 0, "N3": 1, "N2": 2, "N1": 2,
+    "HSK1": 0, "HSK2": 0, "HSK3": 1, "HSK4": 1, "HSK5": 2, "HSK6": 2, "HSK7": 2,
+}  # fmt: skip
+
+EN_WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)*")
+JA_STRIP_RE = re.compile(r"[\s　。、！？「」『』（）.!?,;:\[\](){}]")
+ZH_STRIP_RE = re.compile(r"[\s　。、！？「」『』（）\"'《》【】.!?,;:\[\](){}]")
+DIALOGUE_RE = re.compile(r"^\s*[A-Za-z0-9]+:\s*", re.M)
+LONGEST_MATCH = {"ja": 6, "zh": 4}
+LOOKUP_CACHE_SIZE = 1 << 18
+
+# Words compromise.js tags Determiner / Pronoun / Preposition / Conjunction
+EN_FUNCTION_WORDS = frozenset(
+    """
+    a an the this that these those some any no every each either neither another such what which whose
+    i me my mine myself you your yours yourself yourselves he him his himself she her hers herself it its
+    itself we us our ours ourselves they them their theirs themselves who whom whoever whatever
+    someone somebody something anyone anybody anything everyone everybody everything nobody nothing
+    about above across after against along among around as at before behind below beneath beside
+    between beyond by down during except for from in inside into like near of off on onto out outside
+    over past since through throughout till to toward towards under underneath until up upon with within
+    without and but or nor so yet because although though if unless whereas while whether than
+    """.split()
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Profile a corpus against the compiled lexicon in a process pool")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=str, help="JSONL items, or a JSON bank with a sentences list")
+    source.add_argument("--db", type=str, help="DuckDB database to read items from (with --query)")
+    parser.add_argument("--query", type=str, default=None, help="SQL returning id, lang, text columns (with --db)")
+    parser.add_argument("--id-field", type=str, default="id", help="Item id field (default: id, else the line number)")
+    parser.add_argument("--text-field", type=str, default="text")
+    parser.add_argument("--lang-field", type=str, default="lang", help="Per-item language field; en-US etc. are cut to en")
+    parser.add_argument("--lang", type=str, default=None, help="Language for items without one")
+    parser.add_argument("--output", type=str, default="-", help="JSONL file, or a .duckdb database with --table (default: stdout)")
+    parser.add_argument("--table", type=str, default="lex_profiles", help="Table for DuckDB output (default: lex_profiles)")
+    parser.add_argument("--lexicon", type=str, default=DEFAULT_LEXICON, help="Compiled lexicon (default: data/lexicon/lexicon.bin)")
+    parser.add_argument("--en-dict", type=str, default="default", help="English level column en/<name> (default: default)")
+    parser.add_argument("--ja-dict", type=str, default="default", help="Japanese level column ja/<name> (default: default)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Items per task (default: 500)")
+    args = parser.parse_args()
+    if args.db and not args.query:
+        parser.error("--db requires --query")
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size and --workers must be >= 1")
+    return args
+
+
+def en_lemma_variants(word: str) -> List[str]:
+    """getEnglishLemmaVariants() from lexProfileAnalyzer.ts, in the same order."""
+    variants = [word]
+    n = len(word)
+
+    def add(v: str) -> None:
+        if v not in variants:
+            variants.append(v)
+
+    if word.endswith("ies") and n > 4:
+        add(word[:-3] + "y")
+    if word.endswith("es") and n > 3:
+        add(word[:-2])
+        add(word[:-1])
+    if word.endswith("s") and not word.endswith("ss") and n > 2:
+        add(word[:-1])
+    if word.endswith("ed") and n > 3:
+        add(word[:-2])
+        add(word[:-1])
+        add(word[:-3] + "y")
+        if n > 4 and word[-3] == word[-4]:
+            add(word[:-3])
+    if word.endswith("ing") and n > 4:
+        add(word[:-3])
+        add(word[:-3] + "e")
+        if n > 5 and word[-4] == word[-5]:
+            add(word[:-4])
+    if word.endswith("er") and n > 3:
+        add(word[:-2])
+        add(word[:-1])
+    if word.endswith("est") and n > 4:
+        add(word[:-3])
+        add(word[:-2])
+    if word.endswith("ly") and n > 3:
+        add(word[:-2])
+    return variants
+
+
+class Profiler:
+    """Level profiles for texts in one language setting, backed by a mapped Lexicon."""
+
+    def __init__(self, lexicon: Lexicon, en_dict: str = "default", ja_dict: str = "default"):
+        self.lexicon = lexicon
+        self.columns = {"en": f"en/{en_dict}", "ja": f"ja/{ja_dict}", "zh": "zh/default"}
+        missing = [c for c in self.columns.values() if c not in lexicon.labels]
+        if missing:
+            raise SystemExit(f"Level columns not in {lexicon.path}: {', '.join(missing)} (have {', '.join(lexicon.level_columns)})")
+        self.en_fallback = "en/llm" if "en/llm" in lexicon.labels else None
+        # Per column: level code -> band index (-1 = not listed or unmapped label)
+        self.bands = {c: (-1,) + tuple(BROAD_LEVEL.get(label, -1) for label in lexicon.labels[c]) for c in lexicon.labels}
+        # Corpus tokens repeat heavily: keep recent lookups in front of the hashed lexicon probe
+        self.code = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._code)
+        self._jieba = None
+        try:
+            import jieba
+
+            jieba.setLogLevel(60)
+            self._jieba = jieba
+        except ImportError:
+            pass
+
+    def _code(self, word: str, column: str) -> int:
+        i = self.lexicon.word_id(word)
+        return self.lexicon.column(f"level.{column}")[i] if i >= 0 else 0
+
+    def tokens(self, text: str, lang: str) -> List[Tuple[str, str, int, bool]]:
+        """(token, lemma, level code in the language's column, is content word)."""
+        column = self.columns[lang]
+        if lang == "en":
+            return [self._en_token(w, column) for w in EN_WORD_RE.findall(text.lower())]
+        if lang == "zh":
+            text = ZH_STRIP_RE.sub("", text)
+            if self._jieba is not None:
+                return [(w, w, self.code(w, column), True) for w in self._jieba.lcut(text) if w.strip()]
+        else:
+            text = JA_STRIP_RE.sub("", text)
+        return self._longest_match(text, column, LONGEST_MATCH[lang])
+
+    def _en_token(self, word: str, column: str) -> Tuple[str, str, int, bool]:
+        if word in EN_FUNCTION_WORDS or word.isdigit():
+            return word, word, self.code(word, column), False
+        for variant in en_lemma_variants(word):
+            code = self.code(variant, column)
+            if code:
+                return word, variant, code, True
+        if self.en_fallback:
+            # LLM-assigned levels share the CEFR labels, so codes are interchangeable
+            code = self.code(word, self.en_fallback)
+            if code:
+                return word, word, code, True
+        return word, word, 0, True
+
+    def _longest_match(self, text: str, column: str, max_len: int) -> List[Tuple[str, str, int, bool]]:
+        out = []
+        i, n = 0, len(text)
+        while i < n:
+            for size in range(min(max_len, n - i), 0, -1):
+                candidate = text[i : i + size]
+                code = self.code(candidate, column)
+                if code:
+                    break
+            else:
+                size, candidate, code = 1, text[i], 0
+            out.append((candidate, candidate, code, True))
+            i += size
+        return out
+
+    def profile(self, text: str, lang: str) -> dict:
+        """analyzeLexProfile() summary plus toLexProfileForDB() and per-level counts."""
+        column = self.columns[lang]
+        labels = self.lexicon.labels[column]
+        bands = self.bands[column]
+        tokens = self.tokens(DIALOGUE_RE.sub("", text), lang)
+        counts = [0] * len(labels)
+        band_counts = [0, 0, 0]
+        unknown = content = 0
+        for _, _, code, is_content in tokens:
+            if not is_content:
+                continue
+            content += 1
+            band = bands[code]
+            if band < 0:
+                unknown += 1
+            else:
+                band_counts[band] += 1
+            if code:
+                counts[code - 1] += 1
+        if content:
+            lex_profile = {name: c / content for name, c in zip(BANDS, band_counts)}
+            lex_profile["unknown"] = unknown / content
+        else:
+            lex_profile = {name: 0.0 for name in BANDS}
+            lex_profile["unknown"] = 0.0 if tokens else 1.0
+        known = content - unknown
+        # toLexProfileForDB(): renormalize by the known share; tokens without content words give all zeros
+        known_share = 1 - lex_profile["unknown"]
+        lex_profile_db = (
+            {name: lex_profile[name] / known_share for name in BANDS}
+            if known_share > 0
+            else {"A1_A2": 0.33, "B1_B2": 0.34, "C1_plus": 0.33}
+        )
+        return {
+            "dictionary": column,
+            "tokens": len(tokens),
+            "unique_tokens": len({lemma for _, lemma, _, _ in tokens}),
+            "content_words": content,
+            "function_words": len(tokens) - content,
+            "coverage": known / content if content else 0.0,
+            "lex_profile": lex_profile,
+            "lex_profile_db": lex_profile_db,
+            "levels": dict(zip(labels, counts)),
+        }
+
+
+# --- Input
+
+
+def normalize_lang(value: Optional[str], default: Optional[str]) -> Optional[str]:
+    lang = (value or default or "").split("-")[0].split("_")[0].lower()
+    return lang or None
+
+
+def iter_jsonl(path: str, args: argparse.Namespace) -> Iterator[Tuple[object, str, str]]:
+    """(id, lang, text) from JSONL, or from a JSON bank's sentences list."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            records: Iterator[dict] = (json.loads(line) for line in f if line.strip())
+        else:
+            data = json.load(f)
+            records = iter(data["sentences"] if isinstance(data, dict) else data)
+        for n, record in enumerate(records, 1):
+            text = record.get(args.text_field)
+            if not isinstance(text, str):
+                continue
+            item_id = record.get(args.id_field, record.get("sentence_id", n))
+            yield item_id, normalize_lang(record.get(args.lang_field), args.lang), text
+
+
+def iter_duckdb(path: str, query: str, default_lang: Optional[str], fetch_size: int) -> Iterator[Tuple[object, str, str]]:
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("--db requires the duckdb package (pip install duckdb)")
+    db = duckdb.connect(path, read_only=True)
+    try:
+        cursor = db.execute(query)
+        names = [d[0] for d in cursor.description]
+        if not {"id", "text"} <= set(names):
+            raise SystemExit(f"--query must return id and text columns (and optionally lang), got: {', '.join(names)}")
+        idx = names.index("id"), names.index("lang") if "lang" in names else None, names.index("text")
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[idx[0]], normalize_lang(row[idx[1]] if idx[1] is not None else None, default_lang), row[idx[2]]
+    finally:
+        db.close()
+
+
+def chunked(items: Iterator[Tuple[object, str, str]], size: int) -> Iterator[List[Tuple[object, str, str]]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Workers
+
+_profiler: Optional[Profiler] = None
+
+
+def init_worker(lexicon_path: str, en_dict: str, ja_dict: str) -> None:
+    """Pool initializer: map the lexicon once per process."""
+    global _profiler
+    _profiler = Profiler(Lexicon(lexicon_path), en_dict, ja_dict)
+
+
+def profile_chunk(chunk: Sequence[Tuple[object, str, str]]) -> Tuple[List[dict], int]:
+    """Profiles for one chunk plus its token count; items in unsupported languages are skipped."""
+    results = []
+    tokens = 0
+    for item_id, lang, text in chunk:
+        if lang not in _profiler.columns:
+            continue
+        profile = _profiler.profile(text, lang)
+        tokens += profile["tokens"]
+        results.append({"id": item_id, "lang": lang, **profile})
+    return results, tokens
+
+
+def run_pool(
+    fn: Callable[[list], T], chunks: Iterator[list], workers: int, initializer: Callable[..., None], init_args: tuple
+) -> Iterator[T]:
+    """fn over chunks in worker processes set up by initializer; results in input order, at most 2 * workers in flight."""
+    if workers <= 1:
+        initializer(*init_args)
+        yield from map(fn, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=init_args) as ex:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(ex.submit(fn, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --- Output
+
+
+class JsonlSink:
+    def __init__(self, path: str):
+        self.path = path
+        self._f = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[dict]) -> None:
+        self._f.write("".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in rows))
+
+    def close(self) -> None:
+        if self._f is not sys.stdout:
+            self._f.close()
+
+    def commit(self) -> None:
+        self.close()
+
+    def abort(self) -> None:
+        self.close()
+
+
+class DuckDBSink(JsonlSink):
+    """
+    Stages rows as JSONL next to the database and bulk-loads them on commit,
+    replacing table in one CREATE TABLE ... AS SELECT FROM read_json().
+    abort() drops the staging file and leaves the table untouched.
+    """
+
+    COLUMNS = {
+        "id": "VARCHAR",
+        "lang": "VARCHAR",
+        "dictionary": "VARCHAR",
+        "tokens": "INTEGER",
+        "unique_tokens": "INTEGER",
+        "content_words": "INTEGER",
+        "function_words": "INTEGER",
+        "coverage": "DOUBLE",
+        "lex_profile": "STRUCT(A1_A2 DOUBLE, B1_B2 DOUBLE, C1_plus DOUBLE, unknown DOUBLE)",
+        "lex_profile_db": "STRUCT(A1_A2 DOUBLE, B1_B2 DOUBLE, C1_plus DOUBLE)",
+        "levels": "MAP(VARCHAR, INTEGER)",
+    }
+
+    def __init__(self, path: str, table: str):
+        try:
+            import duckdb
+        except ImportError:
+            raise SystemExit("DuckDB output requires the duckdb package (pip install duckdb)")
+        self._duckdb = duckdb
+        self.db_path = path
+        self.table = table
+        super().__init__(f"{path}.{table}.jsonl.tmp")
+
+    def abort(self) -> None:
+        self.close()
+        os.remove(self.path)
+
+    def commit(self) -> None:
+        self.close()
+        columns = ", ".join(f"'{name}': '{kind}'" for name, kind in self.COLUMNS.items())
+        db = self._duckdb.connect(self.db_path)
+        try:
+            db.execute(
+                f"CREATE OR REPLACE TABLE {self.table} AS "
+                f"SELECT * FROM read_json(?, format = 'newline_delimited', columns = {{{columns}}})",
+                [self.path],
+            )
+        finally:
+            db.close()
+            os.remove(self.path)
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.exists(args.lexicon):
+        raise SystemExit(f"Lexicon not found: {args.lexicon} (compile it with: python scripts/lexicon.py)")
+    # Fail on a bad --en-dict/--ja-dict here rather than in every worker
+    with Lexicon(args.lexicon) as lex:
+        Profiler(lex, args.en_dict, args.ja_dict)
+
+    if args.input:
+        items = iter_jsonl(args.input, args)
+    else:
+        items = iter_duckdb(args.db, args.query, args.lang, args.chunk_size)
+    sink = DuckDBSink(args.output, args.table) if args.output.endswith(".duckdb") else JsonlSink(args.output)
+
+    started = time.perf_counter()
+    n_items = n_tokens = 0
+    try:
+        for rows, tokens in run_pool(
+            profile_chunk, chunked(items, args.chunk_size), args.workers, init_worker, (args.lexicon, args.en_dict, args.ja_dict)
+        ):
+            sink.write(rows)
+            n_items += len(rows)
+            n_tokens += tokens
+    except BaseException:
+        sink.abort()
+        raise
+    sink.commit()
+    elapsed = time.perf_counter() - started
+    print(
+        f"Profiled {n_items:,} items ({n_tokens:,} tokens) in {elapsed:.2f}s with {args.workers} worker(s): "
+        f"{n_tokens / elapsed if elapsed else 0:,.0f} tokens/s, {n_items / elapsed if elapsed else 0:,.0f} items/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Compiled lexicon: frequency ranks and CEFR/JLPT/HSK levels in one mmap-able file.
+
+The sources (scripts/en_50k.txt, src/lib/nlp/data/frequency*.json and the
+level dictionaries in src/data/vocab/) are compiled into a single binary file
+that a worker maps read-only and queries in place, with no JSON parsing at
+startup. Processes mapping the same file share its pages.
+
+File layout (little-endian, sections 8-byte aligned):
+  header    magic "LEXCOMP1", u32 metadata length, metadata JSON
+            (counts, section offsets, column names, level labels, source hashes)
+  offsets   u32[n + 1]   byte offsets into strings
+  strings   UTF-8 words sorted by bytes (id = position in this order)
+  buckets   i32[b]       perfect-hash displacements (< 0: direct slot -d - 1)
+  slots     u32[n]       hash slot -> word id
+  rank.<lang>     u32[n] 1-based frequency rank, 0 = not ranked
+  level.<column>  u8[n]  index into the column's labels + 1, 0 = not listed
+
+Level labels are stored easiest first (A1..C2, N5..N1, HSK1..HSK7), so level
+codes order by difficulty.
+
+Usage examples:
+  python scripts/lexicon.py                      # compile data/lexicon/lexicon.bin if sources changed
+  python scripts/lexicon.py --force --output /tmp/lexicon.bin
+  python scripts/lexicon.py --lookup the 学生 食べる
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_LEXICON = os.path.join(ROOT_DIR, "data", "lexicon", "lexicon.bin")
+VOCAB_DIR = os.path.join(ROOT_DIR, "src", "data", "vocab")
+FREQUENCY_DIR = os.path.join(ROOT_DIR, "src", "lib", "nlp", "data")
+
+MAGIC = b"LEXCOMP1"
+HEADER = struct.Struct("<8sI")
+HASH = struct.Struct("<III")
+BUCKET_LOAD = 2  # mean keys per perfect-hash bucket
+MAX_DISPLACEMENT = 1 << 20
+
+LEVEL_SCALES = {
+    "cefr": ("A1", "A2", "B1", "B2", "C1", "C2"),
+    "jlpt": ("N5", "N4", "N3", "N2", "N1"),
+    "hsk": ("HSK1", "HSK2", "HSK3", "HSK4", "HSK5", "HSK6", "HSK7"),
+}
+
+# Column name -> (file under src/data/vocab, level scale). Names follow the
+# dictionary options in lexProfileAnalyzer.ts (EnVocabDict / JaVocabDict).
+LEVEL_SOURCES = {
+    "en/default": ("en-cefr.json", "cefr"),
+    "en/extended": ("en-cefr-extended.json", "cefr"),
+    "en/oxford3000": ("en-oxford-3000.json", "cefr"),
+    "en/oxford5000": ("en-oxford-5000.json", "cefr"),
+    "en/llm": ("llm-vocab-rules-en.json", "cefr"),
+    "ja/default": ("ja-jlpt.json", "jlpt"),
+    "ja/elzup": ("ja-jlpt-elzup.json", "jlpt"),
+    "ja/tanos": ("ja-jlpt-tanos.json", "jlpt"),
+    "ja/combined": ("ja-jlpt-combined.json", "jlpt"),
+    "ja/llm": ("llm-vocab-rules.json", "jlpt"),
+    "zh/default": ("zh-hsk.json", "hsk"),
+}
+
+# Rank column -> source files; later files override earlier ones (patches).
+RANK_SOURCES = {
+    "en": (os.path.join(ROOT_DIR, "scripts", "en_50k.txt"), os.path.join(FREQUENCY_DIR, "frequency-patch-en.json")),
+    "ja": (os.path.join(FREQUENCY_DIR, "frequency.json"), os.path.join(FREQUENCY_DIR, "frequency-patch.json")),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compile and query the binary lexicon")
+    parser.add_argument("--output", type=str, default=DEFAULT_LEXICON, help="Lexicon file (default: data/lexicon/lexicon.bin)")
+    parser.add_argument("--force", action="store_true", help="Recompile even if the sources are unchanged")
+    parser.add_argument("--lookup", nargs="+", default=None, metavar="WORD", help="Print ranks and levels for words")
+    return parser.parse_args()
+
+
+def hash_key(key: bytes) -> Tuple[int, int, int]:
+    """(bucket hash, slot base, slot step) for a UTF-8 key; shared by compiler and loader."""
+    return HASH.unpack(hashlib.blake2b(key, digest_size=12).digest())
+
+
+def source_paths() -> List[str]:
+    paths = [p for files in RANK_SOURCES.values() for p in files]
+    paths += [os.path.join(VOCAB_DIR, name) for name, _ in LEVEL_SOURCES.values()]
+    return paths
+
+
+def source_digest(paths: Iterable[str]) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.relpath(path, ROOT_DIR).encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+# --- Sources
+
+
+def read_ranks(paths: Sequence[str]) -> Dict[str, int]:
+    """
+    word -> 1-based rank, merged the way wordFrequency.ts does it.
+
+    .txt lists are "word count" lines in frequency order (first occurrence wins, as
+    process-en-freq.js). JSON is a rank map, shifted to 1-based if it contains a 0,
+    or a word list.
+    """
+    ranks: Dict[str, int] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        if path.endswith(".txt"):
+            rank = 1
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    word = line.strip().split(" ")[0]
+                    if word and word not in ranks:
+                        ranks[word] = rank
+                        rank += 1
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {word: i + 1 for i, word in enumerate(data)}
+        elif 0 in data.values():
+            data = {word: rank + 1 for word, rank in data.items()}
+        ranks.update(data)
+    return ranks
+
+
+def read_levels(path: str) -> Dict[str, str]:
+    """word -> level label; values are labels or {"level": ...} records (llm-vocab-rules*.json)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    out = {}
+    for word, value in data.items():
+        level = value.get("level") if isinstance(value, dict) else value
+        if isinstance(level, str):
+            out[word] = level
+    return out
+
+
+# --- Compiler
+
+
+def build_perfect_hash(keys: Sequence[bytes]) -> Tuple[List[int], List[int]]:
+    """
+    Minimal perfect hash over keys (hash-and-displace): returns (buckets, slots)
+    with slots[slot] = key index.
+
+    Keys are grouped into buckets by hash; the largest buckets are placed first,
+    each trying displacements d until every key lands on a free slot
+    (base + d * step) mod n. Single-key buckets take the leftover slots directly.
+    """
+    n = len(keys)
+    n_buckets = max(1, n // BUCKET_LOAD)
+    groups: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
+    for i, key in enumerate(keys):
+        g, base, step = hash_key(key)
+        groups[g % n_buckets].append((i, base, step))
+
+    buckets = [0] * n_buckets
+    slots = [-1] * n
+    singles = []
+    for b, members in sorted(groups.items(), key=lambda item: -len(item[1])):
+        if len(members) == 1:
+            singles.append((b, members[0][0]))
+            continue
+        for d in range(MAX_DISPLACEMENT):
+            placed = {(base + d * step) % n for _, base, step in members}
+            if len(placed) == len(members) and all(slots[s] < 0 for s in placed):
+                break
+        else:
+            raise RuntimeError(f"perfect hash: no displacement for bucket of {len(members)} keys")
+        buckets[b] = d
+        for i, base, step in members:
+            slots[(base + d * step) % n] = i
+    free = (s for s in range(n) if slots[s] < 0)
+    for b, i in singles:
+        s = next(free)
+        buckets[b] = -s - 1
+        slots[s] = i
+    return buckets, slots
+
+
+def compile_lexicon(output: str) -> dict:
+    """Read every source and write the binary lexicon atomically; returns its metadata."""
+    ranks = {lang: read_ranks(paths) for lang, paths in RANK_SOURCES.items()}
+    levels = {}
+    for column, (name, scale) in LEVEL_SOURCES.items():
+        path = os.path.join(VOCAB_DIR, name)
+        if os.path.exists(path):
+            levels[column] = (read_levels(path), scale)
+
+    words = set()
+    for table in ranks.values():
+        words.update(table)
+    for table, _ in levels.values():
+        words.update(table)
+    keys = sorted(w.encode("utf-8") for w in words)
+    n = len(keys)
+    ids = {key.decode("utf-8"): i for i, key in enumerate(keys)}
+
+    offsets = array("I", [0]) * (n + 1)
+    pos = 0
+    for i, key in enumerate(keys):
+        pos += len(key)
+        offsets[i + 1] = pos
+    buckets, slots = build_perfect_hash(keys)
+
+    sections: List[Tuple[str, str, bytes]] = []
+    sections.append(("offsets", "I", offsets.tobytes()))
+    sections.append(("strings", "B", b"".join(keys)))
+    sections.append(("buckets", "i", array("i", buckets).tobytes()))
+    sections.append(("slots", "I", array("I", slots).tobytes()))
+    for lang, table in ranks.items():
+        column = array("I", [0]) * n
+        for word, rank in table.items():
+            column[ids[word]] = rank
+        sections.append((f"rank.{lang}", "I", column.tobytes()))
+    level_meta = {}
+    for name, (table, scale) in levels.items():
+        labels = list(LEVEL_SCALES[scale])
+        labels += sorted({v for v in table.values()} - set(labels))  # unexpected labels sort last
+        code = {label: c + 1 for c, label in enumerate(labels)}
+        column = bytearray(n)
+        for word, label in table.items():
+            column[ids[word]] = code[label]
+        sections.append((f"level.{name}", "B", bytes(column)))
+        level_meta[name] = {"labels": labels, "source": LEVEL_SOURCES[name][0], "entries": len(table)}
+
+    meta = {
+        "version": 1,
+        "count": n,
+        "buckets": len(buckets),
+        "ranks": {lang: len(table) for lang, table in ranks.items()},
+        "levels": level_meta,
+        "sources": source_digest(source_paths()),
+        "sections": {},
+    }
+    # Section offsets depend on the header size, which depends on the offsets' digits:
+    # lay out with placeholder widths until the header stops growing.
+    header_len = 0
+    while True:
+        pos = _align(HEADER.size + header_len)
+        for name, typecode, data in sections:
+            meta["sections"][name] = [pos, len(data), typecode]
+            pos = _align(pos + len(data))
+        blob = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(blob) <= header_len:
+            break
+        header_len = len(blob) + 64
+    blob = blob.ljust(header_len, b" ")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, header_len))
+        f.write(blob)
+        for name, _, data in sections:
+            f.seek(meta["sections"][name][0])
+            f.write(data)
+        f.truncate(_align(f.tell()))
+    os.replace(tmp, output)
+    return meta
+
+
+def _align(pos: int) -> int:
+    return (pos + 7) & ~7
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic, header_len = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled lexicon")
+        return json.loads(f.read(header_len))
+
+
+def is_current(path: str) -> bool:
+    """True if path was compiled from the current sources."""
+    try:
+        return read_header(path)["sources"] == source_digest(source_paths())
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+# --- Loader
+
+
+class Lexicon:
+    """
+    Read-only view of a compiled lexicon file.
+
+    Opening maps the file and casts memoryviews over its sections; nothing is
+    decoded until a lookup touches it. Unknown words get None (single lookups)
+    or 0 (code/rank columns in batched lookups).
+    """
+
+    def __init__(self, path: str = DEFAULT_LEXICON):
+        if not os.path.exists(path):
+            raise SystemExit(f"Lexicon not found: {path} (compile it with: python scripts/lexicon.py)")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled lexicon")
+        self.meta = json.loads(self._mm[HEADER.size : HEADER.size + header_len])
+        self.count = self.meta["count"]
+        buf = memoryview(self._mm)
+        self._views = {}
+        for name, (offset, length, typecode) in self.meta["sections"].items():
+            self._views[name] = buf[offset : offset + length].cast(typecode)
+        self._offsets = self._views["offsets"]
+        self._strings = self._views["strings"]
+        self._buckets = self._views["buckets"]
+        self._slots = self._views["slots"]
+        self.labels = {name: tuple(info["labels"]) for name, info in self.meta["levels"].items()}
+
+    @property
+    def rank_columns(self) -> List[str]:
+        return list(self.meta["ranks"])
+
+    @property
+    def level_columns(self) -> List[str]:
+        return list(self.meta["levels"])
+
+    def close(self) -> None:
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._mm.close()
+
+    def __enter__(self) -> "Lexicon":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, word: str) -> bool:
+        return self.word_id(word) >= 0
+
+    def word(self, word_id: int) -> str:
+        return bytes(self._strings[self._offsets[word_id] : self._offsets[word_id + 1]]).decode("utf-8")
+
+    def word_id(self, word: str) -> int:
+        """Position of word in the sorted string table, or -1."""
+        key = word.encode("utf-8")
+        g, base, step = hash_key(key)
+        d = self._buckets[g % len(self._buckets)]
+        slot = -d - 1 if d < 0 else (base + d * step) % self.count
+        i = self._slots[slot]
+        offsets = self._offsets
+        return i if self._strings[offsets[i] : offsets[i + 1]] == key else -1
+
+    def word_ids(self, words: Iterable[str]) -> List[int]:
+        # word_id() with the attribute lookups hoisted out of the loop
+        blake2b, unpack = hashlib.blake2b, HASH.unpack
+        buckets, slots, offsets, strings = self._buckets, self._slots, self._offsets, self._strings
+        n_buckets, n = len(buckets), self.count
+        out = []
+        for word in words:
+            key = word.encode("utf-8")
+            g, base, step = unpack(blake2b(key, digest_size=12).digest())
+            d = buckets[g % n_buckets]
+            i = slots[-d - 1 if d < 0 else (base + d * step) % n]
+            out.append(i if strings[offsets[i] : offsets[i + 1]] == key else -1)
+        return out
+
+    def column(self, name: str) -> memoryview:
+        """The raw u32 (rank.<lang>) or u8 (level.<column>) array, indexed by word id."""
+        return self._views[name]
+
+    def rank(self, word: str, lang: str = "en") -> Optional[int]:
+        i = self.word_id(word)
+        rank = self._views[f"rank.{lang}"][i] if i >= 0 else 0
+        return rank or None
+
+    def ranks(self, words: Iterable[str], lang: str = "en") -> List[int]:
+        """Ranks for many words; 0 where a word is not ranked."""
+        column = self._views[f"rank.{lang}"]
+        return [column[i] if i >= 0 else 0 for i in self.word_ids(words)]
+
+    def level(self, word: str, column: str) -> Optional[str]:
+        i = self.word_id(word)
+        code = self._views[f"level.{column}"][i] if i >= 0 else 0
+        return self.labels[column][code - 1] if code else None
+
+    def level_codes(self, words: Iterable[str], column: str) -> List[int]:
+        """Level codes for many words: 1 = easiest label of the column, 0 = not listed."""
+        codes = self._views[f"level.{column}"]
+        return [codes[i] if i >= 0 else 0 for i in self.word_ids(words)]
+
+    def levels(self, words: Iterable[str], column: str) -> List[Optional[str]]:
+        labels = (None,) + self.labels[column]
+        return [labels[c] for c in self.level_codes(words, column)]
+
+
+def main() -> None:
+    args = parse_args()
+    if args.lookup:
+        with Lexicon(args.output) as lex:
+            for word in args.lookup:
+                ranks = ", ".join(f"{lang}={lex.rank(word, lang)}" for lang in lex.rank_columns)
+                levels = ", ".join(f"{c}={lex.level(word, c)}" for c in lex.level_columns if lex.level(word, c))
+                print(f"{word}: {ranks}" + (f"; {levels}" if levels else "") + ("" if word in lex else " (not in lexicon)"))
+        return
+    if not args.force and is_current(args.output):
+        print(f"{args.output} is up to date")
+        return
+    started = time.perf_counter()
+    meta = compile_lexicon(args.output)
+    elapsed = time.perf_counter() - started
+    print(f"Compiled {meta['count']:,} words into {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB) in {elapsed:.2f}s")
+    for lang, count in meta["ranks"].items():
+        print(f"  rank.{lang:<14} {count:>7,} words")
+    for name, info in meta["levels"].items():
+        print(f"  level.{name:<13} {info['entries']:>7,} words  {'/'.join(info['labels'])}")
+
+
+if __name__ == "__main__":
+    main()
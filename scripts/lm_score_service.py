@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Fluency scoring service: per-sentence perplexity and OOV rate from a kenlm model.
+
+The binary model is loaded once and memory-mapped (kenlm LoadMethod), so
+several workers on one host share the same pages. POST /score takes a
+batch of sentences. Concurrent requests are coalesced by a micro-batcher:
+everything that arrives while a batch is being scored is scored together
+in the next call on the scoring thread. Sentences are lowercased and split into words and
+punctuation, or into SentencePiece pieces with --spm. The same tokenizer
+produces the training corpus (--export-corpus), so scores and model always
+agree on what a token is.
+
+A small test model trained on data/english-sentences.json ships in
+data/lm/. Rebuild it (kenlm's lmplz/build_binary) with:
+  python scripts/lm_score_service.py --export-corpus data/english-sentences.json > /tmp/corpus.txt
+  lmplz -o 3 --discount_fallback < /tmp/corpus.txt > /tmp/english-sentences.arpa
+  build_binary /tmp/english-sentences.arpa data/lm/english-sentences.3gram.binary
+
+Usage examples:
+  python scripts/lm_score_service.py --port 8008
+  curl -s localhost:8008/score -H 'content-type: application/json' -d '{"sentences": ["Good morning."]}'
+  python scripts/lm_score_service.py --score-file data/english-sentences.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "lm", "english-sentences.3gram.binary")
+MAX_SENTENCES_PER_REQUEST = 10_000
+TOKEN_RE = re.compile(r"\w+(?:'\w+)*|[^\w\s]")
+
+# kenlm LoadMethod names: "populate" maps the file and prefaults it, "lazy" pages in on demand,
+# "read" copies it into anonymous memory (no sharing between processes).
+LOAD_METHODS = ("populate", "lazy", "read")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Batch perplexity/OOV scoring service on a kenlm model")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help="kenlm binary (or ARPA) model")
+    parser.add_argument("--load", choices=LOAD_METHODS, default="populate", help="How the binary model is mapped (default: populate)")
+    parser.add_argument("--spm", type=str, default=None, help="SentencePiece model; tokens are pieces instead of words")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--max-batch", type=int, default=2048, help="Sentences per scoring call (default: 2048)")
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=0.0,
+        help="Extra wait for more requests before scoring a batch (default: 0, take whatever queued up meanwhile)",
+    )
+    parser.add_argument("--score-file", type=str, default=None, help="Score a sentence bank offline and report per level")
+    parser.add_argument(
+        "--export-corpus", type=str, default=None, help="Print a sentence bank tokenized for lmplz (one sentence per line)"
+    )
+    args = parser.parse_args()
+    if args.max_batch < 1:
+        parser.error("--max-batch must be >= 1")
+    return args
+
+
+def load_sentences(path: str) -> Iterator[dict]:
+    """Sentence bank records: {"sentences": [...]} JSON (data/english-sentences.json) or JSONL with a text field."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    yield from data["sentences"] if isinstance(data, dict) else data
+
+
+def word_tokens(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def make_tokenizer(spm_model: Optional[str] = None) -> Callable[[str], List[str]]:
+    if spm_model is None:
+        return word_tokens
+    try:
+        import sentencepiece
+    except ImportError:
+        raise SystemExit("--spm requires the sentencepiece package (pip install sentencepiece)")
+    sp = sentencepiece.SentencePieceProcessor(model_file=spm_model)
+    return lambda text: sp.encode(text, out_type=str)
+
+
+class Scorer:
+    def __init__(self, model_path: str, load: str = "populate", spm_model: Optional[str] = None):
+        try:
+            import kenlm
+        except ImportError:
+            raise SystemExit("lm_score_service.py requires the kenlm package (pip install kenlm)")
+        if not os.path.exists(model_path):
+            raise SystemExit(f"Model not found: {model_path}")
+        config = kenlm.Config()
+        config.load_method = {
+            "populate": kenlm.LoadMethod.POPULATE_OR_LAZY,
+            "lazy": kenlm.LoadMethod.LAZY,
+            "read": kenlm.LoadMethod.READ,
+        }[load]
+        self.path = model_path
+        self.model = kenlm.Model(model_path, config)
+        self.tokens = make_tokenizer(spm_model)
+        self._known: Dict[str, bool] = {}  # vocabulary membership, filled as tokens are seen
+
+    def score_batch(self, sentences: Sequence[str]) -> List[dict]:
+        """Perplexity over words + </s>, as kenlm's Model.perplexity; oov_rate over words only."""
+        model, known, tokens = self.model, self._known, self.tokens
+        results = []
+        for text in sentences:
+            toks = tokens(text)
+            log10_prob = model.score(" ".join(toks), bos=True, eos=True)
+            oov = 0
+            for tok in toks:
+                hit = known.get(tok)
+                if hit is None:
+                    hit = known[tok] = tok in model
+                if not hit:
+                    oov += 1
+            n = len(toks)
+            results.append(
+                {
+                    "perplexity": 10.0 ** (-log10_prob / (n + 1)),
+                    "oov_rate": oov / n if n else 0.0,
+                    "tokens": n,
+                    "oov": oov,
+                    "log10_prob": log10_prob,
+                }
+            )
+        return results
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submit() calls into one score_fn call per batch.
+
+    While a batch is being scored on the worker thread, new requests queue up; the next batch takes
+    all of them (up to max_batch sentences), so batches grow with load without adding latency when
+    idle. max_wait > 0 additionally holds each batch open that long for more requests.
+    """
+
+    def __init__(self, score_fn: Callable[[Sequence[str]], List[dict]], max_batch: int = 2048, max_wait: float = 0.0):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.sentences = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="score")
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, sentences: Sequence[str]) -> List[dict]:
+        if not sentences:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sentences, future))
+        return await future
+
+    def _drain(self, batch: List[Tuple[Sequence[str], asyncio.Future]], size: int) -> int:
+        while size < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return size
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            size = self._drain(batch, len(first[0]))
+            if size < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                size = self._drain(batch, size)
+            flat = [s for sentences, _ in batch for s in sentences]
+            try:
+                results = await loop.run_in_executor(self._executor, self.score_fn, flat)
+            except Exception as exc:  # fail the callers of this batch, keep serving
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.sentences += len(flat)
+            pos = 0
+            for sentences, future in batch:
+                if not future.done():
+                    future.set_result(results[pos : pos + len(sentences)])
+                pos += len(sentences)
+
+
+def create_app(scorer: Scorer, max_batch: int = 2048, max_wait_ms: float = 0.0):
+    try:
+        from fastapi import FastAPI, Response
+        from pydantic import BaseModel, Field
+    except ImportError:
+        raise SystemExit("lm_score_service.py requires the fastapi package (pip install fastapi uvicorn)")
+
+    class ScoreRequest(BaseModel):
+        sentences: List[str] = Field(..., max_length=MAX_SENTENCES_PER_REQUEST)
+
+    class SentenceScore(BaseModel):
+        perplexity: float
+        oov_rate: float
+        tokens: int
+        oov: int
+        log10_prob: float
+
+    class ScoreResponse(BaseModel):
+        model: str
+        results: List[SentenceScore]
+
+    batcher = MicroBatcher(scorer.score_batch, max_batch, max_wait_ms / 1000.0)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await batcher.start()
+        yield
+        await batcher.stop()
+
+    app = FastAPI(title="Fluency scoring", lifespan=lifespan)
+    app.state.batcher = batcher
+    model_name = os.path.basename(scorer.path)
+
+    @app.get("/health")
+    async def health() -> dict:
+        return {
+            "model": model_name,
+            "order": scorer.model.order,
+            "batches": batcher.batches,
+            "sentences": batcher.sentences,
+        }
+
+    @app.post("/score", response_model=ScoreResponse)
+    async def score(request: ScoreRequest):
+        results = await batcher.submit(request.sentences)
+        # ScoreResponse documents the schema; the results are built here, so skip re-validating them
+        return Response(json.dumps({"model": model_name, "results": results}), media_type="application/json")
+
+    return app
+
+
+def score_file(scorer: Scorer, path: str) -> None:
+    """Offline pass over a sentence bank: mean perplexity / OOV rate per hand-assigned level."""
+    records = list(load_sentences(path))
+    started = time.perf_counter()
+    scores = scorer.score_batch([r["text"] for r in records])
+    elapsed = time.perf_counter() - started
+    by_level: Dict[object, List[dict]] = defaultdict(list)
+    for record, s in zip(records, scores):
+        by_level[record.get("level")].append(s)
+    print(f"{'level':>6} {'sentences':>10} {'mean ppl':>10} {'median ppl':>11} {'oov rate':>9}")
+    for level in sorted(by_level, key=lambda v: (v is None, v)):
+        group = by_level[level]
+        ppl = sorted(s["perplexity"] for s in group)
+        tokens = sum(s["tokens"] for s in group)
+        # Geometric mean: perplexities are ratios
+        mean = math.exp(sum(math.log(p) for p in ppl) / len(ppl))
+        print(
+            f"{str(level):>6} {len(group):>10} {mean:>10.1f} {ppl[len(ppl) // 2]:>11.1f} "
+            f"{sum(s['oov'] for s in group) / max(tokens, 1):>8.1%}"
+        )
+    print(f"\n{len(records)} sentences in {elapsed:.3f}s ({len(records) / elapsed if elapsed else 0:,.0f} sentences/s)")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.export_corpus:
+        tokens = make_tokenizer(args.spm)
+        for record in load_sentences(args.export_corpus):
+            print(" ".join(tokens(record["text"])))
+        return
+    started = time.perf_counter()
+    scorer = Scorer(args.model, args.load, args.spm)
+    print(f"Loaded {os.path.basename(args.model)} (order {scorer.model.order}, {args.load}) in {time.perf_counter() - started:.3f}s")
+    if args.score_file:
+        score_file(scorer, args.score_file)
+        return
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("lm_score_service.py requires the uvicorn package (pip install fastapi uvicorn)")
+    uvicorn.run(create_app(scorer, args.max_batch, args.max_wait_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
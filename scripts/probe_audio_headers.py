@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Probe container headers of a local mirror of the audio buckets.
+
+Reads only headers (memory-mapped) to get duration and bitrate, so a clip that
+is long can be told apart from one encoded at a wastefully high bitrate.
+Supported: WAV (RIFF fmt/data), MP3 (frame header + Xing/Info/VBRI), Ogg
+(Opus/Vorbis identification header + last granule position), WebM/Matroska
+(EBML Info/Duration) and FLAC (STREAMINFO). Other extensions from
+AudioExtensions are counted as unprobed.
+
+The mirror layout is <mirror>/<bucket_id>/<object name>, i.e. each top-level
+directory is treated as a bucket.
+
+Usage examples:
+  python scripts/probe_audio_headers.py --mirror ./storage-mirror
+  python scripts/probe_audio_headers.py --mirror ./storage-mirror --bucket tts --jobs 8 \
+    --output-csv audio_probe.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from analyze_audio_sizes import AudioExtensions, format_bytes, histogram_slot, print_section
+
+DURATION_BINS = [0, 1, 2, 5, 10, 30, 60, 300, 600]  # seconds
+BITRATE_BINS = [0, 32_000, 48_000, 64_000, 96_000, 128_000, 160_000, 192_000, 256_000, 320_000]  # bit/s
+BYTES_PER_SECOND_BINS = [0, 2048, 4096, 8192, 12288, 16384, 24576, 32768, 49152, 65536]
+
+# Headers we need live in the first few KB; EBML Info can sit behind a SeekHead.
+HEAD_SCAN_LIMIT = 4 * 1024 * 1024
+TAIL_SCAN_BYTES = 64 * 1024
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Probe audio container headers in a local bucket mirror")
+    parser.add_argument(
+        "--mirror",
+        type=str,
+        required=True,
+        help="Directory holding one sub-directory per bucket_id",
+    )
+    parser.add_argument(
+        "--bucket",
+        type=str,
+        default=None,
+        help="Only probe a specific bucket_id",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--output-csv",
+        type=str,
+        default=None,
+        help="Optional path to write per-file results (bucket_id,name,format,size_bytes,duration_s,bitrate_bps,error)",
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+@dataclass
+class ProbeResult:
+    bucket_id: str
+    name: str
+    format: str
+    size_bytes: int
+    duration_s: Optional[float]
+    bitrate_bps: Optional[int]  # nominal from the header, else average over the file
+    error: Optional[str] = None  # why the file could not be read (vanished, dangling symlink, ...)
+
+
+# --- WAV -------------------------------------------------------------------
+
+
+def probe_wav(mm: mmap.mmap) -> Tuple[Optional[float], Optional[int]]:
+    if mm[0:4] != b"RIFF" or mm[8:12] != b"WAVE":
+        return None, None
+    pos, end = 12, min(len(mm), HEAD_SCAN_LIMIT)
+    byte_rate = None
+    while pos + 8 <= end:
+        chunk_id = mm[pos : pos + 4]
+        (chunk_size,) = struct.unpack_from("<I", mm, pos + 4)
+        if chunk_id == b"fmt ":
+            (byte_rate,) = struct.unpack_from("<I", mm, pos + 16)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None, None
+            # Streaming writers leave 0 or 0xFFFFFFFF; fall back to what is on disk.
+            data_size = chunk_size if 0 < chunk_size < 0xFFFFFFFF else len(mm) - pos - 8
+            return data_size / byte_rate, byte_rate * 8
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None, None
+
+
+# --- MP3 -------------------------------------------------------------------
+
+MP3_BITRATES_KBPS = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+MP3_VERSIONS = {0b11: 1, 0b10: 2, 0b00: 25}
+MP3_LAYERS = {0b11: 1, 0b10: 2, 0b01: 3}
+
+
+def _mp3_frame(mm: mmap.mmap, pos: int) -> Optional[Tuple[int, int, int, int, bool]]:
+    """(version, layer, bitrate bit/s, sample rate, mono) of a valid frame header at `pos`."""
+    if pos + 4 > len(mm) or mm[pos] != 0xFF or (mm[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = MP3_VERSIONS.get((mm[pos + 1] >> 3) & 0b11)
+    layer = MP3_LAYERS.get((mm[pos + 1] >> 1) & 0b11)
+    bitrate_idx = mm[pos + 2] >> 4
+    sr_idx = (mm[pos + 2] >> 2) & 0b11
+    if version is None or layer is None or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    table_version = 1 if version == 1 else 2
+    bitrate = MP3_BITRATES_KBPS[(table_version, layer)][bitrate_idx] * 1000
+    mono = (mm[pos + 3] >> 6) == 0b11
+    return version, layer, bitrate, MP3_SAMPLE_RATES[version][sr_idx], mono
+
+
+def probe_mp3(mm: mmap.mmap) -> Tuple[Optional[float], Optional[int]]:
+    start = 0
+    if mm[0:3] == b"ID3" and len(mm) >= 10:
+        size = (mm[6] << 21) | (mm[7] << 14) | (mm[8] << 7) | mm[9]
+        start = 10 + size + (10 if mm[5] & 0x10 else 0)
+
+    end = min(len(mm), start + 64 * 1024)
+    pos = mm.find(b"\xff", start, end)
+    frame = None
+    while pos != -1:
+        frame = _mp3_frame(mm, pos)
+        if frame:
+            break
+        pos = mm.find(b"\xff", pos + 1, end)
+    if not frame:
+        return None, None
+
+    version, layer, bitrate, sample_rate, mono = frame
+    samples_per_frame = 384 if layer == 1 else 1152 if (layer == 2 or version == 1) else 576
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    audio_bytes = len(mm) - pos
+
+    xing = pos + 4 + side_info
+    if mm[xing : xing + 4] in (b"Xing", b"Info"):
+        (flags,) = struct.unpack_from(">I", mm, xing + 4)
+        if flags & 0x1:
+            (frames,) = struct.unpack_from(">I", mm, xing + 8)
+            duration = frames * samples_per_frame / sample_rate
+            return duration, int(audio_bytes * 8 / duration) if duration else bitrate
+    vbri = pos + 4 + 32
+    if mm[vbri : vbri + 4] == b"VBRI":
+        (frames,) = struct.unpack_from(">I", mm, vbri + 14)
+        duration = frames * samples_per_frame / sample_rate
+        return duration, int(audio_bytes * 8 / duration) if duration else bitrate
+
+    # Constant bitrate: duration follows from the payload size.
+    return audio_bytes * 8 / bitrate, bitrate
+
+
+# --- Ogg (Opus / Vorbis) ----------------------------------------------------
+
+
+def _ogg_last_granule(mm: mmap.mmap) -> Optional[int]:
+    lo = max(0, len(mm) - TAIL_SCAN_BYTES)
+    pos = mm.rfind(b"OggS", lo)
+    while pos != -1:
+        if pos + 14 <= len(mm):
+            (granule,) = struct.unpack_from("<q", mm, pos + 6)
+            if granule >= 0:
+                return granule
+        pos = mm.rfind(b"OggS", lo, pos)
+    return None
+
+
+def probe_ogg(mm: mmap.mmap) -> Tuple[Optional[float], Optional[int]]:
+    if mm[0:4] != b"OggS" or len(mm) < 28:
+        return None, None
+    packet = 27 + mm[26]
+    granule = _ogg_last_granule(mm)
+    if granule is None:
+        return None, None
+    if mm[packet : packet + 8] == b"OpusHead":
+        (pre_skip,) = struct.unpack_from("<H", mm, packet + 10)
+        duration = max(0, granule - pre_skip) / 48000.0  # Opus granules always count 48 kHz samples
+        return duration, int(len(mm) * 8 / duration) if duration else None
+    if mm[packet : packet + 7] == b"\x01vorbis":
+        (sample_rate,) = struct.unpack_from("<I", mm, packet + 12)
+        (nominal,) = struct.unpack_from("<i", mm, packet + 20)
+        duration = granule / sample_rate if sample_rate else 0.0
+        if nominal <= 0 and duration:
+            nominal = int(len(mm) * 8 / duration)
+        return duration, nominal or None
+    return None, None
+
+
+# --- WebM / Matroska --------------------------------------------------------
+
+EBML_HEADER = 0x1A45DFA3
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_CLUSTER = 0x1F43B675
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+
+
+def _ebml_vint(mm: mmap.mmap, pos: int, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """Decode a variable-length integer; returns (value, length). Unknown sizes return None."""
+    first = mm[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | mm[pos + i]
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+def _ebml_element(mm: mmap.mmap, pos: int) -> Tuple[int, Optional[int], int]:
+    """(id, size, data offset) of the element at `pos`."""
+    element_id, id_len = _ebml_vint(mm, pos, keep_marker=True)
+    size, size_len = _ebml_vint(mm, pos + id_len, keep_marker=False)
+    return element_id, size, pos + id_len + size_len
+
+
+def probe_webm(mm: mmap.mmap) -> Tuple[Optional[float], Optional[int]]:
+    end = min(len(mm), HEAD_SCAN_LIMIT)
+    element_id, size, data = _ebml_element(mm, 0)
+    if element_id != EBML_HEADER or size is None:
+        return None, None
+    element_id, seg_size, pos = _ebml_element(mm, data + size)
+    if element_id != EBML_SEGMENT:
+        return None, None
+    if seg_size is not None:
+        end = min(end, pos + seg_size)
+
+    while pos < end - 2:
+        element_id, size, data = _ebml_element(mm, pos)
+        if element_id == EBML_CLUSTER or size is None:
+            break  # Info always precedes the first cluster
+        if element_id == EBML_INFO:
+            scale, duration = 1_000_000, None
+            child, info_end = data, data + size
+            while child < info_end:
+                cid, csize, cdata = _ebml_element(mm, child)
+                if csize is None:
+                    break  # unknown size is only legal on master elements; treat the rest of Info as unreadable
+                if cid == EBML_TIMECODE_SCALE:
+                    scale = int.from_bytes(mm[cdata : cdata + csize], "big")
+                elif cid == EBML_DURATION:
+                    duration = struct.unpack_from(">f" if csize == 4 else ">d", mm, cdata)[0]
+                child = cdata + csize
+            if duration is None:
+                return None, None  # e.g. MediaRecorder output without a Duration element
+            seconds = duration * scale / 1e9
+            return seconds, int(len(mm) * 8 / seconds) if seconds else None
+        pos = data + size
+    return None, None
+
+
+# --- FLAC ------------------------------------------------------------------
+
+
+def probe_flac(mm: mmap.mmap) -> Tuple[Optional[float], Optional[int]]:
+    if mm[0:4] != b"fLaC" or len(mm) < 26 or (mm[4] & 0x7F) != 0:
+        return None, None
+    packed = int.from_bytes(mm[18:26], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None, None
+    duration = total_samples / sample_rate
+    return duration, int(len(mm) * 8 / duration)
+
+
+PROBES: Dict[str, Tuple[str, Callable[[mmap.mmap], Tuple[Optional[float], Optional[int]]]]] = {
+    ".wav": ("wav", probe_wav),
+    ".mp3": ("mp3", probe_mp3),
+    ".ogg": ("ogg", probe_ogg),
+    ".opus": ("ogg", probe_ogg),
+    ".webm": ("webm", probe_webm),
+    ".flac": ("flac", probe_flac),
+}
+
+
+def probe_file(job: Tuple[str, str, str]) -> ProbeResult:
+    path, bucket_id, name = job
+    ext = os.path.splitext(name)[1].lower()
+    fmt, probe = PROBES.get(ext, (ext.lstrip("."), None))
+    try:
+        # Inside the try: a file deleted mid-scan must not abort the whole pool.map
+        size = os.path.getsize(path)
+    except OSError as e:
+        return ProbeResult(bucket_id, name, fmt, 0, None, None, e.strerror or str(e))
+    if probe is None or size == 0:
+        return ProbeResult(bucket_id, name, fmt, size, None, None)
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            duration, bitrate = probe(mm)
+    except OSError as e:
+        return ProbeResult(bucket_id, name, fmt, size, None, None, e.strerror or str(e))
+    except (ValueError, IndexError, struct.error):
+        duration, bitrate = None, None
+    if duration is not None and duration <= 0:
+        duration, bitrate = None, None
+    return ProbeResult(bucket_id, name, fmt, size, duration, bitrate)
+
+
+def iter_mirror(mirror: str, bucket_filter: Optional[str]) -> Iterator[Tuple[str, str, str]]:
+    """Yield (path, bucket_id, object name) for audio files below `mirror`."""
+    for bucket_id in sorted(os.listdir(mirror)):
+        bucket_dir = os.path.join(mirror, bucket_id)
+        if not os.path.isdir(bucket_dir) or (bucket_filter and bucket_id != bucket_filter):
+            continue
+        for root, _dirs, files in os.walk(bucket_dir):
+            for filename in files:
+                if filename.lower().endswith(AudioExtensions):
+                    path = os.path.join(root, filename)
+                    yield path, bucket_id, os.path.relpath(path, bucket_dir).replace(os.sep, "/")
+
+
+def probe_mirror(mirror: str, bucket_filter: Optional[str], jobs: int) -> List[ProbeResult]:
+    work = list(iter_mirror(mirror, bucket_filter))
+    if jobs == 1:
+        return [probe_file(job) for job in work]
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        return list(ex.map(probe_file, work, chunksize=max(1, min(256, len(work) // (jobs * 4) or 1))))
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def format_bitrate(bps: float) -> str:
+    return f"{bps / 1000:.0f} kbps"
+
+
+def format_rate(bytes_per_second: float) -> str:
+    return f"{format_bytes(int(bytes_per_second))}/s"
+
+
+def print_histogram(title: str, bins: Sequence[float], values: Sequence[float], fmt: Callable[[float], str], indent: str) -> None:
+    counts = [0] * len(bins)
+    for v in values:
+        counts[histogram_slot(bins, v)] += 1
+    labels = [f"[{fmt(bins[i])}, {fmt(bins[i + 1])})" for i in range(len(bins) - 1)] + [f">= {fmt(bins[-1])}"]
+    total = len(values)
+    print(f"{indent}{title}:")
+    for label, count in zip(labels, counts):
+        share = (count / total * 100.0) if total else 0.0
+        print(f"{indent}  {label:<26} {count:>8}  ({share:5.1f}%)")
+
+
+def print_probe_block(results: Sequence[ProbeResult], indent: str) -> None:
+    probed = [r for r in results if r.duration_s is not None]
+    total_seconds = sum(r.duration_s for r in probed)
+    probed_bytes = sum(r.size_bytes for r in probed)
+    errors = sum(1 for r in results if r.error is not None)
+    print(f"{indent}Files: {len(results)} | probed={len(probed)} | unknown={len(results) - len(probed)} | unreadable={errors}")
+    print(f"{indent}Total Duration: {format_duration(total_seconds)}")
+    if total_seconds:
+        print(f"{indent}Storage Rate: {format_rate(probed_bytes / total_seconds)} ({format_bitrate(probed_bytes * 8 / total_seconds)})")
+    print_histogram("Duration", DURATION_BINS, [r.duration_s for r in probed], format_duration, indent)
+    print_histogram(
+        "Bitrate", BITRATE_BINS, [r.bitrate_bps for r in probed if r.bitrate_bps is not None], format_bitrate, indent
+    )
+    print_histogram(
+        "Bytes per second", BYTES_PER_SECOND_BINS, [r.size_bytes / r.duration_s for r in probed], format_rate, indent
+    )
+
+
+def print_probe_report(results: Sequence[ProbeResult]) -> None:
+    print_section("Overall Probe Summary (Audio Headers)")
+    print_probe_block(results, "")
+
+    by_format: Dict[str, int] = {}
+    for r in results:
+        by_format[r.format] = by_format.get(r.format, 0) + 1
+    print("Formats: " + ", ".join(f"{fmt}={count}" for fmt, count in sorted(by_format.items(), key=lambda kv: -kv[1])))
+
+    print_section("Per-Bucket Probe Summary")
+    by_bucket: Dict[str, List[ProbeResult]] = {}
+    for r in results:
+        by_bucket.setdefault(r.bucket_id, []).append(r)
+    for bucket_id, bucket_results in sorted(by_bucket.items(), key=lambda kv: sum(r.size_bytes for r in kv[1]), reverse=True):
+        print(f"- bucket_id={bucket_id}")
+        print_probe_block(bucket_results, "    ")
+
+
+def write_probe_csv(path: str, results: Sequence[ProbeResult]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["bucket_id", "name", "format", "size_bytes", "duration_s", "bitrate_bps", "error"])
+        for r in results:
+            duration = f"{r.duration_s:.3f}" if r.duration_s is not None else ""
+            w.writerow([r.bucket_id, r.name, r.format, r.size_bytes, duration, r.bitrate_bps or "", r.error or ""])
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.isdir(args.mirror):
+        raise SystemExit(f"Mirror directory not found: {args.mirror}")
+    results = probe_mirror(args.mirror, args.bucket, args.jobs)
+    if not results:
+        print(f"No audio files found under {args.mirror}.")
+        return
+
+    print_probe_report(results)
+
+    if args.output_csv:
+        write_probe_csv(args.output_csv, results)
+        print(f"\nSaved CSV: {args.output_csv}")
+
+
+if __name__ == "__main__":
+    main()
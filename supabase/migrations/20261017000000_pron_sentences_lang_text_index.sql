@@ -0,0 +1,5 @@
+-- Lookup index for de-duplicating pron_sentences on (lang, text).
+-- scripts/load_pron_sentences.py matches every staged batch against existing
+-- rows by (lang, text); without this index each batch scans the whole table.
+-- Not UNIQUE: existing banks may already hold duplicate sentences.
+CREATE INDEX IF NOT EXISTS idx_pron_sentences_lang_text ON public.pron_sentences (lang, text);